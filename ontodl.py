@@ -39,6 +39,102 @@ python3 ontodl.py samples/ontodl_sample1.ontodl --format json
 python3 ontodl.py samples/ontodl_sample2.ontodl --format log
 ```
 
+Compile many files to many formats in one process. Each file is parsed once
+and the result is written as `<output-dir>/<name>.<ext>` for every format:
+
+```bash
+python3 ontodl.py samples/*.ontodl -f dot -f prolog -f owl -f json --output-dir out
+python3 ontodl.py samples/*.ontodl -f dot --output-dir out --jobs 4 # 0 = one per CPU
+```
+
+Write each triple as soon as it is parsed instead of keeping the whole
+ontology in memory. The output is the same, but it may be left incomplete
+when the input has errors:
+
+```bash
+python3 ontodl.py samples/ontodl_sample1.ontodl --format owl --stream
+python3 ontodl.py samples/ontodl_sample1.ontodl --format prolog --stream --lexer fast
+```
+
+Keep the compiled outputs in `~/.cache/ontodl/outputs` (or `$ONTODL_CACHE_DIR/outputs`)
+and serve them again while the source, the format and the compiler are the
+same. The least recently used outputs are removed past `--cache-size` MB:
+
+```bash
+python3 ontodl.py samples/ontodl_sample1.ontodl --format owl --cache
+python3 ontodl.py samples/ontodl_sample1.ontodl --format owl --cache-stats --cache-size 64
+```
+
+Keep a compiler running and send it JSON requests, one per line, from stdin
+or from a local socket. The tables are loaded once per worker and requests
+are compiled concurrently; each response has the `id` of its request and
+either the `output`, the `errors` or an `error`:
+
+```bash
+echo '{"id": 1, "source": "Ontology T concepts {a} individuals {b} relations {} triples {b = iof => a;}.", "format": "owl"}' \\
+  | python3 ontodl.py --serve --jobs 2
+python3 ontodl.py --serve /tmp/ontodl.sock --jobs 0 # stop with Ctrl+C
+```
+
+Send `{"stats": true}` to get the number of requests and the p50/p99
+latency, which are also printed when the server stops.
+
+Find where a compilation spends its time. The table building, lexing,
+parsing, validation, output and every grammar rule are timed apart, and
+nothing is measured without `--profile`:
+
+```bash
+python3 ontodl.py samples/ontodl_sample1.ontodl --format owl --profile
+python3 ontodl.py samples/ontodl_sample1.ontodl --format owl --profile profile.json --profile-memory
+```
+
+Add the facts implied by the `isa` hierarchy before writing the output: every
+individual is also an instance of the ancestors of its concepts, and every
+concept a subclass of all its ancestors. Inferred triples carry no attributes,
+and `--stream` is not supported:
+
+```bash
+python3 ontodl.py samples/ontodl_sample4.ontodl --format prolog --materialize
+```
+
+Print the triples matching a pattern instead of an output format. Each part of
+the pattern is a name or `?`, and the triples are looked up in an index by
+subject and by object, so no query scans the whole ontology unless both are `?`:
+
+```bash
+python3 ontodl.py samples/ontodl_sample4.ontodl --query '? = iof => LinguagemNova'
+python3 ontodl.py samples/ontodl_sample4.ontodl --query 'Go = ? => ?' --materialize
+```
+
+Report every syntax and semantic error with its line and column instead of
+stopping at the first one (at most 100 errors by default):
+
+```bash
+python3 ontodl.py samples/ontodl_sample1.ontodl --all-errors
+python3 ontodl.py samples/ontodl_sample1.ontodl --all-errors --max-errors 10
+```
+
+Save the parsed ontology as a binary snapshot and load it back later without
+parsing again. A snapshot can be used as input wherever a source file is
+accepted, except with `--tokenize` and the `log` and `dot:experimental` formats:
+
+```bash
+python3 ontodl.py samples/ontodl_sample1.ontodl --format snapshot --output sample1.ontosnap
+python3 ontodl.py sample1.ontosnap --format owl
+```
+
+Export the graph as NumPy arrays (requires numpy) instead of text. Every name
+gets an integer id, and the triples become `subjects`, `relations` and
+`objects` id arrays. They are sorted by relation, and `relation_offsets`
+delimits each relation. The `.npz` is stored without compression, so
+`ontodl.load_arrays` maps its arrays without reading them, and
+`ontodl.relation_rows` gives the CSR rows of one relation:
+
+```bash
+python3 ontodl.py samples/ontodl_sample1.ontodl --format npz --output sample1.npz
+python3 -c "import ontodl; print(ontodl.load_arrays('sample1.npz')['relation_offsets'])"
+```
+
 Looks for the tokenization of the input:
 
 ```bash
@@ -46,6 +142,21 @@ python3 ontodl.py samples/ontodl_sample1.ontodl --tokenize
 python3 ontodl.py samples/ontodl_sample2.ontodl --tokenize
 ```
 
+Use `--lexer fast` to tokenize with a single compiled scanner instead of the
+PLY lexer. Both produce the same tokens, but the fast lexer reads the input
+file in chunks instead of loading it whole, which keeps the memory low for
+very large files. Only `-f dot:experimental`, whose single pass parser reads
+the source twice, and cached outputs of standard input still load it whole:
+
+```bash
+python3 ontodl.py samples/ontodl_sample1.ontodl --lexer fast
+python3 ontodl.py samples/*.ontodl -f dot --output-dir out --lexer fast
+```
+
+The lexer and parser tables are built once and cached in `~/.cache/ontodl`
+(set `ONTODL_CACHE_DIR` to use another directory). The cache is versioned, so
+it is rebuilt automatically when the grammar changes.
+
 # The ONTODL Syntax
 
 The syntax of ONTODL is:
@@ -110,9 +221,15 @@ id              : ID
 - NUMBER accepts integers, floats, and scientific notation.
 - DATE accepts date, datetime (with T or space separation), and ISO 8601 date format
 - ONTOLOGY, CONCEPTS, INDIVIDUALS, RELATIONS, and TRIPLES allows english or portuguese literals.
+- An `iof` triple sets the attributes of its concept and the ones inherited through `isa`.
+  An attribute declared by the concept wins over an inherited one, and the parents are
+  searched in the order of their `isa` triples. With `--stream` and `dot:experimental` only
+  the `isa` triples before the `iof` triple count.
 '''
 
+import os
 import sys
+import types
 
 tokens = ('ONTOLOGY', 'CONCEPTS', 'INDIVIDUALS', 'RELATIONS', 'TRIPLES',
           'TYPES', 'ID', 'NUMBER', 'BOOLEAN', 'STRING', 'DATE', 'IMPLIES', 'COMMENT')
@@ -194,137 +311,125 @@ def t_error(t):
 t_ignore = ' \t\r\n'
 
 
-def create_lexer():
+def create_lexer(cache=True, engine='ply'):
+    if engine == 'fast':
+        return FastLexer()
+    if engine != 'ply':
+        raise Exception(f'Unknown lexer engine: {engine}')
     from ply.lex import lex
-    return lex()
+    if not cache:
+        return lex()
+    if 'lexer' not in _tables:
+        _tables['lexer'] = load_lexer()
+    return _tables['lexer'].clone()
 
 # Root
 
 
 def p_root(p):
     '''root : ontology concepts individuals relations triples end '''
-    p.parser.accept('root', p)
 
 
 def p_end(p):
     '''end : '.' '''
-    p.parser.accept('end', p)
 
 # Ontology
 
 
 def p_ontology(p):
     '''ontology : ONTOLOGY id '''
-    p.parser.accept('ontology', p)
 
 # Concepts
 
 
 def p_concepts(p):
     '''concepts : CONCEPTS '{' concept_list '}' '''
-    p.parser.accept('concepts', p)
 
 
 def p_concept_list(p):
     '''concept_list : concept_list ',' concept
                     | concept
                     |'''
-    p.parser.accept('concept_list', p)
 
 
 def p_concept(p):
     '''concept : id '[' attribute_list ']'
                 | id
     '''
-    p.parser.accept('concept', p)
 
 
 def p_attribute_list(p):
     '''attribute_list : attribute_list ',' attribute
                       | attribute
                       |'''
-    p.parser.accept('attribute_list', p)
 
 
 def p_attribute(p):
     '''attribute : id ':' type'''
-    p.parser.accept('attribute', p)
 
 # Individuals
 
 
 def p_individuals(p):
     '''individuals : INDIVIDUALS '{' individual_list '}' '''
-    p.parser.accept('individuals', p)
 
 
 def p_individual_list(p):
     '''individual_list : individual_list ',' individual
                        | individual
                        |'''
-    p.parser.accept('individual_list', p)
 
 
 def p_individual(p):
     '''individual : id'''
-    p.parser.accept('individual', p)
 
 # Relations
 
 
 def p_relations(p):
     '''relations : RELATIONS '{' relation_list '}' '''
-    p.parser.accept('relations', p)
 
 
 def p_relation_list(p):
     '''relation_list : relation_list ',' relation
                      | relation
                      |'''
-    p.parser.accept('relation_list', p)
 
 
 def p_relation(p):
     '''relation : id'''
-    p.parser.accept('relation', p)
 
 # Triples
 
 
 def p_triples(p):
     '''triples : TRIPLES '{' triple_list '}' '''
-    p.parser.accept('triples', p)
 
 
 def p_triple_list(p):
     '''triple_list : triple_list triple
                    | triple
                    |'''
-    p.parser.accept('triple_list', p)
 
 
 def p_triple(p):
     '''triple : id '=' id IMPLIES entity ';' '''
-    p.parser.accept('triple', p)
 
 
 def p_entity(p):
     '''entity : id '[' properties_list ']'
               | id
     '''
-    p.parser.accept('entity', p)
 
 
 def p_properties_list(p):
     '''properties_list : properties_list ',' property
                        | property
                        |'''
-    p.parser.accept('properties_list', p)
 
 
 def p_property(p):
     '''property : id '=' value'''
-    p.parser.accept('property', p)
 
 
 def p_value(p):
@@ -333,40 +438,52 @@ def p_value(p):
              | string
              | date
     '''
-    p.parser.accept('value', p)
 
 # Atoms
 
 
 def p_number(p):
     '''number : NUMBER'''
-    p.parser.accept('number', p)
 
 
 def p_boolean(p):
     '''boolean : BOOLEAN'''
-    p.parser.accept('boolean', p)
 
 
 def p_string(p):
     '''string : STRING'''
-    p.parser.accept('string', p)
 
 
 def p_date(p):
     '''date : DATE'''
-    p.parser.accept('date', p)
 
 
 def p_type(p):
     '''type : TYPES'''
-    p.parser.accept('type', p)
 
 
 def p_id(p):
     '''id : ID
         | STRING'''
-    p.parser.accept('id', p)
+
+
+# Error recovery
+
+
+def p_concepts_error(p):
+    '''concepts : CONCEPTS '{' error '}' '''
+
+
+def p_individuals_error(p):
+    '''individuals : INDIVIDUALS '{' error '}' '''
+
+
+def p_relations_error(p):
+    '''relations : RELATIONS '{' error '}' '''
+
+
+def p_triple_error(p):
+    '''triple : error ';' '''
 
 
 def p_error(p):
@@ -376,594 +493,3212 @@ def p_error(p):
         raise Exception("Syntax error at EOF")
 
 
-def create_parser(out='log'):
-    def accept_log(name, p):
-        p[0] = p[1:]
-        print(name, p[0])
+# Tables cache
 
-    def complete_log():
-        return ""
-
-    def validate_json(json):
-        builtin_relations = ['isa', 'iof']
-        for relation in json['relations']:
-            if relation in builtin_relations:
-                raise Exception(f"Relation '{relation}' is a builtin relation")
-        # Individual, relation and concept must have disjoint keys
-        parts = ['individuals', 'relations', 'concepts']
-        keys_count = 0
-        all_keys = set()
-        for part in parts:
-            if isinstance(json[part], dict):
-                all_keys |= json[part].keys()
-                keys_count += len(json[part].keys())
-            else:
-                all_keys |= set(json[part])
-                keys_count += len(json[part])
-        if len(all_keys) != keys_count:
-            raise Exception(
-                f"Individual, relation and concept have overlapping keys")
-
-        all_relations = builtin_relations + json['relations']
-
-        for triple in json['triples']:
-            if triple['relation'] != 'iof':
-                if len(triple['properties']) > 0:
-                    raise Exception(
-                        "Only relation 'iof' must have properties.")
-            # Relations 'isa' must have concepts as arguments without properties
-            if triple['relation'] == 'isa':
-                relation = f"{triple['individual']} = isa => {triple['concept']}"
-                if triple['concept'] not in json['concepts']:
-                    raise Exception(
-                        "Relation 'isa' of must have only concepts.")
-                if triple['individual'] not in json['concepts']:
-                    raise Exception(
-                        "Relation 'isa' of must have only concepts.")
-                continue
-            if triple['relation'] == 'iof':
-                if triple['individual'] not in json['individuals']:
-                    raise Exception(
-                        "Relation 'iof' must have an individual as the 1st argument.")
-                if triple['concept'] not in json['concepts']:
-                    raise Exception(
-                        "Relation 'iof' must have a concepts as the 2nd argument.")
-                concept_name = triple['concept']
-                concept = json['concepts'][concept_name]
-                properties = triple['properties']
-                for prop, typ in properties.items():
-                    typ = typ[1]
-                    if prop not in concept:
-                        raise Exception(
-                            f"Property '{concept_name}.{prop}' is not defined in concept")
-                    if typ != concept[prop]:
-                        raise Exception(
-                            f"Property '{concept_name}.{prop}' is of type '{concept[prop]}', but got type '{typ}' in triple")
-                # Properties must be defined in triple
-                for prop, typ in concept.items():
-                    if prop not in properties:
-                        raise Exception(
-                            f"Property '{concept_name}.{prop}' is not defined in triple")
-                continue
-            # Individual must be defined
-            individual_defined = triple['individual'] in json['individuals'] or triple['individual'] in json['concepts']
-            if not individual_defined:
-                raise Exception(
-                    f"Individual '{triple['individual']}' is not defined")
-            # Relation must be defined
-            if triple['relation'] not in all_relations:
-                raise Exception(
-                    f"Relation '{triple['relation']}' is not defined")
-            # Concept must be defined
-            concept_defined = triple['concept'] in json['concepts'] or triple['concept'] in json['individuals']
-            if not concept_defined:
-                raise Exception(
-                    f"Concept '{triple['concept']}' is not defined")
-
-    def accept_json(name, p):
-        if name == 'root':
-            p.parser.result = {
-                'ontology': p[1],
-                'concepts': p[2],
-                'individuals': p[3],
-                'relations': p[4],
-                'triples': p[5]
-            }
-        elif name == 'end':
+_tables = {}
+
+
+def grammar_version():
+    if 'version' in _tables:
+        return _tables['version']
+    import hashlib
+    import ply
+    module = sys.modules[__name__]
+    rules = [getattr(module, k) for k in dir(module)
+             if k.startswith('t_') or k.startswith('p_')]
+    rules = [f for f in rules if callable(f)]
+    rules.sort(key=lambda f: f.__code__.co_firstlineno)
+    source = [ply.__version__, repr(tokens), repr(literals), repr(t_ignore)]
+    source += [f'{f.__name__}:{f.__doc__}' for f in rules]
+    digest = hashlib.sha1('\n'.join(source).encode('utf-8')).hexdigest()
+    _tables['version'] = digest[:12]
+    return _tables['version']
+
+
+def cache_dir():
+    return os.environ.get('ONTODL_CACHE_DIR') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'ontodl')
+
+
+def cache_path(kind, extension):
+    return os.path.join(cache_dir(), f'ontodl_{kind}_{grammar_version()}{extension}')
+
+
+def write_cache_file(path, write):
+    # Write to a private file first so concurrent readers never see a
+    # partially written table
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f'{path}.{os.getpid()}.tmp'
+        with open(temp, 'wb') as file:
+            write(file)
+        os.replace(temp, path)
+    except OSError:
+        pass
+
+
+def load_lexer():
+    import importlib.util
+    from ply.lex import lex
+    module = sys.modules[__name__]
+    path = cache_path('lextab', '.py')
+    if os.path.exists(path):
+        try:
+            spec = importlib.util.spec_from_file_location(
+                os.path.basename(path)[:-3], path)
+            lextab = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(lextab)
+            return lex(module=module, optimize=True, lextab=lextab)
+        except Exception:
             pass
-        # Ontology
-        elif name == 'ontology':
-            p[0] = p[2]
-        # Concepts
-        elif name == 'concepts':
-            p[0] = dict(p[3])
-        elif name == 'concept_list':
-            if len(p) == 4:
-                p[0] = p[1] + [p[3]]
-            elif len(p) == 2:
-                p[0] = [p[1]]
-            else:
-                p[0] = []
-        elif name == 'concept':
-            if len(p) == 5:
-                p[0] = [p[1], dict(p[3])]
-            elif len(p) == 2:
-                p[0] = [p[1], {}]
-        elif name == 'attribute_list':
-            if len(p) == 4:
-                p[0] = p[1] + [p[3]]
-            elif len(p) == 2:
-                p[0] = [p[1]]
-            else:
-                p[0] = []
-        elif name == 'attribute':
-            p[0] = [p[1], p[3]]
-        # Individuals
-        elif name == 'individuals':
-            p[0] = p[3]
-        elif name == 'individual_list':
-            if len(p) == 4:
-                p[0] = p[1] + [p[3]]
-            elif len(p) == 2:
-                p[0] = [p[1]]
-            else:
-                p[0] = []
-        elif name == 'individual':
-            p[0] = p[1]
-        # Relations
-        elif name == 'relations':
-            p[0] = p[3]
-        elif name == 'relation_list':
-            if len(p) == 4:
-                p[0] = p[1] + [p[3]]
-            elif len(p) == 2:
-                p[0] = [p[1]]
+
+    lexer = lex(module=module)
+
+    def write(file):
+        import tempfile
+        with tempfile.TemporaryDirectory() as directory:
+            lexer.writetab('lextab', directory)
+            with open(os.path.join(directory, 'lextab.py'), 'rb') as tab:
+                file.write(tab.read())
+    write_cache_file(path, write)
+    return lexer
+
+
+def load_parser():
+    import pickle
+    from ply.yacc import LRParser, LRTable, MiniProduction, yacc
+    module = sys.modules[__name__]
+    path = cache_path('parsetab', '.pickle')
+    if os.path.exists(path):
+        try:
+            with open(path, 'rb') as file:
+                action, goto, productions = pickle.load(file)
+            table = LRTable()
+            table.lr_action = action
+            table.lr_goto = goto
+            table.lr_productions = [MiniProduction(*it) for it in productions]
+            table.bind_callables(vars(module))
+            return LRParser(table, p_error)
+        except Exception:
+            pass
+
+    parser = yacc(module=module, debug=False, write_tables=False)
+    productions = [(str(p), p.name, p.len, p.func, p.file, p.line)
+                   for p in parser.productions]
+
+    def write(file):
+        pickle.dump((parser.action, parser.goto, productions), file)
+    write_cache_file(path, write)
+    return parser
+
+
+# Fast lexer
+
+LEXER_ENGINES = ('ply', 'fast')
+
+CHUNK_SIZE = 1 << 20
+
+
+def read_chunks(file, size=CHUNK_SIZE):
+    import io
+    if isinstance(file, io.TextIOBase):
+        yield from iter(lambda: file.read(size), '')
+        return
+    # Bytes are decoded incrementally, so a character split between two
+    # reads is completed by the next one. Newlines are translated as text
+    # files do.
+    import codecs
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder('utf-8')(), translate=True)
+    while chunk := file.read(size):
+        if text := decoder.decode(chunk):
+            yield text
+    if text := decoder.decode(b'', final=True):
+        yield text
+
+
+class Token:
+    __slots__ = ('type', 'value', 'lexpos', 'lexer')
+    # Like the PLY lexer, which has no rule that counts newlines
+    lineno = 1
+
+    def __init__(self, type, value, lexpos):
+        self.type = type
+        self.value = value
+        self.lexpos = lexpos
+
+    def __str__(self):
+        return f'LexToken({self.type},{self.value!r},{self.lineno},{self.lexpos})'
+
+    __repr__ = __str__
+
+
+class FastLexer:
+    # PLY tries the rules in order and keeps the first one that matches, so
+    # a keyword also matches the start of a longer identifier ('Ontologias'
+    # is ONTOLOGY followed by ID). Identifiers are matched once and their
+    # keyword prefix, if any, is found in a table.
+    keywords = {}
+    scanner = None
+    newline = None
+    # Longer than any token that can be cut short by the end of a chunk
+    # and still leave a shorter match, as a DATE read as a NUMBER
+    margin = 64
+
+    def __init__(self):
+        if FastLexer.scanner is None:
+            FastLexer.compile()
+        self.lexdata = ''
+        self.lexpos = 0
+        self.lineno = 1
+        self.line_starts = None
+        self.tokens = iter(())
+
+    @staticmethod
+    def compile():
+        import re
+        module = sys.modules[__name__]
+        rules = ['ONTOLOGY', 'CONCEPTS', 'INDIVIDUALS', 'RELATIONS', 'TRIPLES',
+                 'TYPES', 'BOOLEAN']
+        for rule in rules:
+            for word in getattr(module, f't_{rule}').__doc__.strip('()').split('|'):
+                FastLexer.keywords.setdefault(word[0], []).append((word, rule))
+
+        patterns = [(rule, getattr(module, f't_{rule}').__doc__)
+                    for rule in ['ID', 'DATE', 'NUMBER', 'STRING', 'IMPLIES', 'COMMENT']]
+        patterns.append(('literal', '[' + re.escape(''.join(literals)) + ']'))
+        FastLexer.newline = re.compile('\n')
+        FastLexer.scanner = re.compile(
+            '[' + re.escape(t_ignore) + ']*(?:' +
+            '|'.join(f'(?P<{rule}>{pattern})' for rule, pattern in patterns) + ')')
+
+    def input(self, data):
+        self.lexdata = data
+        self.start([data])
+
+    def input_file(self, file, chunk_size=CHUNK_SIZE, track_lines=False):
+        # The input is never held as a whole, so error positions are found
+        # from the line starts recorded while reading
+        self.lexdata = None
+        self.start(read_chunks(file, chunk_size), track_lines)
+
+    def start(self, chunks, track_lines=False):
+        import functools
+        from array import array
+        self.lexpos = 0
+        self.line_starts = array('q', [0]) if track_lines else None
+        self.tokens = self.scan(iter(chunks))
+        self.token = functools.partial(next, self.tokens, None)
+
+    def illegal(self, text):
+        for char in text:
+            if char not in t_ignore:
+                print("Illegal character '%s'" % char)
+
+    def scan(self, chunks):
+        finditer = self.scanner.finditer
+        keywords = self.keywords
+        data = ''
+        base = 0
+        pos = 0
+        done = False
+        while True:
+            # A match close to the end of the buffer may be cut short, and a
+            # '"' that matches nothing may be a string that is not complete
+            # yet, so both wait for the next chunk
+            limit = len(data) if done else len(data) - self.margin
+            refill = True
+            for m in finditer(data, pos):
+                if m.start() != pos:
+                    if not done and '"' in data[pos:m.start()]:
+                        break
+                    # finditer skips what no rule matches, PLY reports it one
+                    # character at a time
+                    self.illegal(data[pos:m.start()])
+                if m.end() > limit:
+                    pos = m.start()
+                    break
+                rule = m.lastgroup
+                if rule == 'COMMENT':
+                    pos = m.end()
+                    continue
+                value = m.group(rule)
+                start = m.start(rule)
+                if rule == 'ID':
+                    for word, keyword in keywords.get(value[0], ()):
+                        if value.startswith(word):
+                            value, rule = word, keyword
+                            break
+                elif rule == 'literal':
+                    rule = value
+                pos = start + len(value)
+                self.lexpos = base + pos
+                yield Token(rule, value, base + start)
+                if pos != m.end():
+                    # The rest of an identifier that starts with a keyword
+                    refill = False
+                    break
             else:
-                p[0] = []
-        elif name == 'relation':
-            p[0] = p[1]
-        # Triples
-        elif name == 'triples':
-            p[0] = p[3]
-        elif name == 'triple_list':
-            if len(p) == 3:
-                p[0] = p[1] + [p[2]]
-            elif len(p) == 2:
-                p[0] = [p[1]]
+                if done:
+                    break
+            if refill:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    done = True
+                    continue
+                if self.line_starts is not None:
+                    offset = base + len(data)
+                    self.line_starts.extend(
+                        offset + m.end() for m in self.newline.finditer(chunk))
+                base += pos
+                data = data[pos:] + chunk
+                pos = 0
+        self.illegal(data[pos:])
+        self.lexpos = base + len(data)
+
+    def token(self):
+        return None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        token = self.token()
+        if token is None:
+            raise StopIteration
+        return token
+
+    next = __next__
+
+
+# Diagnostics
+
+
+class OntologyError(Exception):
+    def __init__(self, message, line=None, column=None):
+        super().__init__(message)
+        self.message = message
+        self.line = line
+        self.column = column
+
+    def format(self, filename=None):
+        location = [str(it) for it in (filename, self.line, self.column) if it]
+        return ':'.join(location + [f' {self.message}']).strip()
+
+
+class OntologyErrors(Exception):
+    def __init__(self, errors, truncated=False):
+        super().__init__(errors, truncated)
+        self.errors = errors
+        self.truncated = truncated
+
+    def __str__(self):
+        return self.format()
+
+    def format(self, filename=None):
+        lines = [error.format(filename) for error in self.errors]
+        if self.truncated:
+            lines.append(f'Too many errors, stopped after {len(self.errors)}.')
+        return '\n'.join(lines)
+
+
+class Diagnostics:
+    def __init__(self, collect=False, max_errors=None):
+        self.collect = collect
+        self.max_errors = max_errors
+        self.errors = []
+        self.source = ''
+        self.stream = None
+        self.line_starts = None
+
+    def end(self):
+        if self.stream is not None:
+            return self.stream.lexpos
+        return len(self.source)
+
+    def position(self, lexpos):
+        if lexpos is None:
+            return None, None
+        if self.stream is not None:
+            self.line_starts = self.stream.line_starts
+        if self.line_starts is None:
+            import re
+            self.line_starts = [0]
+            self.line_starts += [m.end() for m in re.finditer('\n', self.source)]
+        import bisect
+        line = bisect.bisect_right(self.line_starts, lexpos)
+        return line, lexpos - self.line_starts[line - 1] + 1
+
+    def report(self, message, lexpos=None):
+        # Raise on the first error unless every error must be collected
+        if not self.collect:
+            raise OntologyError(message)
+        # An error past the cap is dropped, and marks the ones kept as truncated
+        if self.max_errors and len(self.errors) >= self.max_errors:
+            self.check(truncated=True)
+        self.errors.append(OntologyError(message, *self.position(lexpos)))
+
+    def check(self, truncated=False):
+        if self.errors:
+            self.errors.sort(key=lambda e: (e.line or 0, e.column or 0))
+            raise OntologyErrors(self.errors, truncated)
+
+
+# Model
+
+# Shared by every triple without properties, so it must never be mutated
+EMPTY_PROPERTIES = types.MappingProxyType({})
+
+
+class Concept:
+    __slots__ = ('name', 'attributes')
+
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.attributes = attributes if attributes is not None else {}
+
+    def __eq__(self, other):
+        return (isinstance(other, Concept) and self.name == other.name
+                and self.attributes == other.attributes)
+
+    def __repr__(self):
+        return f'Concept({self.name!r}, {self.attributes!r})'
+
+
+class Value:
+    __slots__ = ('text', 'type')
+
+    def __init__(self, text, type):
+        self.text = text
+        self.type = type
+
+    def __eq__(self, other):
+        return (isinstance(other, Value) and self.text == other.text
+                and self.type == other.type)
+
+    def __repr__(self):
+        return f'Value({self.text!r}, {self.type!r})'
+
+
+class Triple:
+    __slots__ = ('individual', 'relation', 'concept', 'properties')
+
+    def __init__(self, individual, relation, concept, properties=EMPTY_PROPERTIES):
+        self.individual = individual
+        self.relation = relation
+        self.concept = concept
+        self.properties = properties
+
+    def __eq__(self, other):
+        return (isinstance(other, Triple) and self.individual == other.individual
+                and self.relation == other.relation and self.concept == other.concept
+                and self.properties == other.properties)
+
+    def __repr__(self):
+        return f'Triple({self.individual!r}, {self.relation!r}, {self.concept!r}, {self.properties!r})'
+
+
+class Ontology:
+    __slots__ = ('name', 'concepts', 'individuals', 'relations', 'triples')
+
+    def __init__(self, name, concepts=None, individuals=None, relations=None, triples=None):
+        self.name = name
+        self.concepts = concepts if concepts is not None else {}
+        self.individuals = individuals if individuals is not None else []
+        self.relations = relations if relations is not None else []
+        self.triples = triples if triples is not None else []
+
+    def __eq__(self, other):
+        return isinstance(other, Ontology) and self.to_json() == other.to_json()
+
+    def __repr__(self):
+        return (f'Ontology({self.name!r}, {len(self.concepts)} concepts, '
+                f'{len(self.individuals)} individuals, {len(self.relations)} relations, '
+                f'{len(self.triples)} triples)')
+
+    def to_json(self):
+        return {
+            'ontology': self.name,
+            'concepts': {name: dict(concept.attributes)
+                         for name, concept in self.concepts.items()},
+            'individuals': list(self.individuals),
+            'relations': list(self.relations),
+            'triples': [{
+                'individual': triple.individual,
+                'relation': triple.relation,
+                'concept': triple.concept,
+                'properties': {key: [value.text, value.type]
+                               for key, value in triple.properties.items()},
+            } for triple in self.triples],
+        }
+
+    @classmethod
+    def from_json(cls, json):
+        return cls(
+            json['ontology'],
+            {name: Concept(name, dict(attributes))
+             for name, attributes in json['concepts'].items()},
+            list(json['individuals']),
+            list(json['relations']),
+            [Triple(sys.intern(triple['individual']), sys.intern(triple['relation']),
+                    sys.intern(triple['concept']),
+                    {sys.intern(key): Value(*value)
+                     for key, value in triple['properties'].items()} or EMPTY_PROPERTIES)
+             for triple in json['triples']],
+        )
+
+
+# Validation
+
+BUILTIN_RELATIONS = ('isa', 'iof')
+
+
+def build_symbol_table(ontology, diagnostics=None, positions=None):
+    diagnostics = diagnostics or Diagnostics()
+    names = positions['names'] if positions else {}
+    for relation in ontology.relations:
+        if relation in BUILTIN_RELATIONS:
+            diagnostics.report(
+                f"Relation '{relation}' is a builtin relation", names.get(relation))
+    # Individual, relation and concept must have disjoint keys
+    symbols = {}
+    parts = [('individual', ontology.individuals), ('relation', ontology.relations),
+             ('concept', ontology.concepts)]
+    for kind, part in parts:
+        for name in part:
+            if name in symbols:
+                diagnostics.report(
+                    f"Individual, relation and concept have overlapping keys", names.get(name))
+            symbols[name] = kind
+    return symbols
+
+
+class Schemas:
+    # The attributes of every concept together with the ones it inherits
+    # through 'isa': its own come first, then those of its parents in the
+    # order of their 'isa' triples. A schema is built on the first triple
+    # that needs it and only after the schemas of all the ancestors, so a
+    # new edge drops the schemas of the child and of its cached
+    # descendants and nothing else.
+    def __init__(self, attributes, edges=()):
+        self.attributes = attributes
+        self.parents = {}
+        self.children = {}
+        self.cache = {}
+        for child, parent in edges:
+            self.add(child, parent)
+
+    @classmethod
+    def from_concepts(cls, concepts, edges=()):
+        return cls({name: concept.attributes for name, concept in concepts.items()}, edges)
+
+    @classmethod
+    def from_ontology(cls, ontology):
+        return cls.from_concepts(ontology.concepts, ((triple.individual, triple.concept)
+                                                     for triple in ontology.triples
+                                                     if triple.relation == 'isa'))
+
+    def add(self, child, parent):
+        if child not in self.attributes or parent not in self.attributes:
+            return
+        self.parents.setdefault(child, []).append(parent)
+        self.children.setdefault(parent, []).append(child)
+        stack = [child]
+        while stack:
+            node = stack.pop()
+            if self.cache.pop(node, None) is not None:
+                stack.extend(self.children.get(node, ()))
+
+    def get(self, concept):
+        schema = self.cache.get(concept)
+        if schema is None:
+            schema = self.build(concept)
+        return schema
+
+    def build(self, concept):
+        # Without recursion, so a deep chain of 'isa' does not reach the
+        # recursion limit. A parent met again on the path is in a cycle,
+        # which is reported apart, and adds nothing.
+        cache = self.cache
+        parents = self.parents
+        stack = [concept]
+        visiting = set()
+        while stack:
+            node = stack[-1]
+            if node in cache:
+                stack.pop()
+            elif node not in visiting:
+                visiting.add(node)
+                stack.extend(it for it in parents.get(node, ())
+                             if it not in cache and it not in visiting)
             else:
-                p[0] = []
-        elif name == 'triple':
-            p[0] = {
-                'individual': p[1],
-                'relation': p[3],
-                'concept': p[5]['concept'],
-                'properties': p[5]['properties'],
-            }
-        elif name == 'entity':
-            if len(p) == 5:
-                p[0] = {"concept": p[1], "properties": dict(p[3])}
-            elif len(p) == 2:
-                p[0] = {"concept": p[1], "properties": {}}
-        elif name == 'properties_list':
-            if len(p) == 4:
-                p[0] = p[1] + [p[3]]
-            elif len(p) == 2:
-                p[0] = [p[1]]
+                stack.pop()
+                schema = self.attributes[node]
+                if node in parents:
+                    schema = dict(schema)
+                    for parent in parents[node]:
+                        for name, type in cache.get(parent, {}).items():
+                            schema.setdefault(name, type)
+                cache[node] = schema
+        return cache[concept]
+
+
+def check_triple(triple, symbols, schemas):
+    relation = triple.relation
+    if relation != 'iof':
+        if len(triple.properties) > 0:
+            return "Only relation 'iof' must have properties."
+    individual_kind = symbols.get(triple.individual)
+    concept_kind = symbols.get(triple.concept)
+    # Relations 'isa' must have concepts as arguments without properties
+    if relation == 'isa':
+        if concept_kind != 'concept' or individual_kind != 'concept':
+            return "Relation 'isa' of must have only concepts."
+        return None
+    if relation == 'iof':
+        if individual_kind != 'individual':
+            return "Relation 'iof' must have an individual as the 1st argument."
+        if concept_kind != 'concept':
+            return "Relation 'iof' must have a concepts as the 2nd argument."
+        concept_name = triple.concept
+        attributes = schemas.get(concept_name)
+        properties = triple.properties
+        for prop, value in properties.items():
+            if prop not in attributes:
+                return f"Property '{concept_name}.{prop}' is not defined in concept"
+            if value.type != attributes[prop]:
+                return f"Property '{concept_name}.{prop}' is of type '{attributes[prop]}', but got type '{value.type}' in triple"
+        # Properties must be defined in triple
+        if len(properties) != len(attributes):
+            for prop in attributes:
+                if prop not in properties:
+                    return f"Property '{concept_name}.{prop}' is not defined in triple"
+        return None
+    # Individual must be defined
+    if individual_kind != 'individual' and individual_kind != 'concept':
+        return f"Individual '{triple.individual}' is not defined"
+    # Relation must be defined
+    if symbols.get(relation) != 'relation':
+        return f"Relation '{relation}' is not defined"
+    # Concept must be defined
+    if concept_kind != 'concept' and concept_kind != 'individual':
+        return f"Concept '{triple.concept}' is not defined"
+    return None
+
+
+def validate_ontology(ontology, diagnostics=None, positions=None):
+    diagnostics = diagnostics or Diagnostics()
+    symbols = build_symbol_table(ontology, diagnostics, positions)
+    concepts = ontology.concepts
+    # Every 'isa' triple counts for the properties, even the ones after
+    schemas = Schemas.from_ontology(ontology)
+    triple_positions = positions['triples'] if positions else None
+    edges = []
+    for index, triple in enumerate(ontology.triples):
+        error = check_triple(triple, symbols, schemas)
+        if error:
+            diagnostics.report(
+                error, triple_positions[index] if triple_positions else None)
+        elif triple.relation == 'isa':
+            edges.append((triple.individual, triple.concept,
+                          triple_positions[index] if triple_positions else None))
+    if edges:
+        error, position = check_hierarchy(concepts, edges)
+        if error:
+            diagnostics.report(error, position)
+
+
+# Hierarchy
+
+class Hierarchy:
+    # The concepts ordered by 'isa', parents before children. Ancestry is
+    # answered with interval labels: a depth first search over one parent
+    # of each concept numbers the concepts in preorder, so the descendants
+    # of a concept in that tree are the interval [pre, post), and each
+    # concept keeps the merged intervals of all its descendants. A tree
+    # needs one interval per concept; the other parents only add the
+    # intervals that do not overlap, searched with bisect. Dense hierarchies
+    # can need many intervals per concept, so labeling stops at a budget:
+    # the concepts above it, the closest to the roots, are searched down to
+    # their labeled descendants instead.
+    interval_budget = 32
+
+    def __init__(self, concepts, edges):
+        self.names = list(concepts)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.parents = [[] for _ in self.names]
+        self.children = [[] for _ in self.names]
+        for child, parent in edges:
+            child = self.index.get(child)
+            parent = self.index.get(parent)
+            if child is not None and parent is not None:
+                self.parents[child].append(parent)
+                self.children[parent].append(child)
+        self.order, self.cycle = self.sort()
+        self.pre = None
+
+    @classmethod
+    def from_ontology(cls, ontology):
+        return cls(ontology.concepts, ((triple.individual, triple.concept)
+                                       for triple in ontology.triples
+                                       if triple.relation == 'isa'))
+
+    def sort(self):
+        # Kahn's algorithm, the concepts left over have a parent in a cycle
+        degrees = [len(it) for it in self.parents]
+        order = [i for i, degree in enumerate(degrees) if degree == 0]
+        for node in order:
+            for child in self.children[node]:
+                degrees[child] -= 1
+                if degrees[child] == 0:
+                    order.append(child)
+        if len(order) == len(self.names):
+            return order, None
+        # Going up through parents that are left over must close a cycle
+        node = next(i for i, degree in enumerate(degrees) if degree)
+        seen = {}
+        path = []
+        while node not in seen:
+            seen[node] = len(path)
+            path.append(node)
+            node = next(it for it in self.parents[node] if degrees[it])
+        cycle = path[seen[node]:] + [node]
+        return order, [self.names[it] for it in cycle]
+
+    def label(self):
+        from array import array
+        count = len(self.names)
+        pre = [-1] * count
+        post = [-1] * count
+        # The tree keeps the deepest parent of each concept, whose interval
+        # already holds most of the ancestors the other parents would add
+        depth = [0] * count
+        tree = [[] for _ in range(count)]
+        for node in self.order:
+            parents = self.parents[node]
+            if parents:
+                parent = max(parents, key=depth.__getitem__)
+                depth[node] = depth[parent] + 1
+                tree[parent].append(node)
+        counter = 0
+        for root in self.order:
+            if self.parents[root]:
+                continue
+            pre[root] = counter
+            counter += 1
+            stack = [(root, iter(tree[root]))]
+            while stack:
+                node, children = stack[-1]
+                for child in children:
+                    pre[child] = counter
+                    counter += 1
+                    stack.append((child, iter(tree[child])))
+                    break
+                else:
+                    post[node] = counter
+                    stack.pop()
+
+        # Children come after their parents, so going backwards every
+        # concept merges intervals that are already complete. The concepts
+        # left when the budget runs out come first in the order, so their
+        # parents are left out too.
+        intervals = [None] * count
+        budget = self.interval_budget * count
+        for node in reversed(self.order):
+            if budget < 0:
+                break
+            merged = [(pre[node], post[node])]
+            for child in self.children[node]:
+                child_intervals = intervals[child]
+                # Concepts under a cycle are not in the order nor labeled
+                if child_intervals is None:
+                    continue
+                if len(child_intervals) > 1 or not pre[node] <= child_intervals[0][0] < post[node]:
+                    merged.extend(child_intervals)
+            if len(merged) > 1:
+                merged.sort()
+                compact = [merged[0]]
+                for start, end in merged[1:]:
+                    if start <= compact[-1][1]:
+                        if end > compact[-1][1]:
+                            compact[-1] = (compact[-1][0], end)
+                    else:
+                        compact.append((start, end))
+                merged = compact
+            intervals[node] = merged
+            budget -= len(merged)
+
+        self.pre = array('q', pre)
+        # Concepts under a cycle come last, as they are never ancestors of
+        # the concepts in the order
+        self.position = array('q', [count] * count)
+        for i, node in enumerate(self.order):
+            self.position[node] = i
+        self.by_pre = array('q', [0] * counter)
+        for node in self.order:
+            self.by_pre[pre[node]] = node
+        self.offsets = array('q', [0])
+        self.starts = array('q')
+        self.ends = array('q')
+        for node in range(count):
+            for start, end in intervals[node] or ():
+                self.starts.append(start)
+                self.ends.append(end)
+            self.offsets.append(len(self.starts))
+
+    def labeled(self, node):
+        return self.offsets[node] < self.offsets[node + 1]
+
+    def contains(self, ancestor, node):
+        import bisect
+        position = self.pre[node]
+        first = self.offsets[ancestor]
+        last = self.offsets[ancestor + 1]
+        if last - first == 1:
+            return self.starts[first] <= position < self.ends[first]
+        i = bisect.bisect_right(self.starts, position, first, last) - 1
+        return i >= first and position < self.ends[i]
+
+    def reaches(self, ancestor, node):
+        # Searches down from a concept past the budget, asking the labels of
+        # the first labeled concepts met. Concepts after the node in the
+        # order cannot be its ancestors, so they are not searched.
+        limit = self.position[node]
+        seen = {ancestor}
+        stack = [ancestor]
+        while stack:
+            for child in self.children[stack.pop()]:
+                if child == node:
+                    return True
+                if child not in seen and self.position[child] < limit:
+                    seen.add(child)
+                    if not self.labeled(child):
+                        stack.append(child)
+                    elif self.contains(child, node):
+                        return True
+        return False
+
+    def reachable(self, node, edges):
+        seen = {node}
+        stack = [node]
+        while stack:
+            for other in edges[stack.pop()]:
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+        seen.discard(node)
+        return seen
+
+    def is_a(self, concept, ancestor):
+        node = self.index[concept]
+        other = self.index[ancestor]
+        if node == other:
+            return True
+        if self.pre is None:
+            self.label()
+        if self.pre[node] < 0 or self.pre[other] < 0:
+            # Concepts under a cycle are left out of the labels
+            return other in self.reachable(node, self.parents)
+        if not self.labeled(other):
+            return self.reaches(other, node)
+        return self.contains(other, node)
+
+    def ancestors(self, concept):
+        node = self.index[concept]
+        return [self.names[it] for it in sorted(self.reachable(node, self.parents))]
+
+    def descendants(self, concept):
+        node = self.index[concept]
+        if self.pre is None:
+            self.label()
+        if self.cycle is not None or not self.labeled(node):
+            # Concepts under a cycle or past the budget are left out of the labels
+            found = self.reachable(node, self.children)
+        else:
+            found = set()
+            for i in range(self.offsets[node], self.offsets[node + 1]):
+                found.update(self.by_pre[self.starts[i]:self.ends[i]])
+            found.discard(node)
+        return [self.names[it] for it in sorted(found)]
+
+
+def check_hierarchy(concepts, edges):
+    # Edges are (child, parent, position) of the valid 'isa' triples
+    cycle = Hierarchy(concepts, ((child, parent) for child, parent, _ in edges)).cycle
+    if cycle is None:
+        return None, None
+    position = next(position for child, parent, position in edges
+                    if child == cycle[0] and parent == cycle[1])
+    return cycle_message(cycle), position
+
+
+def cycle_message(cycle):
+    return f"Relation 'isa' forms a cycle: {' -> '.join(cycle)}"
+
+
+# Inference
+
+INFERENCE_ENGINES = ('python', 'numpy')
+
+# Below this many iof triples building the numpy arrays costs more than the
+# set unions it replaces
+NUMPY_INFERENCE_FROM = 30_000
+
+
+def pick_engine(engine, engines, kind):
+    # numpy is optional, its engine is the default whenever it is installed
+    if engine is None:
+        try:
+            import numpy  # noqa: F401
+            return 'numpy'
+        except ImportError:
+            return 'python'
+    if engine not in engines:
+        raise Exception(f'Unknown {kind} engine: {engine}')
+    return engine
+
+
+def iof_members_python(hierarchy, asserted):
+    # Every concept takes the members of its children once they are
+    # complete, a set union per isa edge instead of a walk per individual
+    members = {node: set(it) for node, it in asserted.items()}
+    for node in reversed(hierarchy.order):
+        found = members.get(node)
+        if found:
+            for parent in hierarchy.parents[node]:
+                if parent in members:
+                    members[parent] |= found
+                else:
+                    members[parent] = set(found)
+    for node in sorted(members):
+        inferred = members[node].difference(asserted.get(node, ()))
+        if inferred:
+            yield node, sorted(inferred)
+
+
+def iof_members_numpy(hierarchy, asserted):
+    import numpy
+    # The same joins over sorted arrays of individual ids, merged once per
+    # concept from the arrays of all its children
+    given = {node: numpy.unique(numpy.fromiter(it, dtype=numpy.intp, count=len(it)))
+             for node, it in asserted.items()}
+    members = dict(given)
+    pending = {}
+    for node in reversed(hierarchy.order):
+        parts = pending.pop(node, None)
+        if parts:
+            if node in members:
+                parts.append(members[node])
+            members[node] = numpy.unique(numpy.concatenate(parts))
+        found = members.get(node)
+        if found is not None:
+            for parent in hierarchy.parents[node]:
+                pending.setdefault(parent, []).append(found)
+    for node in sorted(members):
+        inferred = members[node]
+        if node in given:
+            inferred = numpy.setdiff1d(inferred, given[node], assume_unique=True)
+        if len(inferred):
+            yield node, inferred.tolist()
+
+
+def materialize(ontology, engine=None):
+    # Every individual is also an instance of the ancestors of its
+    # concepts, and every concept a subclass of all its ancestors. The
+    # inferred triples follow the asserted ones, without properties.
+    hierarchy = Hierarchy.from_ontology(ontology)
+    if hierarchy.cycle is not None:
+        raise OntologyError(cycle_message(hierarchy.cycle))
+
+    individuals = {name: i for i, name in enumerate(ontology.individuals)}
+    concepts = hierarchy.index
+    asserted = {}
+    count = 0
+    for triple in ontology.triples:
+        if triple.relation == 'iof':
+            asserted.setdefault(concepts[triple.concept], []).append(
+                individuals[triple.individual])
+            count += 1
+    if engine is None and count < NUMPY_INFERENCE_FROM:
+        engine = 'python'
+    engine = pick_engine(engine, INFERENCE_ENGINES, 'inference')
+    if engine == 'numpy':
+        members = iof_members_numpy(hierarchy, asserted)
+    else:
+        members = iof_members_python(hierarchy, asserted)
+
+    names = hierarchy.names
+    individual_names = list(ontology.individuals)
+    triples = list(ontology.triples)
+    for node, inferred in members:
+        concept = names[node]
+        triples.extend(Triple(individual_names[individual], 'iof', concept, EMPTY_PROPERTIES)
+                       for individual in inferred)
+
+    ancestors = [None] * len(names)
+    for node in hierarchy.order:
+        found = set()
+        for parent in hierarchy.parents[node]:
+            found.add(parent)
+            found |= ancestors[parent]
+        ancestors[node] = found
+    for node in range(len(names)):
+        for ancestor in sorted(ancestors[node].difference(hierarchy.parents[node])):
+            triples.append(Triple(names[node], 'isa', names[ancestor], EMPTY_PROPERTIES))
+
+    return Ontology(ontology.name, ontology.concepts, ontology.individuals,
+                    ontology.relations, triples)
+
+
+# Graph
+
+GRAPH_ENGINES = ('python', 'numpy')
+
+
+class OntologyGraph:
+    # The triples as compressed sparse rows over integer ids, once forward
+    # and once reversed. The edges of a subject are contiguous and ordered
+    # by relation and then object, so the objects of (subject, relation)
+    # are a slice found with bisect, and the reverse index answers
+    # (object, relation) the same way.
+    def __init__(self, names, relations, subjects, predicates, objects, engine=None):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+        self.relations = relations
+        self.relation_index = {name: i for i, name in enumerate(relations)}
+        engine = pick_engine(engine, GRAPH_ENGINES, 'graph')
+        self.forward = adjacency(len(names), len(relations), subjects, predicates, objects,
+                                 engine)
+        self.reverse = adjacency(len(names), len(relations), objects, predicates, subjects,
+                                 engine)
+
+    @classmethod
+    def from_ontology(cls, ontology, engine=None):
+        return cls(*triple_ids(ontology), engine)
+
+    def __len__(self):
+        return len(self.forward[1])
+
+    def span(self, rows, node, relation):
+        import bisect
+        offsets, predicates, _ = rows
+        start, end = offsets[node], offsets[node + 1]
+        if relation is not None:
+            start = bisect.bisect_left(predicates, relation, start, end)
+            end = bisect.bisect_right(predicates, relation, start, end)
+        return start, end
+
+    def objects(self, subject, relation=None):
+        return [object for _, _, object in self.match(subject, relation)]
+
+    def subjects(self, object, relation=None):
+        return [subject for subject, _, _ in self.match(None, relation, object)]
+
+    def match(self, subject=None, relation=None, object=None):
+        # Yields the (subject, relation, object) triples with the given
+        # parts, None matches anything. Without a subject or an object
+        # every edge is visited.
+        import bisect
+        parts = (subject, relation, object)
+        ids = (self.index.get(subject), self.relation_index.get(relation),
+               self.index.get(object))
+        if any(id is None and part is not None for id, part in zip(ids, parts)):
+            return
+        subject_id, relation_id, object_id = ids
+        names = self.names
+        relations = self.relations
+        if subject_id is None and object_id is None:
+            offsets, predicates, targets = self.forward
+            for node, name in enumerate(names):
+                for i in range(offsets[node], offsets[node + 1]):
+                    if relation_id is None or predicates[i] == relation_id:
+                        yield name, relations[predicates[i]], names[targets[i]]
+            return
+        forward = subject_id is not None
+        rows, node = (self.forward, subject_id) if forward else (self.reverse, object_id)
+        _, predicates, targets = rows
+        start, end = self.span(rows, node, relation_id)
+        if forward and object_id is not None and relation_id is not None:
+            # The objects of one relation are sorted
+            start = bisect.bisect_left(targets, object_id, start, end)
+            end = bisect.bisect_right(targets, object_id, start, end)
+        for i in range(start, end):
+            if forward and object_id is not None and targets[i] != object_id:
+                continue
+            if forward:
+                yield subject, relations[predicates[i]], names[targets[i]]
             else:
-                p[0] = []
-        elif name == 'property':
-            p[0] = [p[1], p[3]]
-        elif name == 'value':
-            p[0] = p[1]
-        # Atoms
-        elif name == 'number':
-            p[0] = [p[1], name]
-        elif name == 'boolean':
-            p[0] = [p[1], name]
-        elif name == 'string':
-            p[0] = [p[1], name]
-        elif name == 'date':
-            p[0] = [p[1], name]
-        elif name == 'type':
+                yield names[targets[i]], relations[predicates[i]], object
+
+    def query(self, text):
+        return self.match(*parse_query(text))
+
+
+def triple_ids(ontology):
+    # Names get ids in the order they are declared, concepts first, and
+    # relations after them the builtin ones
+    from array import array
+    names = list(ontology.concepts) + list(ontology.individuals)
+    relations = list(ontology.relations) + [it for it in BUILTIN_RELATIONS
+                                            if it not in ontology.relations]
+    index = {name: i for i, name in enumerate(names)}
+    relation_index = {name: i for i, name in enumerate(relations)}
+    subjects, predicates, objects = array('q'), array('q'), array('q')
+    # Without validation a triple can name what was never declared
+    for triple in ontology.triples:
+        for name, ids in ((triple.individual, subjects), (triple.concept, objects)):
+            id = index.get(name)
+            if id is None:
+                id = index[name] = len(names)
+                names.append(name)
+            ids.append(id)
+        id = relation_index.get(triple.relation)
+        if id is None:
+            id = relation_index[triple.relation] = len(relations)
+            relations.append(triple.relation)
+        predicates.append(id)
+    return names, relations, subjects, predicates, objects
+
+
+def adjacency(count, relation_count, sources, predicates, targets, engine):
+    # Returns the offsets of every source and the relations and targets of
+    # its edges, sorted by (source, relation, target)
+    from array import array
+    if engine == 'numpy':
+        import numpy
+        sources, predicates, targets = (numpy.frombuffer(it, dtype=numpy.int64)
+                                        for it in (sources, predicates, targets))
+        order = numpy.lexsort((targets, predicates, sources))
+        offsets = numpy.zeros(count + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(sources, minlength=count), out=offsets[1:])
+        return tuple(array('q', it.tobytes())
+                     for it in (offsets, predicates[order], targets[order]))
+    # The three ids are packed in one int, so the sort compares ints only
+    packed = sorted((source * relation_count + predicate) * count + target
+                    for source, predicate, target in zip(sources, predicates, targets))
+    offsets = array('q', bytes(8 * (count + 1)))
+    sorted_predicates, sorted_targets = array('q'), array('q')
+    for value in packed:
+        value, target = divmod(value, count)
+        source, predicate = divmod(value, relation_count)
+        offsets[source + 1] += 1
+        sorted_predicates.append(predicate)
+        sorted_targets.append(target)
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+    return offsets, sorted_predicates, sorted_targets
+
+
+def parse_query(text):
+    # A query is a triple whose parts are names or '?', like "? = iof => Pessoa"
+    import re
+    term = r'\s*("[^"]*"|[^\s=;"]+)\s*'
+    found = re.fullmatch(f'{term}={term}=>{term};?\\s*', text)
+    if found is None:
+        raise Exception(f'Invalid query: {text}')
+    return tuple(None if it == '?' else it.strip('"') for it in found.groups())
+
+
+# Backends
+
+
+def emit_owl_head(ontology):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '\n'
+    yield '<Ontology\n'
+    yield '  xmlns="http://www.w3.org/2002/07/owl#"\n'
+    yield '  xml:base="http://www.semanticweb.org/gepl/ontologies/2020/10/w_16813858554167876_"\n'
+    yield '  xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"\n'
+    yield '  xmlns:xml="http://www.w3.org/XML/1998/namespace"\n'
+    yield '  xmlns:xsd="http://www.w3.org/2001/XMLSchema#"\n'
+    yield '  xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"\n'
+    yield '  ontologyIRI="http://www.semanticweb.org/gepl/ontologies/2020/10/w_16813858554167876_"\n'
+    yield '>\n'
+    yield '  <Prefix name="" IRI="http://www.semanticweb.org/gepl/ontologies/2020/10/w_16813858554167876_"/>\n'
+    yield '  <Prefix name="owl" IRI="http://www.w3.org/2002/07/owl#"/>\n'
+    yield '  <Prefix name="rdf" IRI="http://www.w3.org/1999/02/22-rdf-syntax-ns#"/>\n'
+    yield '  <Prefix name="xml" IRI="http://www.w3.org/XML/1998/namespace"/>\n'
+    yield '  <Prefix name="xsd" IRI="http://www.w3.org/2001/XMLSchema#"/>\n'
+    yield '  <Prefix name="rdfs" IRI="http://www.w3.org/2000/01/rdf-schema#"/>\n'
+    yield '\n'
+    for individual in ontology.individuals:
+        yield f'  <Declaration><NamedIndividual IRI="#{individual}"/></Declaration>\n'
+    yield '\n'
+    for concept in ontology.concepts:
+        yield f'  <Declaration><Class IRI="#{concept}"/></Declaration>\n'
+    yield '\n'
+    relations = ontology.relations + ['iof', 'isa']
+    for relation in relations:
+        yield f'  <Declaration><ObjectProperty IRI="#{relation}"/></Declaration>\n'
+    yield '\n'
+
+
+def owl_triple(triple):
+    if triple.relation == 'iof':
+        return (f'  <ClassAssertion>\n'
+                f'    <Class IRI="#{triple.concept}"/>\n'
+                f'    <NamedIndividual IRI="#{triple.individual}"/>\n'
+                f'  </ClassAssertion>\n')
+    elif triple.relation == 'isa':
+        return (f'  <SubClassOf>\n'
+                f'    <Class IRI="#{triple.individual}"/>\n'
+                f'    <Class IRI="#{triple.concept}"/>\n'
+                f'  </SubClassOf>\n')
+    else:
+        return (f'  <ObjectPropertyAssertion>\n'
+                f'    <ObjectProperty IRI="#{triple.relation}"/>\n'
+                f'    <NamedIndividual IRI="#{triple.individual}"/>\n'
+                f'    <NamedIndividual IRI="#{triple.concept}"/>\n'
+                f'  </ObjectPropertyAssertion>\n')
+
+
+def emit_owl(ontology):
+    yield from emit_owl_head(ontology)
+    for triple in ontology.triples:
+        yield owl_triple(triple)
+    yield '</Ontology>\n'
+
+
+def emit_prolog_head(ontology):
+    yield 'not(X) :- X, !, no.\n'
+    yield 'not(_).\n'
+
+    yield '\n'
+    for concept in ontology.concepts:
+        yield f'concept({concept}).\n'
+
+    yield '\n'
+    for name, concept in ontology.concepts.items():
+        for attribute, typ in concept.attributes.items():
+            yield f'attribute({name}, [{attribute}:{typ}]).\n'
+
+    yield '\n'
+    for relation in ontology.relations + ['iof', 'isa']:
+        yield f'relation({relation}).\n'
+
+    yield '\n'
+    for individual in ontology.individuals:
+        yield f'individual({individual}).\n'
+
+
+def prolog_triple(triple):
+    return f'{triple.relation}({triple.individual}, {triple.concept}).\n'
+
+
+def prolog_triple_properties(triple):
+    return ''.join(f'property({triple.individual}, [{value.text}]).\n'
+                   for value in triple.properties.values())
+
+
+def emit_prolog_unused(ontology, triple_relations):
+    # Follow the declaration order so the output does not depend on the
+    # string hash seed of the process
+    last = None
+    for relation in ontology.relations + ['iof', 'isa']:
+        if relation in triple_relations:
+            continue
+        if last != relation:
+            yield f'\n'
+            last = relation
+        yield f'{relation}(_, _) :- false.\n'
+
+
+def emit_prolog_rules():
+    yield '\n'
+    yield 'classOf(X, Y) :- iof(X, Y).\n'
+    yield 'classOf(X, Y) :- isa(X, Y).\n'
+
+    yield '\n'
+    yield 'concepts(X, Y) :- concept(X), classOf(Y, X), !.\n'
+    yield "concepts(X, Y) :- write('One of terms '), write(X), write(' or '), write(Y), write(' is not a Concept.'), nl.\n"
+
+    yield '\n'
+    yield 'validIsa(X, Y) :- isa(X, Y), concepts(X, Y), fail.\n'
+    yield "validIsa(_, _) :- write('End of validation.'), nl.\n"
+
+    yield '\n'
+    yield 'individualAndConcept(I, C) :- individual(I), concept(C), !.\n'
+    yield "individualAndConcept(I, C) :- write('One of terms '), write(I), write(' or '), write(C), write(' is not an Individual or a Concept.'), nl.\n"
+
+    yield '\n'
+    yield 'validIof(I, C) :- iof(I, C), individualAndConcept(I, C), fail.\n'
+    yield "validIof(_, _) :- write('End of validation.'), nl.\n"
+
+
+def emit_prolog(ontology):
+    yield from emit_prolog_head(ontology)
+
+    last = None
+    for triple in sorted(ontology.triples, key=lambda x: x.relation):
+        if last != triple.relation:
+            yield f'\n'
+            last = triple.relation
+        yield prolog_triple(triple)
+    yield from emit_prolog_unused(
+        ontology, {triple.relation for triple in ontology.triples})
+
+    yield '\n'
+    for triple in ontology.triples:
+        if triple.properties:
+            yield prolog_triple_properties(triple)
+
+    yield from emit_prolog_rules()
+
+
+def emit_dot_head(ontology):
+    nodes = set()
+    yield f'digraph {ontology.name} {{'
+
+    yield '\n  // individuals\n'
+    for key in sorted(ontology.individuals):
+        yield f'  "{key}" [shape=rectangle, style=filled, color=goldenrod];\n'
+
+    yield '\n  // concepts\n'
+    for key in sorted(ontology.concepts):
+        if key not in nodes:
+            nodes.add(key)
+            yield f'  "{key}" [shape=ellipse, style=filled, color=turquoise4];\n'
+
+    yield '\n  // concepts properties\n'
+    for key in ontology.concepts:
+        for prop in ontology.concepts[key].attributes:
+            if prop not in nodes:
+                nodes.add(prop)
+                yield f'  "{prop}" [shape=rectangle, style=solid, color=turquoise4];\n'
+
+    yield '\n  // concepts properties relations\n'
+    for key in ontology.concepts:
+        for prop in ontology.concepts[key].attributes:
+            yield f'  "{key}" -> "{prop}" [label="Properties", style=dotted, color=red];\n'
+
+    yield '\n  // triples\n'
+
+
+def dot_triple(it):
+    return f'  "{it.individual}" -> "{it.concept}" [label="{it.relation}", style=solid, color=black];\n'
+
+
+def dot_triple_properties(it):
+    lines = []
+    for attr in it.properties:
+        value = it.properties[attr].text.replace('"', "'")
+        node = f'"{attr}={value}"'
+        lines.append(f'  {node} [shape=rectangle,color=goldenrod];\n')
+        lines.append(f'  "{it.individual}" -> {node} [label="properties", style=dotted, color=red];\n')
+    return ''.join(lines)
+
+
+def emit_dot(ontology):
+    yield from emit_dot_head(ontology)
+    for it in ontology.triples:
+        yield dot_triple(it)
+
+    yield '\n  // triples attributes & relations\n'
+    for it in ontology.triples:
+        if it.properties:
+            yield dot_triple_properties(it)
+
+    yield '}\n'
+
+
+def emit_json_head(ontology):
+    # The same text as json.dumps(ontology.to_json(), indent=2) up to the
+    # opening of the triples list
+    import json
+    head = Ontology(ontology.name, ontology.concepts, ontology.individuals,
+                    ontology.relations).to_json()
+    del head['triples']
+    yield json.dumps(head, indent=2)[:-2]
+    yield ',\n  "triples": ['
+
+
+def json_triple(triple, first=False):
+    import json
+    text = json.dumps({
+        'individual': triple.individual,
+        'relation': triple.relation,
+        'concept': triple.concept,
+        'properties': {key: [value.text, value.type]
+                       for key, value in triple.properties.items()},
+    }, indent=2).replace('\n', '\n    ')
+    return ('\n    ' if first else ',\n    ') + text
+
+
+def emit_json(ontology):
+    from json import JSONEncoder
+    return JSONEncoder(indent=2).iterencode(ontology.to_json())
+
+
+def complete_dot(ontology):
+    return ''.join(emit_dot(ontology))
+
+
+def complete_prolog(ontology):
+    return ''.join(emit_prolog(ontology))
+
+
+def complete_owl(ontology):
+    return ''.join(emit_owl(ontology))
+
+
+def complete_json(ontology):
+    import json
+    return json.dumps(ontology.to_json(), indent=2)
+
+
+# Streaming
+
+
+class Spool:
+    # Keeps text in order for several keys without holding it in memory:
+    # each key buffers up to a block, and full blocks go to one temporary
+    # file where they are found again by offset
+    block_size = 1 << 16
+
+    def __init__(self):
+        self.file = None
+        self.blocks = {}
+        self.pending = {}
+        self.sizes = {}
+
+    def __contains__(self, key):
+        return key in self.pending
+
+    def keys(self):
+        return self.pending.keys()
+
+    def write(self, text, key=None):
+        pending = self.pending.get(key)
+        if pending is None:
+            pending = self.pending[key] = []
+            self.blocks[key] = []
+            self.sizes[key] = 0
+        pending.append(text)
+        self.sizes[key] += len(text)
+        if self.sizes[key] >= self.block_size:
+            self.flush(key)
+
+    def flush(self, key):
+        import tempfile
+        if self.file is None:
+            self.file = tempfile.TemporaryFile()
+        data = ''.join(self.pending[key]).encode('utf-8')
+        self.file.seek(0, os.SEEK_END)
+        self.blocks[key].append((self.file.tell(), len(data)))
+        self.file.write(data)
+        self.pending[key].clear()
+        self.sizes[key] = 0
+
+    def read(self, key=None):
+        for offset, size in self.blocks.get(key, ()):
+            self.file.seek(offset)
+            yield self.file.read(size).decode('utf-8')
+        yield ''.join(self.pending.get(key, ()))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class Sink:
+    # Receives the declarations once they are parsed and then every triple
+    # as it is reduced, writing as much of the output as it can right away
+    validate = True
+
+    def __init__(self, write, diagnostics):
+        self.write = write
+        self.diagnostics = diagnostics
+        self.ontology = None
+        self.symbols = None
+        self.schemas = None
+        self.edges = []
+
+    def start(self, ontology, positions=None):
+        self.ontology = ontology
+        if self.validate:
+            self.symbols = build_symbol_table(ontology, self.diagnostics, positions)
+            self.schemas = Schemas.from_concepts(ontology.concepts)
+        for chunk in self.head(ontology):
+            self.write(chunk)
+
+    def triple(self, triple, lexpos=None):
+        if self.validate:
+            error = check_triple(triple, self.symbols, self.schemas)
+            if error:
+                return self.diagnostics.report(error, lexpos)
+            # Only the 'isa' triples are kept, to look for cycles at the end.
+            # The properties inherit from the 'isa' triples seen so far.
+            if triple.relation == 'isa':
+                self.edges.append((triple.individual, triple.concept, lexpos))
+                self.schemas.add(triple.individual, triple.concept)
+        self.emit(triple)
+
+    def finish(self):
+        if self.edges:
+            error, position = check_hierarchy(self.ontology.concepts, self.edges)
+            if error:
+                self.diagnostics.report(error, position)
+        for chunk in self.tail():
+            self.write(chunk)
+
+
+class OwlSink(Sink):
+    def head(self, ontology):
+        return emit_owl_head(ontology)
+
+    def emit(self, triple):
+        self.write(owl_triple(triple))
+
+    def tail(self):
+        yield '</Ontology>\n'
+
+
+class DotSink(Sink):
+    def head(self, ontology):
+        self.properties = Spool()
+        return emit_dot_head(ontology)
+
+    def emit(self, triple):
+        self.write(dot_triple(triple))
+        if triple.properties:
+            self.properties.write(dot_triple_properties(triple))
+
+    def tail(self):
+        yield '\n  // triples attributes & relations\n'
+        yield from self.properties.read()
+        self.properties.close()
+        yield '}\n'
+
+
+class PrologSink(Sink):
+    def head(self, ontology):
+        self.triples = Spool()
+        self.properties = Spool()
+        return emit_prolog_head(ontology)
+
+    def emit(self, triple):
+        # Triples are written grouped by relation, as emit_prolog sorts them
+        self.triples.write(prolog_triple(triple), triple.relation)
+        if triple.properties:
+            self.properties.write(prolog_triple_properties(triple))
+
+    def tail(self):
+        for relation in sorted(self.triples.keys()):
+            yield '\n'
+            yield from self.triples.read(relation)
+        yield from emit_prolog_unused(self.ontology, self.triples)
+        self.triples.close()
+        yield '\n'
+        yield from self.properties.read()
+        self.properties.close()
+        yield from emit_prolog_rules()
+
+
+class JsonSink(Sink):
+    validate = False
+
+    def head(self, ontology):
+        self.first = True
+        return emit_json_head(ontology)
+
+    def emit(self, triple):
+        self.write(json_triple(triple, self.first))
+        self.first = False
+
+    def tail(self):
+        yield ']\n}' if self.first else '\n  ]\n}'
+
+
+class LineSink:
+    # Stands for the list of output lines of the single pass backend
+    def __init__(self, write):
+        self.write = write
+        self.first = True
+
+    def append(self, line):
+        if not self.first:
+            self.write('\n')
+        self.first = False
+        self.write(line)
+
+
+SINKS = {
+    'dot': DotSink,
+    'prolog': PrologSink,
+    'owl': OwlSink,
+    'json': JsonSink,
+}
+
+
+# Snapshots
+
+SNAPSHOT_MAGIC = b'ONTOSNAP'
+SNAPSHOT_VERSION = 1
+
+
+def snapshot_array(values):
+    from array import array
+    values = array('I', values)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def emit_snapshot(ontology):
+    import struct
+    strings = {}
+
+    def ref(text):
+        index = strings.get(text)
+        if index is None:
+            index = strings[text] = len(strings)
+        return index
+
+    name = ref(ontology.name)
+    concepts = [ref(it) for it in ontology.concepts]
+    attribute_counts = []
+    attributes = []
+    for concept in ontology.concepts.values():
+        attribute_counts.append(len(concept.attributes))
+        for attribute, typ in concept.attributes.items():
+            attributes += (ref(attribute), ref(typ))
+    individuals = [ref(it) for it in ontology.individuals]
+    relations = [ref(it) for it in ontology.relations]
+    triples = ([], [], [], [])
+    properties = []
+    for triple in ontology.triples:
+        triples[0].append(ref(triple.individual))
+        triples[1].append(ref(triple.relation))
+        triples[2].append(ref(triple.concept))
+        triples[3].append(len(triple.properties))
+        for key, value in triple.properties.items():
+            properties += (ref(key), ref(value.text), ref(value.type))
+
+    # All strings are stored as one UTF-8 blob plus their lengths, so the
+    # loader decodes once and slices
+    blob = ''.join(strings).encode('utf-8')
+    sections = [snapshot_array(len(it) for it in strings), blob,
+                snapshot_array(concepts), snapshot_array(attribute_counts),
+                snapshot_array(attributes), snapshot_array(individuals),
+                snapshot_array(relations), *map(snapshot_array, triples),
+                snapshot_array(properties)]
+
+    yield SNAPSHOT_MAGIC + struct.pack('<II', SNAPSHOT_VERSION, name)
+    for section in sections:
+        data = section if isinstance(section, bytes) else section.tobytes()
+        yield struct.pack('<Q', len(data))
+        yield data
+
+
+def dump_snapshot(ontology, file):
+    for chunk in emit_snapshot(ontology):
+        file.write(chunk)
+
+
+def is_snapshot(data):
+    return data[:len(SNAPSHOT_MAGIC)] == SNAPSHOT_MAGIC
+
+
+def loads_snapshot(data):
+    import itertools
+    import struct
+    from array import array
+
+    if not is_snapshot(data):
+        raise Exception('Not an ONTODL snapshot')
+    version, name = struct.unpack_from('<II', data, len(SNAPSHOT_MAGIC))
+    if version != SNAPSHOT_VERSION:
+        raise Exception(f'Unsupported snapshot version: {version}')
+
+    offset = len(SNAPSHOT_MAGIC) + 8
+    sections = []
+    while offset < len(data):
+        size, = struct.unpack_from('<Q', data, offset)
+        offset += 8
+        sections.append(data[offset:offset + size])
+        offset += size
+    if len(sections) != 12:
+        raise Exception('Corrupted snapshot')
+
+    def read_array(section):
+        values = array('I')
+        values.frombytes(section)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values
+
+    lengths, blob, *arrays = sections
+    text = bytes(blob).decode('utf-8')
+    offsets = itertools.accumulate(read_array(lengths), initial=0)
+    start = next(offsets)
+    strings = []
+    for end in offsets:
+        strings.append(sys.intern(text[start:end]))
+        start = end
+
+    (concept_names, attribute_counts, attributes, individuals, relations,
+     triple_individuals, triple_relations, triple_concepts, property_counts,
+     properties) = map(read_array, arrays)
+
+    s = strings
+    concepts = {}
+    pairs = iter(attributes)
+    for concept, count in zip(concept_names, attribute_counts):
+        concept_attributes = {}
+        for _ in range(count):
+            attribute = s[next(pairs)]
+            concept_attributes[attribute] = s[next(pairs)]
+        concepts[s[concept]] = Concept(s[concept], concept_attributes)
+
+    triples = []
+    values = iter(properties)
+    for individual, relation, concept, count in zip(
+            triple_individuals, triple_relations, triple_concepts, property_counts):
+        if not count:
+            triples.append(Triple(s[individual], s[relation], s[concept]))
+            continue
+        triple_properties = {}
+        for _ in range(count):
+            key = s[next(values)]
+            triple_properties[key] = Value(s[next(values)], s[next(values)])
+        triples.append(
+            Triple(s[individual], s[relation], s[concept], triple_properties))
+
+    return Ontology(s[name], concepts, [s[it] for it in individuals],
+                    [s[it] for it in relations], triples)
+
+
+def load_snapshot(file):
+    return loads_snapshot(file.read())
+
+
+def read_snapshot(file):
+    buffer = getattr(file, 'buffer', None)
+    if buffer is None or not hasattr(buffer, 'peek'):
+        return None
+    if not is_snapshot(buffer.peek(len(SNAPSHOT_MAGIC))):
+        return None
+    return load_snapshot(buffer)
+
+
+# Arrays
+
+NAME_KINDS = ('concept', 'individual', 'undeclared')
+
+
+def ontology_arrays(ontology):
+    # Every name is an integer id, its position in "names", and the triples
+    # are three id arrays sorted by relation, subject and object. The edges
+    # of the relation r are [relation_offsets[r], relation_offsets[r + 1]).
+    import numpy
+    names, relations, subjects, predicates, objects = triple_ids(ontology)
+    subjects, predicates, objects = (numpy.frombuffer(it, dtype=numpy.int64)
+                                     for it in (subjects, predicates, objects))
+    order = numpy.lexsort((objects, subjects, predicates))
+    relation_offsets = numpy.zeros(len(relations) + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(predicates, minlength=len(relations)),
+                 out=relation_offsets[1:])
+    kinds = numpy.full(len(names), NAME_KINDS.index('undeclared'), dtype=numpy.uint8)
+    kinds[:len(ontology.concepts)] = NAME_KINDS.index('concept')
+    kinds[len(ontology.concepts):len(ontology.concepts) + len(ontology.individuals)] = \
+        NAME_KINDS.index('individual')
+    return {
+        'names': numpy.array(names, dtype=str),
+        'kinds': kinds,
+        'relation_names': numpy.array(relations, dtype=str),
+        'subjects': subjects[order].astype(numpy.int32),
+        'relations': predicates[order].astype(numpy.int32),
+        'objects': objects[order].astype(numpy.int32),
+        'relation_offsets': relation_offsets,
+    }
+
+
+def emit_npz(ontology):
+    import io
+    try:
+        import numpy
+    except ImportError:
+        raise Exception('Format "npz" requires numpy')
+    # Stored without compression, so load_arrays can map every array
+    buffer = io.BytesIO()
+    numpy.savez(buffer, **ontology_arrays(ontology))
+    yield buffer.getbuffer()
+
+
+def load_arrays(path, mmap=True):
+    # numpy does not map the arrays of an .npz, but they are stored as .npy
+    # files in the archive, so each one is mapped at its own offset
+    import struct
+    import zipfile
+    import numpy
+    if not mmap:
+        with numpy.load(path) as archive:
+            return {name: archive[name] for name in archive.files}
+    arrays = {}
+    with open(path, 'rb') as file, zipfile.ZipFile(file) as archive:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise Exception(f'Array "{info.filename}" is compressed')
+            file.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', file.read(4))
+            file.seek(name_length + extra_length, 1)
+            version = numpy.lib.format.read_magic(file)
+            read_header = (numpy.lib.format.read_array_header_1_0 if version == (1, 0)
+                           else numpy.lib.format.read_array_header_2_0)
+            shape, fortran_order, dtype = read_header(file)
+            name = info.filename[:-len('.npy')]
+            if 0 in shape:
+                arrays[name] = numpy.empty(shape, dtype=dtype)
+                continue
+            arrays[name] = numpy.memmap(file.name, dtype=dtype, mode='r', offset=file.tell(),
+                                        shape=shape, order='F' if fortran_order else 'C')
+    return arrays
+
+
+def relation_rows(arrays, relation):
+    # The CSR rows of one relation over all the names: the objects of the
+    # subject s are objects[indptr[s]:indptr[s + 1]], as scipy.sparse expects
+    import numpy
+    relation = list(arrays['relation_names']).index(relation)
+    start, end = arrays['relation_offsets'][relation:relation + 2]
+    subjects = arrays['subjects'][start:end]
+    indptr = numpy.searchsorted(subjects, numpy.arange(len(arrays['names']) + 1))
+    return indptr, arrays['objects'][start:end]
+
+
+# Profiling
+
+class Profiler:
+    # Handlers are only wrapped when a profiler is given, so compiling
+    # without one runs the same code as before. Each entry keeps the time
+    # and the allocation of its own code, without the entries called from it.
+    def __init__(self, memory=False):
+        import itertools
+        self.entries = {}
+        self.memory = memory
+        self.nested = (0.0, 0)
+        self.sequence = itertools.count()
+
+    def wrap(self, name, func):
+        import time
+        import tracemalloc
+        clock = time.perf_counter
+        traced = tracemalloc.get_traced_memory if self.memory else lambda: (0, 0)
+        entry = self.entries.setdefault(name, [0, 0.0, 0.0, 0, None])
+
+        def timed(*args, **kwargs):
+            if entry[4] is None:
+                entry[4] = next(self.sequence)
+            outer = self.nested
+            self.nested = (0.0, 0)
+            memory = traced()[0]
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                allocated = traced()[0] - memory
+                nested_time, nested_memory = self.nested
+                entry[0] += 1
+                entry[1] += elapsed - nested_time
+                entry[2] += elapsed
+                entry[3] += allocated - nested_memory
+                self.nested = (outer[0] + elapsed, outer[1] + allocated)
+        return timed
+
+    def iterate(self, name, iterable):
+        # Only the time spent producing each item is counted
+        next_item = self.wrap(name, next)
+        iterator = iter(iterable)
+        while (item := next_item(iterator, None)) is not None:
+            yield item
+
+    def start(self):
+        if self.memory:
+            import tracemalloc
+            tracemalloc.start()
+
+    def stop(self):
+        if self.memory:
+            import tracemalloc
+            tracemalloc.stop()
+
+    def report(self):
+        entries = sorted((it for it in self.entries.items() if it[1][0]),
+                         key=lambda it: it[1][4])
+        rows = [
+            {'name': name, 'calls': calls, 'seconds': seconds,
+             'total_seconds': total, 'net_allocated': allocated if self.memory else None}
+            for name, (calls, seconds, total, allocated, _) in entries
+        ]
+        # Phases in the order they ran, then the grammar rules by cost
+        phases = [it for it in rows if not it['name'].startswith('rule ')]
+        rules = sorted((it for it in rows if it['name'].startswith('rule ')),
+                       key=lambda it: it['seconds'], reverse=True)
+        return {'seconds': sum(it['seconds'] for it in rows), 'entries': phases + rules}
+
+    def format(self):
+        report = self.report()
+        total = report['seconds'] or 1.0
+        lines = [f'{"phase":<28} {"calls":>10} {"seconds":>10} {"%":>6} {"net KB":>10}']
+        for it in report['entries']:
+            allocated = f'{it["net_allocated"] / 1024:>10.1f}' if self.memory else f'{"-":>10}'
+            lines.append(f'{it["name"]:<28} {it["calls"]:>10} {it["seconds"]:>10.4f} '
+                         f'{it["seconds"] / total:>6.1%} {allocated}')
+        lines.append(f'{"total":<28} {"":>10} {report["seconds"]:>10.4f}')
+        return '\n'.join(lines)
+
+
+def create_parser(out='log', cache=True, collect_errors=False, max_errors=None,
+                  output=None, profiler=None):
+    def accept_log(name, p):
+        p[0] = p[1:]
+        print(name, p[0])
+
+    def accept_list(p):
+        # Left-recursive list rules grow the list built by the previous
+        # reduction in place; `p[1] + [item]` would copy it every time.
+        # Items that failed to parse are reduced to None and dropped.
+        if len(p) == 1:
+            p[0] = []
+        elif len(p) == 2:
+            p[0] = [p[1]] if p[1] is not None else []
+        else:
+            if p[len(p) - 1] is not None:
+                p[1].append(p[len(p) - 1])
             p[0] = p[1]
-        elif name == 'id':
-            p[0] = p[1].strip('"')
+
+    def first(p):
+        p[0] = p[1]
+
+    def second(p):
+        p[0] = p[2]
+
+    def third(p):
+        p[0] = p[3]
+
+    def ignore(p):
+        pass
+
+    def pair(p):
+        p[0] = [p[1], p[3]]
+
+    def record_name(p):
+        if p.parser.positions is not None:
+            p.parser.positions['names'][p[1]] = p.lexpos(1)
+
+    # Model
+
+    def model_root(p):
+        p.parser.result = Ontology(p[1], p[2], p[3], p[4], p[5])
+
+    def model_json_root(p):
+        p.parser.result = Ontology(p[1], p[2], p[3], p[4], p[5]).to_json()
+
+    def model_concepts(p):
+        p[0] = {concept.name: concept for concept in p[3]}
+
+    def model_concept(p):
+        if len(p) == 5:
+            p[0] = Concept(p[1], dict(p[3]))
         else:
-            print(f'Unknown name: {name}')
+            p[0] = Concept(p[1])
+        record_name(p)
 
-    def accept_dot_single_pass(name, p):
-        if name == 'root':
-            pass
-        elif name == 'end':
-            p.parser.result['output'].append('}\n')
-        # Ontology
-        elif name == 'ontology':
-            p.parser.result['output'].append(f'digraph {p[2]} {{')
-        # Concepts
-        elif name == 'concepts':
-            pass
-        elif name == 'concept_list':
-            pass
-        elif name == 'concept':
-            concept = p[1]
-            if concept in p.parser.result['entries']:
-                raise Exception(
-                    f'Entry with name "{concept}" already exists as {p.parser.result["entries"][concept]["type"]}')
-            if len(p) == 5:
-                attributes = dict(p[3])
-            elif len(p) == 2:
-                attributes = {}
-            p.parser.result['entries'][concept] = {
-                'type': 'concept',
-                'attributes': attributes
-            }
+    def model_name(p):
+        p[0] = p[1]
+        record_name(p)
+
+    def model_triple(p):
+        p[0] = Triple(p[1], p[3], p[5][0], p[5][1])
+        if p.parser.positions is not None:
+            p.parser.positions['triples'].append(p.lexpos(1))
+
+    def model_entity(p):
+        if len(p) == 5:
+            p[0] = (p[1], dict(p[3]) or EMPTY_PROPERTIES)
+        else:
+            p[0] = (p[1], EMPTY_PROPERTIES)
+
+    def model_property(p):
+        p[0] = (p[1], p[3])
+
+    def model_value(type):
+        def action(p):
+            p[0] = Value(p[1], type)
+        return action
+
+    def model_id(p):
+        # Repeated names share one string object
+        p[0] = sys.intern(p[1].strip('"'))
+
+    def model_concepts_error(p):
+        p[0] = {}
+
+    def model_list_error(p):
+        p[0] = []
+
+    def model_triple_error(p):
+        p[0] = None
+
+    model_actions = {
+        'root': model_root,
+        'end': ignore,
+        'ontology': second,
+        'concepts': model_concepts,
+        'concept_list': accept_list,
+        'concept': model_concept,
+        'attribute_list': accept_list,
+        'attribute': pair,
+        'individuals': third,
+        'individual_list': accept_list,
+        'individual': model_name,
+        'relations': third,
+        'relation_list': accept_list,
+        'relation': model_name,
+        'triples': third,
+        'triple_list': accept_list,
+        'triple': model_triple,
+        'entity': model_entity,
+        'properties_list': accept_list,
+        'property': model_property,
+        'value': first,
+        'number': model_value('number'),
+        'boolean': model_value('boolean'),
+        'string': model_value('string'),
+        'date': model_value('date'),
+        'type': first,
+        'id': model_id,
+        'concepts_error': model_concepts_error,
+        'individuals_error': model_list_error,
+        'relations_error': model_list_error,
+        'triple_error': model_triple_error,
+    }
+
+    # Single pass DOT
+
+    def dot_end(p):
+        p.parser.result['output'].append('}\n')
+
+    def dot_ontology(p):
+        p.parser.result['output'].append(f'digraph {p[2]} {{')
+
+    def dot_concept(p):
+        concept = p[1]
+        if concept in p.parser.result['entries']:
+            return p.parser.diagnostics.report(
+                f'Entry with name "{concept}" already exists as {p.parser.result["entries"][concept]["type"]}', p.lexpos(1))
+        if len(p) == 5:
+            attributes = dict(p[3])
+        else:
+            attributes = {}
+        p.parser.result['entries'][concept] = {
+            'type': 'concept',
+            'attributes': attributes
+        }
+        p.parser.result['schemas'].attributes[concept] = attributes
+        p.parser.result['output'].append(
+            f'  "{concept}" [label="{concept}", shape=ellipse, style=filled, color=turquoise4];')
+        for attribute, value in attributes.items():
             p.parser.result['output'].append(
-                f'  "{concept}" [label="{concept}", shape=ellipse, style=filled, color=turquoise4];')
-            for attribute, value in attributes.items():
-                p.parser.result['output'].append(
-                    f'  "{attribute}" [shape=rectangle, color=turquoise4];')
-                p.parser.result['output'].append(
-                    f'  "{concept}" -> "{attribute}" [label="Properties", style=dotted, color=red];')
-        elif name == 'attribute_list':
-            if len(p) == 4:
-                p[0] = p[1] + [p[3]]
-            elif len(p) == 2:
-                p[0] = [p[1]]
-            else:
-                p[0] = []
-        elif name == 'attribute':
-            p[0] = [p[1], p[3]]
-        # Individuals
-        elif name == 'individuals':
-            pass
-        elif name == 'individual_list':
-            pass
-        elif name == 'individual':
-            individual = p[1]
-            if individual in p.parser.result['entries']:
-                raise Exception(
-                    f'Entry with name "{individual}" already exists as {p.parser.result["entries"][individual]["type"]}.')
-            p.parser.result['entries'][individual] = {'type': 'individual'}
+                f'  "{attribute}" [shape=rectangle, color=turquoise4];')
             p.parser.result['output'].append(
-                f'  "{individual}" [shape=rectangle, style=filled, color=goldenrod];')
-        # Relations
-        elif name == 'relations':
-            pass
-        elif name == 'relation_list':
-            pass
-        elif name == 'relation':
-            relation = p[1]
-            if relation in p.parser.result['entries']:
-                raise Exception(
-                    f'Entry with name "{relation}" already exists as {p.parser.result["entries"][relation]["type"]}.')
-            p.parser.result['entries'][relation] = {'type': 'relation'}
-        # Triples
-        elif name == 'triples':
-            pass
-        elif name == 'triple_list':
-            pass
-        elif name == 'triple':
-            individual = p[1]
-            relation = p[3]
-            concept = p[5]['concept']
-            properties = p[5]['properties']
-
-            if individual not in p.parser.result['entries']:
-                raise Exception(f'Individual "{individual}" does not exist.')
-            if relation not in p.parser.result['entries']:
-                raise Exception(f'Relation "{relation}" does not exist.')
-            if concept not in p.parser.result['entries']:
-                raise Exception(f'Concept "{concept}" does not exist.')
-
-            if p.parser.result['entries'][individual]['type'] not in ['concept', 'individual']:
-                raise Exception(f'Entry "{individual}" is not an individual.')
-            if p.parser.result['entries'][relation]['type'] != 'relation':
-                raise Exception(f'Entry "{relation}" is not a relation.')
-            if p.parser.result['entries'][concept]['type'] not in ['concept', 'individual']:
-                raise Exception(
-                    f'Entry "{concept}" is not a concept or an individual.')
-
-            if relation != 'iof':
-                if len(properties.keys()) > 0:
-                    raise Exception(
-                        "Only relation 'iof' must have properties.")
-
-            entry_concept = p.parser.result['entries'][concept]
-            if entry_concept['type'] == 'concept':
-                if relation == 'iof':
-                    for key, value in properties.items():
-                        if key not in entry_concept['attributes']:
-                            raise Exception(
-                                f'Concept "{concept}" does not have attribute "{key}".')
-                        if entry_concept['attributes'][key] != value[1]:
-                            raise Exception(
-                                f'Attribute "{key}" of concept "{concept}" is of type "{entry_concept["attributes"][key]}", not "{value[1]}".')
-                    for key, value in entry_concept['attributes'].items():
+                f'  "{concept}" -> "{attribute}" [label="Properties", style=dotted, color=red];')
+
+    def dot_individual(p):
+        individual = p[1]
+        if individual in p.parser.result['entries']:
+            return p.parser.diagnostics.report(
+                f'Entry with name "{individual}" already exists as {p.parser.result["entries"][individual]["type"]}.', p.lexpos(1))
+        p.parser.result['entries'][individual] = {'type': 'individual'}
+        p.parser.result['output'].append(
+            f'  "{individual}" [shape=rectangle, style=filled, color=goldenrod];')
+
+    def dot_relation(p):
+        relation = p[1]
+        if relation in p.parser.result['entries']:
+            return p.parser.diagnostics.report(
+                f'Entry with name "{relation}" already exists as {p.parser.result["entries"][relation]["type"]}.', p.lexpos(1))
+        p.parser.result['entries'][relation] = {'type': 'relation'}
+
+    def dot_triple(p):
+        individual = p[1]
+        relation = p[3]
+        concept = p[5]['concept']
+        properties = p[5]['properties']
+
+        if individual not in p.parser.result['entries']:
+            return p.parser.diagnostics.report(
+                f'Individual "{individual}" does not exist.', p.lexpos(1))
+        if relation not in p.parser.result['entries']:
+            return p.parser.diagnostics.report(
+                f'Relation "{relation}" does not exist.', p.lexpos(1))
+        if concept not in p.parser.result['entries']:
+            return p.parser.diagnostics.report(
+                f'Concept "{concept}" does not exist.', p.lexpos(1))
+
+        if p.parser.result['entries'][individual]['type'] not in ['concept', 'individual']:
+            return p.parser.diagnostics.report(
+                f'Entry "{individual}" is not an individual.', p.lexpos(1))
+        if p.parser.result['entries'][relation]['type'] != 'relation':
+            return p.parser.diagnostics.report(
+                f'Entry "{relation}" is not a relation.', p.lexpos(1))
+        if p.parser.result['entries'][concept]['type'] not in ['concept', 'individual']:
+            return p.parser.diagnostics.report(
+                f'Entry "{concept}" is not a concept or an individual.', p.lexpos(1))
+
+        if relation != 'iof':
+            if len(properties.keys()) > 0:
+                return p.parser.diagnostics.report(
+                    "Only relation 'iof' must have properties.", p.lexpos(1))
+
+        entry_concept = p.parser.result['entries'][concept]
+        if entry_concept['type'] == 'concept':
+            schemas = p.parser.result['schemas']
+            if relation == 'iof':
+                # Inherited through the 'isa' triples seen so far
+                attributes = schemas.get(concept)
+                for key, value in properties.items():
+                    if key not in attributes:
+                        return p.parser.diagnostics.report(
+                            f'Concept "{concept}" does not have attribute "{key}".', p.lexpos(1))
+                    if attributes[key] != value[1]:
+                        return p.parser.diagnostics.report(
+                            f'Attribute "{key}" of concept "{concept}" is of type "{attributes[key]}", not "{value[1]}".', p.lexpos(1))
+                # Every key was found above, so only a missing one is left
+                if len(properties) != len(attributes):
+                    for key in attributes:
                         if key not in properties:
-                            raise Exception(
-                                f'Attribute "{key}" of concept "{concept}" is not set.')
+                            return p.parser.diagnostics.report(
+                                f'Attribute "{key}" of concept "{concept}" is not set.', p.lexpos(1))
+            elif relation == 'isa' and p.parser.result['entries'][individual]['type'] == 'concept':
+                schemas.add(individual, concept)
 
-            p.parser.result['output'].append(
-                f'  "{individual}" -> "{concept}" [label="{relation}", style=solid, color=black];')
-
-            for key, value in properties.items():
-                node = f'{key}={value[0]}'.replace('"', "'")
-                p.parser.result['output'].append(
-                    f'  "{node}" [shape=rectangle, color=goldenrod];')
-                p.parser.result['output'].append(
-                    f'  "{individual}" -> "{node}" [label="properties", style=dotted, color=red];')
-        elif name == 'entity':
-            if len(p) == 5:
-                p[0] = {"concept": p[1], "properties": dict(p[3])}
-            elif len(p) == 2:
-                p[0] = {"concept": p[1], "properties": {}}
-        elif name == 'properties_list':
-            if len(p) == 4:
-                p[0] = p[1] + [p[3]]
-            elif len(p) == 2:
-                p[0] = [p[1]]
-            else:
-                p[0] = []
-        elif name == 'property':
-            p[0] = [p[1], p[3]]
-        elif name == 'value':
-            p[0] = p[1]
-        # Atoms
-        elif name == 'number':
-            p[0] = [p[1], name]
-        elif name == 'boolean':
-            p[0] = [p[1], name]
-        elif name == 'string':
-            p[0] = [p[1], name]
-        elif name == 'date':
-            p[0] = [p[1], name]
-        elif name == 'type':
-            p[0] = p[1]
-        elif name == 'id':
-            p[0] = p[1].strip('"')
-        else:
-            print(f'Unknown name: {name}')
+        p.parser.result['output'].append(
+            f'  "{individual}" -> "{concept}" [label="{relation}", style=solid, color=black];')
 
-    def complete_dot_single_pass():
-        return '\n'.join(parser.result['output'])
+        for key, value in properties.items():
+            node = f'{key}={value[0]}'.replace('"', "'")
+            p.parser.result['output'].append(
+                f'  "{node}" [shape=rectangle, color=goldenrod];')
+            p.parser.result['output'].append(
+                f'  "{individual}" -> "{node}" [label="properties", style=dotted, color=red];')
 
-    def complete_json():
+    def dot_entity(p):
+        if len(p) == 5:
+            p[0] = {"concept": p[1], "properties": dict(p[3])}
+        else:
+            p[0] = {"concept": p[1], "properties": {}}
+
+    def dot_value(type):
+        def action(p):
+            p[0] = [p[1], type]
+        return action
+
+    def dot_id(p):
+        p[0] = p[1].strip('"')
+
+    dot_single_pass_actions = {
+        'root': ignore,
+        'end': dot_end,
+        'ontology': dot_ontology,
+        'concepts': ignore,
+        'concept_list': ignore,
+        'concept': dot_concept,
+        'attribute_list': accept_list,
+        'attribute': pair,
+        'individuals': ignore,
+        'individual_list': ignore,
+        'individual': dot_individual,
+        'relations': ignore,
+        'relation_list': ignore,
+        'relation': dot_relation,
+        'triples': ignore,
+        'triple_list': ignore,
+        'triple': dot_triple,
+        'entity': dot_entity,
+        'properties_list': accept_list,
+        'property': pair,
+        'value': first,
+        'number': dot_value('number'),
+        'boolean': dot_value('boolean'),
+        'string': dot_value('string'),
+        'date': dot_value('date'),
+        'type': first,
+        'id': dot_id,
+        'concepts_error': ignore,
+        'individuals_error': ignore,
+        'relations_error': ignore,
+        'triple_error': ignore,
+    }
+
+    def streaming_actions():
+        # Declarations always come before the triples, so the sink of the
+        # parse starts once the relations are reduced and every triple is
+        # handed over and dropped as soon as it is reduced
+        def declare(field, action):
+            def handler(p):
+                action(p)
+                setattr(p.parser.result, field, p[0])
+                if field == 'relations':
+                    p.parser.sink.start(p.parser.result, p.parser.positions)
+            return handler
+
+        def stream_triple(p):
+            p.parser.sink.triple(Triple(p[1], p[3], p[5][0], p[5][1]), p.lexpos(1))
+
+        def stream_root(p):
+            p.parser.sink.finish()
+
+        return dict(
+            model_actions,
+            root=stream_root,
+            ontology=declare('name', second),
+            concepts=declare('concepts', model_concepts),
+            concepts_error=declare('concepts', model_concepts_error),
+            individuals=declare('individuals', third),
+            individuals_error=declare('individuals', model_list_error),
+            relations=declare('relations', third),
+            relations_error=declare('relations', model_list_error),
+            triple_list=ignore,
+            triple=stream_triple,
+        )
+
+    def bind_actions(actions):
+        # Each production calls its handler directly, the p_ functions only
+        # define the grammar
+        productions = []
+        for production in parser.productions:
+            production = copy.copy(production)
+            if production.func:
+                production.callable = actions[production.func[2:]]
+            productions.append(production)
+        parser.productions = productions
+
+    def syntax_error(context, p):
+        if p:
+            context.diagnostics.report(f"Syntax error at '{p}'", p.lexpos)
+        else:
+            context.diagnostics.report(
+                "Syntax error at EOF", context.diagnostics.end())
+
+    def validated(context, stream):
+        if context.result is None:
+            context.diagnostics.check()
+        validate(context.result, context.diagnostics, context.positions)
+        context.diagnostics.check()
+        return stream(context.result)
+
+    def stream_log(context):
+        context.diagnostics.check()
+        return iter(())
+
+    def stream_dot_single_pass(context):
+        context.diagnostics.check()
+        lines = iter(context.result['output'])
+        for line in lines:
+            yield line
+            break
+        for line in lines:
+            yield '\n'
+            yield line
+
+    def stream_json(context):
+        from json import JSONEncoder
+        context.diagnostics.check()
+        return JSONEncoder(indent=2).iterencode(context.result)
+
+    def stream_owl(context):
+        return validated(context, emit_owl)
+
+    def stream_prolog(context):
+        return validated(context, emit_prolog)
+
+    def stream_dot(context):
+        return validated(context, emit_dot)
+
+    def complete(context):
+        return ''.join(context.emit())
+
+    def complete_result_json(context):
         import json
-        return json.dumps(parser.result, indent=2)
-
-    def complete_owl():
-        json = parser.result
-        validate_json(json)
-
-        output = ''
-        output += '<?xml version="1.0" encoding="UTF-8"?>\n'
-        output += '\n'
-        output += '<Ontology\n'
-        output += '  xmlns="http://www.w3.org/2002/07/owl#"\n'
-        output += '  xml:base="http://www.semanticweb.org/gepl/ontologies/2020/10/w_16813858554167876_"\n'
-        output += '  xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"\n'
-        output += '  xmlns:xml="http://www.w3.org/XML/1998/namespace"\n'
-        output += '  xmlns:xsd="http://www.w3.org/2001/XMLSchema#"\n'
-        output += '  xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"\n'
-        output += '  ontologyIRI="http://www.semanticweb.org/gepl/ontologies/2020/10/w_16813858554167876_"\n'
-        output += '>\n'
-        output += '  <Prefix name="" IRI="http://www.semanticweb.org/gepl/ontologies/2020/10/w_16813858554167876_"/>\n'
-        output += '  <Prefix name="owl" IRI="http://www.w3.org/2002/07/owl#"/>\n'
-        output += '  <Prefix name="rdf" IRI="http://www.w3.org/1999/02/22-rdf-syntax-ns#"/>\n'
-        output += '  <Prefix name="xml" IRI="http://www.w3.org/XML/1998/namespace"/>\n'
-        output += '  <Prefix name="xsd" IRI="http://www.w3.org/2001/XMLSchema#"/>\n'
-        output += '  <Prefix name="rdfs" IRI="http://www.w3.org/2000/01/rdf-schema#"/>\n'
-        output += '\n'
-        for individual in json['individuals']:
-            output += f'  <Declaration><NamedIndividual IRI="#{individual}"/></Declaration>\n'
-        output += '\n'
-        for concept in json['concepts']:
-            output += f'  <Declaration><Class IRI="#{concept}"/></Declaration>\n'
-        output += '\n'
-        relations = json['relations'] + ['iof', 'isa']
-        for relation in relations:
-            output += f'  <Declaration><ObjectProperty IRI="#{relation}"/></Declaration>\n'
-        output += '\n'
-        for triple in json['triples']:
-            if triple['relation'] == 'iof':
-                output += f'  <ClassAssertion>\n'
-                output += f'    <Class IRI="#{triple["concept"]}"/>\n'
-                output += f'    <NamedIndividual IRI="#{triple["individual"]}"/>\n'
-                output += f'  </ClassAssertion>\n'
-            elif triple['relation'] == 'isa':
-                output += f'  <SubClassOf>\n'
-                output += f'    <Class IRI="#{triple["individual"]}"/>\n'
-                output += f'    <Class IRI="#{triple["concept"]}"/>\n'
-                output += f'  </SubClassOf>\n'
-            else:
-                output += f'  <ObjectPropertyAssertion>\n'
-                output += f'    <ObjectProperty IRI="#{triple["relation"]}"/>\n'
-                output += f'    <NamedIndividual IRI="#{triple["individual"]}"/>\n'
-                output += f'    <NamedIndividual IRI="#{triple["concept"]}"/>\n'
-                output += f'  </ObjectPropertyAssertion>\n'
-        output += '</Ontology>\n'
-        return output
-
-    def complete_prolog():
-        json = parser.result
-        validate_json(json)
-
-        output = ''
-
-        output += 'not(X) :- X, !, no.\n'
-        output += 'not(_).\n'
-
-        output += '\n'
-        for concept in json['concepts']:
-            output += f'concept({concept}).\n'
-
-        output += '\n'
-        for concept, attributes in json['concepts'].items():
-            for attribute, typ in attributes.items():
-                output += f'attribute({concept}, [{attribute}:{typ}]).\n'
-
-        output += '\n'
-        relations = json['relations'] + ['iof', 'isa']
-        for relation in relations:
-            output += f'relation({relation}).\n'
-
-        output += '\n'
-        for individual in json['individuals']:
-            output += f'individual({individual}).\n'
-
-        last = None
-        for triple in sorted(json['triples'], key=lambda x: x['relation']):
-            if last != triple['relation']:
-                output += f'\n'
-                last = triple['relation']
-            output += f'{triple["relation"]}({triple["individual"]}, {triple["concept"]}).\n'
-
-        triple_relations = [triple['relation'] for triple in json['triples']]
-        for relation in set(relations) - set(triple_relations):
-            if last != relation:
-                output += f'\n'
-                last = relation
-            output += f'{relation}(_, _) :- false.\n'
-
-        output += '\n'
-        for triple in json['triples']:
-            for key, value in triple['properties'].items():
-                output += f'property({triple["individual"]}, [{value[0]}]).\n'
-
-        output += '\n'
-        output += 'classOf(X, Y) :- iof(X, Y).\n'
-        output += 'classOf(X, Y) :- isa(X, Y).\n'
-
-        output += '\n'
-        output += 'concepts(X, Y) :- concept(X), classOf(Y, X), !.\n'
-        output += "concepts(X, Y) :- write('One of terms '), write(X), write(' or '), write(Y), write(' is not a Concept.'), nl.\n"
-
-        output += '\n'
-        output += 'validIsa(X, Y) :- isa(X, Y), concepts(X, Y), fail.\n'
-        output += "validIsa(_, _) :- write('End of validation.'), nl.\n"
-
-        output += '\n'
-        output += 'individualAndConcept(I, C) :- individual(I), concept(C), !.\n'
-        output += "individualAndConcept(I, C) :- write('One of terms '), write(I), write(' or '), write(C), write(' is not an Individual or a Concept.'), nl.\n"
-
-        output += '\n'
-        output += 'validIof(I, C) :- iof(I, C), individualAndConcept(I, C), fail.\n'
-        output += "validIof(_, _) :- write('End of validation.'), nl.\n"
-
-        return output
-
-    def complete_dot():
-        json = parser.result
-        validate_json(json)
-
-        nodes = set()
-        dot = f'digraph {json["ontology"]} {{'
-
-        dot += '\n  // individuals\n'
-        for key in sorted(json['individuals']):
-            dot += f'  "{key}" [shape=rectangle, style=filled, color=goldenrod];\n'
-
-        dot += '\n  // concepts\n'
-        for key in sorted(json['concepts']):
-            if key not in nodes:
-                nodes.add(key)
-                dot += f'  "{key}" [shape=ellipse, style=filled, color=turquoise4];\n'
-
-        dot += '\n  // concepts properties\n'
-        for key in json['concepts']:
-            for prop in json['concepts'][key]:
-                if prop not in nodes:
-                    nodes.add(prop)
-                    dot += f'  "{prop}" [shape=rectangle, style=solid, color=turquoise4];\n'
-
-        dot += '\n  // concepts properties relations\n'
-        for key in json['concepts']:
-            for prop in json['concepts'][key]:
-                dot += f'  "{key}" -> "{prop}" [label="Properties", style=dotted, color=red];\n'
-
-        dot += '\n  // triples\n'
-        for it in json['triples']:
-            dot += f'  "{it["individual"]}" -> "{it["concept"]}" [label="{it["relation"]}", style=solid, color=black];\n'
-
-        dot += '\n  // triples attributes & relations\n'
-        for it in json['triples']:
-            for attr in it['properties']:
-                value = it['properties'][attr][0].replace('"', "'")
-                node = f'"{attr}={value}"'
-                dot += f'  {node} [shape=rectangle,color=goldenrod];\n'
-                dot += f'  "{it["individual"]}" -> {node} [label="properties", style=dotted, color=red];\n'
-
-        dot += '}\n'
-        return dot
-
-    from ply.yacc import yacc
-    parser = yacc()
+        context.diagnostics.check()
+        return json.dumps(context.result, indent=2)
 
-    if out == 'json':
-        parser.accept = accept_json
-        parser.complete = complete_json
-    elif out == 'log':
-        parser.accept = accept_log
-        parser.complete = complete_log
-    elif out == 'dot':
-        parser.accept = accept_json
-        parser.complete = complete_dot
-    elif out == 'dot:experimental':
-        parser.accept = accept_dot_single_pass
-        parser.complete = complete_dot_single_pass
-        parser.result = {
+    def single_pass_result():
+        return {
             'entries': {
                 'iof': {'type': 'relation'},
                 'isa': {'type': 'relation'},
             },
+            'schemas': Schemas({}),
             'output': []
         }
+
+    def parse_context(input=None, lexer=None, output=None, **kwargs):
+        # Every parse runs on its own copy of the parser, which shares the
+        # tables and the bound productions and keeps the state handlers
+        # reach through p.parser, so the parser can be reused and called
+        # from several threads at once
+        if output is None:
+            output = default_output
+        elif default_output is None:
+            raise Exception('Only a parser created with an output can stream')
+        if lexer is None:
+            # PLY would fall back to the last lexer built in the process,
+            # which every parse without a lexer would then share
+            lexer = create_lexer()
+        context = copy.copy(parser)
+        # The copy runs the parse of PLY, not this one
+        del context.parse
+        context.diagnostics = Diagnostics(collect_errors, max_errors)
+        context.positions = None
+        context.result = None
+        context.emit = functools.partial(stream, context)
+        context.complete = functools.partial(completion, context)
+        if collect_errors:
+            # Reductions need the positions of their first symbol to report
+            # errors, which PLY only tracks on request
+            context.errorfunc = functools.partial(syntax_error, context)
+            context.positions = {'names': {}, 'triples': []}
+            context.diagnostics.source = input or ''
+            if input is None:
+                context.diagnostics.stream = lexer
+            kwargs['tracking'] = True
+
+        if out == 'dot:experimental':
+            context.result = single_pass_result()
+        # Everything is written while parsing, emit() only reports the errors
+        if output is not None:
+            if out in SINKS:
+                context.sink = SINKS[out](output.write, context.diagnostics)
+                context.result = Ontology(None)
+            else:
+                context.result['output'] = LineSink(output.write)
+            context.emit = functools.partial(stream_log, context)
+            context.complete = functools.partial(complete, context)
+
+        LRParser.parse(context, input, lexer, **kwargs)
+        return context
+
+    import copy
+    import functools
+    from ply.yacc import LRParser
+    if cache:
+        if 'parser' not in _tables:
+            _tables['parser'] = load_parser()
+        parser = copy.copy(_tables['parser'])
+    else:
+        from ply.yacc import yacc
+        parser = yacc()
+
+    completion = complete
+    if out == 'json':
+        json_actions = dict(model_actions, root=model_json_root)
+        bind_actions(json_actions)
+        stream = stream_json
+        completion = complete_result_json
+    elif out == 'log':
+        rules = [it.func[2:] for it in parser.productions if it.func]
+        bind_actions({rule: functools.partial(accept_log, rule) for rule in rules})
+        stream = stream_log
+    elif out == 'dot':
+        bind_actions(model_actions)
+        stream = stream_dot
+    elif out == 'dot:experimental':
+        bind_actions(dot_single_pass_actions)
+        stream = stream_dot_single_pass
     elif out == 'prolog':
-        parser.accept = accept_json
-        parser.complete = complete_prolog
+        bind_actions(model_actions)
+        stream = stream_prolog
     elif out == 'owl':
-        parser.accept = accept_json
-        parser.complete = complete_owl
+        bind_actions(model_actions)
+        stream = stream_owl
     else:
-        raise Exception(
-            f'Unknown output type: {out} ["dot", "dot:experimental", "prolog", "owl", "json", "log"]')
-
+        formats = ', '.join(f'"{it}"' for it in FORMATS)
+        raise Exception(f'Unknown output type: {out} [{formats}]')
+
+    # Formats that cannot stream ignore the output
+    default_output = None
+    if output is not None and out in (*SINKS, 'dot:experimental'):
+        default_output = output
+        if out in SINKS:
+            bind_actions(streaming_actions())
+
+    validate = validate_ontology
+    if profiler is not None:
+        productions = []
+        for production in parser.productions:
+            production = copy.copy(production)
+            if production.func:
+                production.callable = profiler.wrap(
+                    f'rule {production.func[2:]}', production.callable)
+            productions.append(production)
+        parser.productions = productions
+        validate = profiler.wrap('validate', validate_ontology)
+
+    parser.parse = parse_context
     return parser
 
 
+def parse_ontology(source, validate=True, collect_errors=False, max_errors=None,
+                   engine='ply'):
+    # Every model based format parses into the same Ontology. The source is
+    # a text or a file, which the fast lexer reads in chunks.
+    parser = create_parser('dot', collect_errors=collect_errors,
+                           max_errors=max_errors)
+    lexer = create_lexer(engine=engine)
+    if isinstance(source, str):
+        text = source
+    elif engine == 'fast':
+        text = None
+        lexer.input_file(source, track_lines=collect_errors)
+    else:
+        text = source.read()
+    context = parser.parse(text, lexer=lexer)
+    context.diagnostics.check()
+    if validate:
+        validate_ontology(context.result, context.diagnostics, context.positions)
+        context.diagnostics.check()
+    return context.result
+
+
+# Incremental
+
+FRAGMENTS = {
+    'dot': dot_triple,
+    'prolog': prolog_triple,
+    'owl': owl_triple,
+    'json': lambda triple: json_triple(triple, first=True),
+}
+
+
+def common_prefix(a, b):
+    # Slices are compared in C, halving the window each time
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def common_suffix(a, b, limit):
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:len(a) - low] == b[len(b) - middle:len(b) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class Change:
+    def __init__(self, declarations, start, removed, triples):
+        self.declarations = declarations
+        self.start = start
+        self.removed = removed
+        self.triples = triples
+
+    def fragments(self, format):
+        # The output of the triples that replaced triples[start:start + removed]
+        return [FRAGMENTS[format](triple) for triple in self.triples]
+
+    def __repr__(self):
+        return (f'Change(declarations={self.declarations}, start={self.start}, '
+                f'removed={self.removed}, added={len(self.triples)})')
+
+
+class IncrementalParser:
+    # Keeps the last parse and, when an edit only touches the triples,
+    # parses and validates again only the triples around it. The text of
+    # the triple i goes from the end of the triple i - 1 (or the '{' of the
+    # triples) to the end of its ';', so the triples split the block.
+    wrapper = ('Ontology T concepts {} individuals {} relations {} triples {', '\n}.')
+
+    def __init__(self, engine='ply'):
+        self.engine = engine
+        self.parser = create_parser('dot')
+        self.text = None
+        self.ontology = None
+        self.symbols = None
+        self.schemas = None
+        self.errors = []
+        self.ends = []
+        self.body = (0, 0)
+
+    def parse(self, text, offset=0):
+        lexer = create_lexer(engine=self.engine)
+        ends = []
+        body = [0, 0]
+        previous = None
+
+        def token():
+            nonlocal previous
+            tok = lexer.token()
+            if tok is not None:
+                if tok.type == ';':
+                    ends.append(tok.lexpos + 1 + offset)
+                elif tok.type == '{' and previous == 'TRIPLES':
+                    body[0] = tok.lexpos + 1 + offset
+                elif tok.type == '}':
+                    body[1] = tok.lexpos + offset
+                previous = tok.type
+            return tok
+
+        lexer.input(text)
+        context = self.parser.parse(lexer=lexer, tokenfunc=token)
+        return context.result, ends, tuple(body)
+
+    def update(self, text):
+        if self.text is not None:
+            change = self.update_triples(text)
+            if change is not None:
+                return change
+        removed = len(self.ontology.triples) if self.ontology else 0
+        self.text = None
+        ontology, self.ends, self.body = self.parse(text)
+        self.ontology = ontology
+        self.symbols = build_symbol_table(ontology)
+        self.check_all()
+        self.text = text
+        return Change(True, 0, removed, ontology.triples)
+
+    def update_triples(self, text):
+        old = self.text
+        if text == old:
+            return Change(False, 0, 0, [])
+        prefix = common_prefix(old, text)
+        suffix = common_suffix(old, text, min(len(old), len(text)) - prefix)
+        delta = len(text) - len(old)
+        body_start, body_end = self.body
+        if prefix < body_start or len(old) - suffix > body_end:
+            return None
+        changed = text[prefix:len(text) - suffix] + old[prefix:len(old) - suffix]
+        if '"' in changed:
+            # A quote can open a string that runs past the edited triples
+            return None
+
+        # Whole lines are parsed again, since a comment runs to the end of
+        # its line, and the wrapper ends the last one
+        import bisect
+        line_start = max(text.rfind('\n', 0, prefix) + 1, body_start)
+        line_end = text.find('\n', len(text) - suffix)
+        line_end = min(body_end, (line_end if line_end >= 0 else len(text)) - delta)
+        ends = self.ends
+        first = bisect.bisect_right(ends, line_start)
+        last = bisect.bisect_left(ends, line_end)
+        start = ends[first - 1] if first else body_start
+        end = ends[last] if last < len(ends) else body_end
+        last = min(last + 1, len(ends))
+
+        head, tail = self.wrapper
+        fragment = text[start:end + delta]
+        try:
+            ontology, new_ends, _ = self.parse(
+                head + fragment + tail, start - len(head))
+        except Exception:
+            return None
+
+        triples = ontology.triples
+        replaced = self.ontology.triples[first:last]
+        self.ontology.triples[first:last] = triples
+        if any(triple.relation == 'isa' for triple in replaced + triples):
+            # The properties of triples anywhere can inherit through the edit
+            self.check_all()
+        else:
+            self.errors[first:last] = [check_triple(triple, self.symbols, self.schemas)
+                                       for triple in triples]
+        self.ends[first:] = new_ends + [it + delta for it in ends[last:]]
+        self.body = (body_start, body_end + delta)
+        self.text = text
+        return Change(False, first, last - first, triples)
+
+    def check_all(self):
+        self.schemas = Schemas.from_ontology(self.ontology)
+        self.errors = [check_triple(triple, self.symbols, self.schemas)
+                       for triple in self.ontology.triples]
+
+    def check(self):
+        for error in self.errors:
+            if error:
+                raise OntologyError(error)
+        edges = [(triple.individual, triple.concept, None)
+                 for triple in self.ontology.triples if triple.relation == 'isa']
+        if edges:
+            error, _ = check_hierarchy(self.ontology.concepts, edges)
+            if error:
+                raise OntologyError(error)
+
+    def emit(self, format):
+        if format != 'json':
+            self.check()
+        return EMITTERS[format](self.ontology)
+
+
+# Output cache
+
+CACHED_FORMATS = ('dot', 'dot:experimental', 'prolog', 'owl', 'json')
+
+
+def output_version():
+    # Any change to the compiler can change the output, so the whole
+    # source is part of the key, not only the grammar
+    if 'output_version' not in _tables:
+        import hashlib
+        with open(__file__, 'rb') as file:
+            digest = hashlib.sha1(file.read())
+        digest.update(grammar_version().encode('ascii'))
+        _tables['output_version'] = digest.hexdigest()[:12]
+    return _tables['output_version']
+
+
+class Tee:
+    def __init__(self, *outputs):
+        self.outputs = outputs
+
+    def write(self, chunk):
+        for output in self.outputs:
+            output.write(chunk)
+
+    def flush(self):
+        for output in self.outputs:
+            output.flush()
+
+
+class OutputCache:
+    # Compiled outputs stored by the hash of the source, the format and the
+    # compiler version. Entries are written to a private file and renamed,
+    # so readers never see a partial output, and a lock file serializes
+    # the statistics and the eviction between processes.
+    def __init__(self, directory=None, max_size=512 << 20):
+        self.directory = directory or os.path.join(cache_dir(), 'outputs')
+        self.max_size = max_size
+
+    def key(self, data, format):
+        import hashlib
+        digest = hashlib.sha256(f'{output_version()}\0{format}\0'.encode('utf-8'))
+        # The data is bytes or an iterable of bytes, hashed as they come
+        for chunk in [data] if isinstance(data, bytes) else data:
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.out')
+
+    def open(self, key):
+        path = self.path(key)
+        try:
+            file = open(path, encoding='utf-8', newline='')
+        except OSError:
+            return None
+        # The modification time orders the entries for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return file
+
+    def store(self, key, write):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        temp = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(temp, 'w', encoding='utf-8', newline='') as file:
+                write(file)
+            os.replace(temp, path)
+        except BaseException:
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    def lock(self):
+        import contextlib
+
+        @contextlib.contextmanager
+        def locked():
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, 'lock'), 'a+b') as file:
+                try:
+                    import fcntl
+                    fcntl.flock(file, fcntl.LOCK_EX)
+                    yield
+                except ImportError:
+                    import msvcrt
+                    file.seek(0)
+                    msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                    try:
+                        yield
+                    finally:
+                        file.seek(0)
+                        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        return locked()
+
+    def entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.out'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        with self.lock():
+            entries = self.entries()
+            size = sum(it[1] for it in entries)
+            for _, entry_size, path in sorted(entries):
+                if size <= self.max_size:
+                    break
+                try:
+                    os.remove(path)
+                    size -= entry_size
+                except OSError:
+                    pass
+
+    def record(self, hit):
+        import json
+        with self.lock():
+            path = os.path.join(self.directory, 'stats.json')
+            try:
+                with open(path, encoding='utf-8') as file:
+                    stats = json.load(file)
+            except (OSError, ValueError):
+                stats = {'hits': 0, 'misses': 0}
+            stats['hits' if hit else 'misses'] += 1
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(stats, file)
+
+    def stats(self):
+        import json
+        os.makedirs(self.directory, exist_ok=True)
+        with self.lock():
+            try:
+                with open(os.path.join(self.directory, 'stats.json'), encoding='utf-8') as file:
+                    stats = json.load(file)
+            except (OSError, ValueError):
+                stats = {'hits': 0, 'misses': 0}
+            entries = self.entries()
+        stats['entries'] = len(entries)
+        stats['size'] = sum(it[1] for it in entries)
+        return stats
+
+
+def execute_cached(file, format, output, cache, **kwargs):
+    import io
+    import shutil
+    kind = f'{format}:materialized' if kwargs.get('materialized') else format
+    if kwargs.get('engine') == 'fast' and file.seekable():
+        # The source is hashed and then lexed again in chunks, so it is
+        # never held whole
+        start = file.tell()
+        key = cache.key((chunk.encode('utf-8') for chunk in read_chunks(file)), kind)
+        file.seek(start)
+        source = file
+    else:
+        text = file.read()
+        key = cache.key(text.encode('utf-8'), kind)
+        source = io.StringIO(text)
+    cached = cache.open(key)
+    if cached is not None:
+        with cached:
+            shutil.copyfileobj(cached, output)
+        cache.record(hit=True)
+        return
+    cache.record(hit=False)
+    # Only outputs that compiled without errors are stored
+    cache.store(key, lambda stored: execute(
+        source, format=format, output=Tee(output, stored), **kwargs))
+
+
+# Batch
+
+FORMATS = ['dot', 'dot:experimental', 'prolog', 'owl', 'json', 'snapshot', 'npz', 'log']
+
+EMITTERS = {
+    'dot': emit_dot,
+    'prolog': emit_prolog,
+    'owl': emit_owl,
+    'json': emit_json,
+    'snapshot': emit_snapshot,
+    'npz': emit_npz,
+}
+
+BINARY_FORMATS = ('snapshot', 'npz')
+
+EXTENSIONS = {
+    'dot': '.dot',
+    'dot:experimental': '.experimental.dot',
+    'prolog': '.pl',
+    'owl': '.owl',
+    'json': '.json',
+    'snapshot': '.ontosnap',
+    'npz': '.npz',
+}
+
+
+def output_stem(path, output_dir):
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0])
+
+
+def compile_file(path, formats, output_dir, collect_errors=False, max_errors=None,
+                 engine='ply', materialized=False):
+    with open(path, encoding='utf-8') as file:
+        ontology = read_snapshot(file)
+        source = file
+        if ontology is not None:
+            if 'dot:experimental' in formats:
+                raise Exception('Format "dot:experimental" requires an ONTODL source')
+        elif engine != 'fast' or 'dot:experimental' in formats:
+            # The single pass parser reads the source a second time
+            source = file.read()
+
+        # Every backend except the single pass one reads the same parse result
+        streams = {}
+        shared = [it for it in formats if it in EMITTERS]
+        if shared:
+            if ontology is None:
+                ontology = parse_ontology(source, shared != ['json'] or materialized,
+                                          collect_errors, max_errors, engine)
+            if materialized:
+                ontology = materialize(ontology)
+            for format in shared:
+                streams[format] = EMITTERS[format](ontology)
+        if 'dot:experimental' in formats:
+            parser = create_parser('dot:experimental', collect_errors=collect_errors,
+                                   max_errors=max_errors)
+            context = parser.parse(source, lexer=create_lexer(engine=engine))
+            streams['dot:experimental'] = context.emit()
+
+    outputs = []
+    stem = output_stem(path, output_dir)
+    for format in formats:
+        if format not in EXTENSIONS:
+            raise Exception(f'Format "{format}" is not supported in batch mode')
+        outputs.append(stem + EXTENSIONS[format])
+        if format in BINARY_FORMATS:
+            with open(outputs[-1], 'wb') as output:
+                for chunk in streams[format]:
+                    output.write(chunk)
+            continue
+        with open(outputs[-1], 'w', encoding='utf-8') as output:
+            for chunk in streams[format]:
+                output.write(chunk)
+    return outputs
+
+
+def try_compile_file(path, formats, output_dir, collect_errors=False, max_errors=None,
+                     engine='ply', materialized=False):
+    try:
+        outputs = compile_file(path, formats, output_dir,
+                               collect_errors, max_errors, engine, materialized)
+        return (path, outputs, None)
+    except Exception as e:
+        return (path, [], e)
+
+
+def preload_tables():
+    create_lexer()
+    create_parser()
+
+
+def compile_files(paths, formats, output_dir, collect_errors=False, max_errors=None,
+                  jobs=1, engine='ply', materialized=False):
+    stems = [output_stem(path, output_dir) for path in paths]
+    if len(set(stems)) != len(stems):
+        raise Exception('Input files must have distinct names in batch mode')
+    os.makedirs(output_dir, exist_ok=True)
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(paths) < 2:
+        return [try_compile_file(path, formats, output_dir, collect_errors, max_errors,
+                                 engine, materialized)
+                for path in paths]
+
+    # Workers load the cached tables once, and map() keeps the results in
+    # input order whatever the number of workers
+    import functools
+    from concurrent.futures import ProcessPoolExecutor
+    preload_tables()
+    task = functools.partial(try_compile_file, formats=formats, output_dir=output_dir,
+                             collect_errors=collect_errors, max_errors=max_errors,
+                             engine=engine, materialized=materialized)
+    chunksize = max(1, min(64, len(paths) // (jobs * 4)))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=preload_tables) as executor:
+        return list(executor.map(task, paths, chunksize=chunksize))
+
+
+# Server
+
+SERVED_FORMATS = ('dot', 'dot:experimental', 'prolog', 'owl', 'json')
+
+
+def compile_request(request, engine='ply'):
+    import io
+    response = {'id': request.get('id')}
+    try:
+        format = request.get('format', 'dot')
+        if format not in SERVED_FORMATS:
+            formats = ', '.join(f'"{it}"' for it in SERVED_FORMATS)
+            raise Exception(f'Unknown output type: {format} [{formats}]')
+        source = request['source']
+        if not isinstance(source, str):
+            raise Exception('"source" must be a string')
+        output = io.StringIO()
+        execute(io.StringIO(source), format=format, output=output,
+                collect_errors=bool(request.get('all_errors')),
+                max_errors=request.get('max_errors', 100) or None, engine=engine,
+                materialized=bool(request.get('materialize')))
+        response['output'] = output.getvalue()
+    except OntologyErrors as e:
+        response['errors'] = [
+            {'message': it.message, 'line': it.line, 'column': it.column}
+            for it in e.errors]
+        response['truncated'] = e.truncated
+    except KeyError as e:
+        response['error'] = f'Missing field {e}'
+    except Exception as e:
+        response['error'] = str(e)
+    return response
+
+
+def percentile(values, fraction):
+    import math
+    values = sorted(values)
+    if not values:
+        return None
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class Server:
+    # Requests are lines of JSON, {"id", "source", "format", "all_errors",
+    # "max_errors", "materialize"}, answered by lines of JSON with the same
+    # "id" in the order they complete. {"stats": true} answers the latency
+    # so far.
+    def __init__(self, jobs=1, engine='ply', window=10000):
+        import collections
+        self.jobs = jobs or os.cpu_count() or 1
+        self.engine = engine
+        self.requests = 0
+        self.latencies = collections.deque(maxlen=window)
+        self.executor = None
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'p50_ms': self.latency(0.50),
+            'p99_ms': self.latency(0.99),
+        }
+
+    def latency(self, fraction):
+        value = percentile(self.latencies, fraction)
+        return None if value is None else round(value * 1000, 3)
+
+    def format_stats(self):
+        stats = self.stats()
+        if not stats['requests']:
+            return 'served 0 requests'
+        return (f'served {stats["requests"]} requests, '
+                f'p50 {stats["p50_ms"]} ms, p99 {stats["p99_ms"]} ms')
+
+    async def handle(self, line, write):
+        import asyncio
+        import json
+        import time
+        start = time.perf_counter()
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('a request must be an object')
+        except ValueError as e:
+            write({'id': None, 'error': f'Invalid request: {e}'})
+            return
+        if request.get('stats'):
+            write(dict(self.stats(), id=request.get('id')))
+            return
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            self.executor, compile_request, request, self.engine)
+        self.requests += 1
+        self.latencies.append(time.perf_counter() - start)
+        write(response)
+
+    async def serve_lines(self, readline, write):
+        import asyncio
+        pending = set()
+        while line := await readline():
+            if not line.strip():
+                continue
+            task = asyncio.create_task(self.handle(line, write))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.wait(pending)
+
+    async def serve_stdio(self):
+        import asyncio
+        import json
+        loop = asyncio.get_running_loop()
+
+        async def readline():
+            return await loop.run_in_executor(None, sys.stdin.buffer.readline)
+
+        def write(response):
+            sys.stdout.write(json.dumps(response) + '\n')
+            sys.stdout.flush()
+
+        await self.serve_lines(readline, write)
+
+    async def serve_socket(self, path):
+        import asyncio
+        import json
+
+        async def client(reader, writer):
+            def write(response):
+                writer.write((json.dumps(response) + '\n').encode('utf-8'))
+
+            try:
+                await self.serve_lines(reader.readline, write)
+                await writer.drain()
+            except asyncio.CancelledError:
+                # The server is shutting down, the connection is only closed
+                pass
+            finally:
+                writer.close()
+
+        server = await asyncio.start_unix_server(client, path, limit=1 << 30)
+        async with server:
+            await server.serve_forever()
+
+    async def serve(self, address='-'):
+        from concurrent.futures import ProcessPoolExecutor
+        # Every worker loads the tables once and keeps them for all requests
+        preload_tables()
+        self.executor = ProcessPoolExecutor(max_workers=self.jobs,
+                                            initializer=preload_tables)
+        try:
+            if address == '-':
+                await self.serve_stdio()
+            else:
+                await self.serve_socket(address)
+        finally:
+            self.executor.shutdown(cancel_futures=True)
+
+
 def parse_args():
     import argparse
     argparser = argparse.ArgumentParser(description='ONTODL language parser')
-    argparser.add_argument('file', type=argparse.FileType('r'))
+    argparser.add_argument('files', nargs='*', metavar='file')
     argparser.add_argument('--tokenize', action='store_true',
                            help='Tokenize only')
-    argparser.add_argument('-f', '--format', type=str, default='dot',
-                           choices=['dot', 'dot:experimental',
-                                    'prolog', 'owl', 'json', 'log'],
-                           help='Output format')
+    argparser.add_argument('-f', '--format', type=str, action='append',
+                           choices=FORMATS,
+                           help='Output format, repeat it to compile several formats (default: dot)')
     argparser.add_argument('-o', '--output', type=argparse.FileType('w'),
                            default=sys.stdout,
                            help='Output file')
-    return argparser.parse_args()
-
+    argparser.add_argument('-d', '--output-dir', type=str,
+                           help='Compile every file to every format into this directory')
+    argparser.add_argument('-j', '--jobs', type=int, default=1,
+                           help='Number of worker processes with --output-dir or --serve (0 for one per CPU)')
+    argparser.add_argument('--serve', type=str, nargs='?', const='-', metavar='SOCKET',
+                           help='Compile JSON requests read from stdin, or from a local SOCKET, until closed')
+    argparser.add_argument('--lexer', type=str, choices=LEXER_ENGINES, default='ply',
+                           help='Lexer engine, "fast" uses a single compiled scanner (default: ply)')
+    argparser.add_argument('--materialize', action='store_true',
+                           help='Add the iof and isa triples implied by the isa hierarchy to the output')
+    argparser.add_argument('--query', type=str, action='append', metavar='PATTERN',
+                           help='Print the triples matching a pattern like "? = iof => Concept" instead of an output format, repeat it for more patterns')
+    argparser.add_argument('--stream', action='store_true',
+                           help='Write each triple as soon as it is parsed, the output may be incomplete on errors')
+    argparser.add_argument('--cache', action='store_true',
+                           help='Serve unchanged sources from the compiled output cache')
+    argparser.add_argument('--cache-size', type=int, default=512,
+                           help='Maximum size of the output cache in MB (default: 512)')
+    argparser.add_argument('--cache-stats', action='store_true',
+                           help='Print the output cache hits and misses, implies --cache')
+    argparser.add_argument('--profile', type=str, nargs='?', const='-', metavar='FILE',
+                           help='Print the time of each phase and grammar rule, or write it as JSON to FILE')
+    argparser.add_argument('--profile-memory', action='store_true',
+                           help='Also trace the memory allocated by each phase with --profile (slower)')
+    argparser.add_argument('--all-errors', action='store_true',
+                           help='Report every syntax and semantic error instead of stopping at the first one')
+    argparser.add_argument('--max-errors', type=int, default=100,
+                           help='Stop after this many errors with --all-errors (0 for no limit)')
+    args = argparser.parse_args()
+    if args.serve:
+        if args.files:
+            argparser.error('--serve reads the sources from the requests')
+        return args
+    if not args.files:
+        argparser.error('the following arguments are required: file')
+    args.format = args.format or ['dot']
+
+    if args.materialize:
+        if args.tokenize or args.stream:
+            argparser.error('--materialize does not support --tokenize or --stream')
+        unsupported = [it for it in args.format or ['dot'] if it not in EMITTERS]
+        if unsupported:
+            argparser.error(f'format "{unsupported[0]}" does not support --materialize')
+    if args.query:
+        if args.tokenize or args.stream or args.output_dir:
+            argparser.error('--query does not support --tokenize, --stream or --output-dir')
+        for query in args.query:
+            try:
+                parse_query(query)
+            except Exception as e:
+                argparser.error(str(e))
+    if args.output_dir:
+        if args.tokenize:
+            argparser.error('--tokenize does not support --output-dir')
+        unsupported = [it for it in args.format if it not in EXTENSIONS]
+        if unsupported:
+            argparser.error(f'format "{unsupported[0]}" does not support --output-dir')
+        return args
+    if len(args.files) > 1 or len(args.format) > 1:
+        argparser.error('several files or formats require --output-dir')
+    try:
+        args.file = argparse.FileType('r')(args.files[0])
+    except argparse.ArgumentTypeError as e:
+        argparser.error(str(e))
+    args.format = args.format[0]
+    return args
+
+
+def execute(file, tokenize=False, format='dot', output=sys.stdout,
+            collect_errors=False, max_errors=None, engine='ply', stream=False,
+            cache=None, profiler=None, materialized=False, queries=None):
+    profiled = profiler.wrap if profiler is not None else lambda name, func: func
+    ontology = profiled('load', read_snapshot)(file)
+    if ontology is not None:
+        if tokenize:
+            raise Exception('Tokenizing requires an ONTODL source')
+        if format not in EMITTERS:
+            raise Exception(f'Format "{format}" requires an ONTODL source')
+    elif cache is not None and not tokenize and not queries and format in CACHED_FORMATS:
+        execute_cached(file, format, output, cache, collect_errors=collect_errors,
+                       max_errors=max_errors, engine=engine, stream=stream,
+                       profiler=profiler, materialized=materialized)
+        return
+    elif format in BINARY_FORMATS or materialized or queries:
+        if materialized and format not in EMITTERS:
+            raise Exception(f'Format "{format}" does not support --materialize')
+        ontology = profiled('parse', parse_ontology)(
+            file, True, collect_errors, max_errors, engine)
+    if materialized:
+        ontology = profiled('materialize', materialize)(ontology)
+    if queries:
+        # The answers are written as triples, one per line
+        patterns = [parse_query(it) for it in queries]
+        graph = profiled('index', OntologyGraph.from_ontology)(ontology)
+        for pattern in patterns:
+            for subject, relation, object in graph.match(*pattern):
+                output.write(f'{subject} = {relation} => {object};\n')
+        return
+    if ontology is not None:
+        chunks = EMITTERS[format](ontology)
+        if profiler is not None:
+            chunks = profiler.iterate('emit', chunks)
+        if format in BINARY_FORMATS:
+            output.flush()
+            output = getattr(output, 'buffer', output)
+        for chunk in chunks:
+            output.write(chunk)
+        return
 
-def execute(file, tokenize=False, format='dot', output=sys.stdout):
     if tokenize:
-        lexer = create_lexer()
-        lexer.input(file.read())
+        lexer = profiled('tables', create_lexer)(engine=engine)
+        if engine == 'fast':
+            lexer.input_file(file)
+        else:
+            lexer.input(file.read())
+        next_token = profiled('lex', lexer.next)
         try:
-            while tok := lexer.next():
+            while tok := next_token():
                 output.write(str(tok) + '\n')
         except StopIteration:
             pass
         return
 
-    lexer = create_lexer()
-    parser = create_parser(format)
-    parser.parse(file.read())
-    output.write(parser.complete())
+    lexer = profiled('tables', create_lexer)(engine=engine)
+    parser = profiled('tables', create_parser)(
+        format, collect_errors=collect_errors, max_errors=max_errors,
+        output=output if stream else None, profiler=profiler)
+    text = None
+    if engine == 'fast':
+        lexer.input_file(file, track_lines=collect_errors)
+    else:
+        text = file.read()
+    if profiler is not None:
+        lexer.token = profiler.wrap('lex', lexer.token)
+    context = profiled('parse', parser.parse)(text, lexer=lexer)
+    if profiler is None:
+        chunks = context.emit()
+    else:
+        # emit() validates before returning, so it is called, and timed,
+        # with the first chunk
+        chunks = profiler.iterate('emit', (
+            chunk for emit in [context.emit] for chunk in emit()))
+    for chunk in chunks:
+        output.write(chunk)
 
 
 if __name__ == '__main__':
     args = parse_args()
-    execute(args.file, args.tokenize, args.format, args.output)
+    if args.serve:
+        import asyncio
+        server = Server(args.jobs, args.lexer)
+        try:
+            asyncio.run(server.serve(args.serve))
+        except KeyboardInterrupt:
+            pass
+        print(server.format_stats(), file=sys.stderr)
+        sys.exit(0)
+    if args.output_dir:
+        results = compile_files(args.files, args.format, args.output_dir,
+                                args.all_errors, args.max_errors, args.jobs,
+                                args.lexer, args.materialize)
+        failed = False
+        for path, outputs, error in results:
+            if isinstance(error, OntologyErrors):
+                print(error.format(path), file=sys.stderr)
+            elif error:
+                print(f'{path}: {error}', file=sys.stderr)
+            failed = failed or error is not None
+        sys.exit(1 if failed else 0)
+    cache = None
+    if args.cache or args.cache_stats:
+        cache = OutputCache(max_size=args.cache_size << 20)
+    profiler = None
+    if args.profile:
+        profiler = Profiler(args.profile_memory)
+        profiler.start()
+    try:
+        execute(args.file, args.tokenize, args.format, args.output,
+                args.all_errors, args.max_errors, args.lexer, args.stream, cache,
+                profiler, args.materialize, args.query)
+    except OntologyErrors as e:
+        print(e.format(args.file.name), file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            if args.profile == '-':
+                print(profiler.format(), file=sys.stderr)
+            else:
+                import json
+                with open(args.profile, 'w', encoding='utf-8') as file:
+                    json.dump(profiler.report(), file, indent=2)
+        if args.cache_stats:
+            stats = cache.stats()
+            print(f'cache: {stats["hits"]} hits, {stats["misses"]} misses, '
+                  f'{stats["entries"]} entries, {stats["size"]} bytes', file=sys.stderr)
@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import time
+
+parent_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_path)
+
+SAMPLE = os.path.join(parent_path, 'samples', 'sample3.ontodl')
+
+
+def replicate_triples(path, copies):
+    with open(path, encoding='utf-8') as file:
+        lines = file.read().split('\n')
+    start = next(i for i, line in enumerate(lines) if line.startswith('triplos')) + 1
+    end = next(i for i in range(len(lines) - 1, -1, -1) if lines[i].startswith('}'))
+    return '\n'.join(lines[:start] + lines[start:end] * copies + lines[end:])
+
+
+def count_reductions(format, text):
+    from ontodl import create_lexer, create_parser
+    parser = create_parser(format)
+    reductions = 0
+
+    def counted(callable):
+        def action(p):
+            nonlocal reductions
+            reductions += 1
+            callable(p)
+        return action
+
+    import copy
+    productions = []
+    for production in parser.productions:
+        production = copy.copy(production)
+        if production.callable:
+            production.callable = counted(production.callable)
+        productions.append(production)
+    parser.productions = productions
+    parser.parse(text, lexer=create_lexer())
+    return reductions
+
+
+def bench_actions(formats, copies, repeat):
+    from ontodl import create_lexer, create_parser
+
+    text = replicate_triples(SAMPLE, copies)
+    print(f'{"format":>18} {"reductions":>12} {"seconds":>10} {"reductions/s":>14}')
+    for format in formats:
+        reductions = count_reductions(format, text)
+        best = float('inf')
+        for _ in range(repeat):
+            parser = create_parser(format)
+            lexer = create_lexer()
+            start = time.perf_counter()
+            parser.parse(text, lexer=lexer)
+            best = min(best, time.perf_counter() - start)
+        print(f'{format:>18} {reductions:>12} {best:>10.3f} {reductions / best:>14.0f}')
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(
+        description='Measure semantic action throughput on a replicated sample')
+    argparser.add_argument('--copies', type=int, default=500,
+                           help='Number of copies of the triples of samples/sample3.ontodl')
+    argparser.add_argument('--repeat', type=int, default=3)
+    argparser.add_argument('formats', nargs='*',
+                           default=['json', 'dot', 'dot:experimental'])
+    args = argparser.parse_args()
+    bench_actions(args.formats, args.copies, args.repeat)
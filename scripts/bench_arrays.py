@@ -0,0 +1,59 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+parent_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_path)
+
+
+def bench_arrays(triples, seed):
+    import numpy
+    from ontodl import emit_json, emit_npz, load_arrays, parse_ontology, relation_rows
+    from generate_ontology import generate_ontology
+
+    ontology = parse_ontology(generate_ontology(triples, seed=seed), validate=False)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ontology.npz')
+        start = time.perf_counter()
+        with open(path, 'wb') as file:
+            for chunk in emit_npz(ontology):
+                file.write(chunk)
+        print(f'{len(ontology.triples)} triples')
+        print(f'export        {time.perf_counter() - start:>8.3f} s  '
+              f'{os.path.getsize(path) / 2 ** 20:.1f} MB')
+
+        start = time.perf_counter()
+        arrays = load_arrays(path)
+        print(f'load mapped   {(time.perf_counter() - start) * 1000:>8.2f} ms')
+        start = time.perf_counter()
+        numpy.load(path)['subjects']
+        print(f'load subjects {(time.perf_counter() - start) * 1000:>8.2f} ms  (numpy.load)')
+        start = time.perf_counter()
+        indptr, _ = relation_rows(arrays, 'iof')
+        print(f'iof rows      {(time.perf_counter() - start) * 1000:>8.2f} ms')
+
+        # What the analytics jobs do today with the json output
+        path = os.path.join(directory, 'ontology.json')
+        with open(path, 'w', encoding='utf-8') as file:
+            for chunk in emit_json(ontology):
+                file.write(chunk)
+        start = time.perf_counter()
+        with open(path, encoding='utf-8') as file:
+            data = json.load(file)
+        names = {name: i for i, name in
+                 enumerate(list(data['concepts']) + data['individuals'])}
+        numpy.array([names[it['individual']] for it in data['triples']], dtype=numpy.int32)
+        numpy.array([names[it['concept']] for it in data['triples']], dtype=numpy.int32)
+        print(f'json          {(time.perf_counter() - start) * 1000:>8.2f} ms')
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(
+        description='Time the npz export and loading it back, against reading the json output')
+    argparser.add_argument('triples', type=int, nargs='?', default=1_000_000)
+    argparser.add_argument('--seed', type=int, default=0)
+    args = argparser.parse_args()
+    bench_arrays(args.triples, args.seed)
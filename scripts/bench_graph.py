@@ -0,0 +1,50 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+parent_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_path)
+
+
+def bench_graph(triples, queries, seed, engine):
+    from ontodl import OntologyGraph, parse_ontology
+    from generate_ontology import generate_ontology
+
+    ontology = parse_ontology(generate_ontology(triples, seed=seed), validate=False)
+    start = time.perf_counter()
+    graph = OntologyGraph.from_ontology(ontology, engine)
+    print(f'{len(graph)} triples, {len(graph.names)} names')
+    print(f'index  {time.perf_counter() - start:>8.3f} s')
+
+    rng = random.Random(seed)
+    edges = [rng.choice(ontology.triples) for _ in range(queries)]
+    for name, pattern in [('s r ?', lambda it: (it.individual, it.relation, None)),
+                          ('? r o', lambda it: (None, it.relation, it.concept)),
+                          ('s r o', lambda it: (it.individual, it.relation, it.concept))]:
+        patterns = [pattern(it) for it in edges]
+        start = time.perf_counter()
+        found = sum(1 for it in patterns for _ in graph.match(*it))
+        elapsed = time.perf_counter() - start
+        print(f'{name}  {elapsed / queries * 1e6:>8.2f} us per query, {found / queries:.1f} triples each')
+
+    # The scan the index replaces
+    sample = edges[:max(1, queries // 1000)]
+    start = time.perf_counter()
+    for edge in sample:
+        [it for it in ontology.triples
+         if it.individual == edge.individual and it.relation == edge.relation]
+    elapsed = time.perf_counter() - start
+    print(f'scan   {elapsed / len(sample) * 1e6:>8.2f} us per query')
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(
+        description='Time the adjacency index and its lookups on a generated ontology')
+    argparser.add_argument('triples', type=int, nargs='?', default=1_000_000)
+    argparser.add_argument('--queries', type=int, default=100_000)
+    argparser.add_argument('--seed', type=int, default=0)
+    argparser.add_argument('--engine', type=str, choices=['python', 'numpy'])
+    args = argparser.parse_args()
+    bench_graph(args.triples, args.queries, args.seed, args.engine)
@@ -0,0 +1,68 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+parent_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_path)
+
+
+def generate_hierarchy(concepts, extra, seed):
+    rng = random.Random(seed)
+    names = [f'C{i}' for i in range(concepts)]
+    edges = [(names[i], names[rng.randrange(max(0, i - 1000), i)]) for i in range(1, concepts)]
+    for _ in range(extra):
+        child = rng.randrange(1, concepts)
+        edges.append((names[child], names[rng.randrange(child)]))
+    return names, edges
+
+
+def bench_hierarchy(concepts, extra, queries, seed, budget):
+    from ontodl import Hierarchy
+
+    names, edges = generate_hierarchy(concepts, extra, seed)
+    start = time.perf_counter()
+    hierarchy = Hierarchy(names, edges)
+    if budget is not None:
+        hierarchy.interval_budget = budget
+    sorted_at = time.perf_counter()
+    hierarchy.label()
+    labeled_at = time.perf_counter()
+    intervals = len(hierarchy.starts)
+    print(f'{concepts} concepts, {len(edges)} isa triples')
+    print(f'sort   {sorted_at - start:>8.3f} s')
+    searched = sum(not hierarchy.labeled(node) for node in range(concepts))
+    print(f'label  {labeled_at - sorted_at:>8.3f} s  {intervals / concepts:.2f} intervals per concept, '
+          f'{searched} concepts past the budget')
+
+    rng = random.Random(seed)
+    pairs = [(rng.choice(names), rng.choice(names)) for _ in range(queries)]
+    start = time.perf_counter()
+    found = sum(hierarchy.is_a(concept, ancestor) for concept, ancestor in pairs)
+    elapsed = time.perf_counter() - start
+    print(f'is_a   {elapsed / queries * 1e6:>8.2f} us per query, {found} true')
+
+    # The search the labels replace
+    sample = pairs[:max(1, queries // 1000)]
+    start = time.perf_counter()
+    for concept, ancestor in sample:
+        hierarchy.index[ancestor] in hierarchy.reachable(hierarchy.index[concept],
+                                                          hierarchy.parents)
+    elapsed = time.perf_counter() - start
+    print(f'search {elapsed / len(sample) * 1e6:>8.2f} us per query')
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(
+        description='Time the isa hierarchy index on a generated hierarchy')
+    argparser.add_argument('concepts', type=int, nargs='?', default=100_000)
+    argparser.add_argument('--extra', type=int, default=10_000,
+                           help='Number of isa triples added to the tree, as many as the '
+                                'concepts for a dense hierarchy')
+    argparser.add_argument('--budget', type=int,
+                           help='Intervals per concept before labeling stops')
+    argparser.add_argument('--queries', type=int, default=1_000_000)
+    argparser.add_argument('--seed', type=int, default=0)
+    args = argparser.parse_args()
+    bench_hierarchy(args.concepts, args.extra, args.queries, args.seed, args.budget)
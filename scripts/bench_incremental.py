@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import time
+
+parent_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_path)
+
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - start
+
+
+def bench_incremental(triples, edits, format, engine):
+    from ontodl import IncrementalParser
+    from generate_ontology import generate_ontology
+
+    text = generate_ontology(triples)
+    parser = IncrementalParser(engine)
+    _, parse = timed(lambda: parser.update(text))
+    _, emit = timed(lambda: ''.join(parser.emit(format)))
+    print(f'full parse {parse:.3f}s, {format} output {emit:.3f}s')
+
+    # Edit one triple spread over the file, as a save in an editor would. The
+    # subject is moved to the next declared individual, so the triple stays
+    # valid.
+    lines = text.split('\n')
+    start = lines.index('individuals {') + 1
+    individuals = [it.strip().rstrip(',') for it in lines[start:lines.index('}', start)]]
+    following = dict(zip(individuals, individuals[1:] + individuals[:1]))
+    first = lines.index('triples {') + 1
+    step = max(1, (len(lines) - first - 1) // edits)
+    total = 0
+    print(f'{"line":>10} {"update":>10} {"output":>10} {"fragments":>10}')
+    for line in range(first, len(lines) - 1, step)[:edits]:
+        subject, rest = lines[line].split(' = ', 1)
+        lines[line] = (subject.replace(subject.strip(), following[subject.strip()])
+                       + ' = ' + rest.replace(' => ', ' =>  ', 1))
+        text = '\n'.join(lines)
+        change, update = timed(lambda: parser.update(text))
+        assert not change.declarations
+        fragments = change.fragments(format)
+        _, emit = timed(lambda: ''.join(parser.emit(format)))
+        total += update + emit
+        print(f'{line:>10} {update:>10.4f} {emit:>10.4f} {len(fragments):>10}')
+    print(f'edit to output {total / edits:.3f}s on average, '
+          f'{parse / (total / edits):.1f}x faster than parsing again')
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(
+        description='Measure the edit to output latency of the incremental parser')
+    argparser.add_argument('triples', type=int, nargs='?', default=100_000)
+    argparser.add_argument('--edits', type=int, default=5)
+    argparser.add_argument('--format', default='dot')
+    argparser.add_argument('--lexer', default='ply')
+    args = argparser.parse_args()
+    bench_incremental(args.triples, args.edits, args.format, args.lexer)
@@ -0,0 +1,45 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+parent_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_path)
+
+
+def retained(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def bench_memory(triples):
+    from ontodl import complete_json, parse_ontology
+    from generate_ontology import generate_ontology
+
+    text = generate_ontology(triples)
+    json_text = complete_json(parse_ontology(text, validate=False))
+
+    # json.loads rebuilds the dict/list model with one string per
+    # occurrence, as the parser actions used to produce it
+    _, legacy = retained(lambda: json.loads(json_text))
+    _, compact = retained(lambda: parse_ontology(text, validate=False))
+
+    print(f'{"model":>10} {"bytes":>14} {"bytes/triple":>14}')
+    print(f'{"dict/list":>10} {legacy:>14} {legacy / triples:>14.1f}')
+    print(f'{"slots":>10} {compact:>14} {compact / triples:>14.1f}')
+    print(f'compact model uses {compact / legacy:.0%} of the dict/list model')
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(
+        description='Compare the memory of the compact model with the dict/list model')
+    argparser.add_argument('triples', type=int, nargs='?', default=200_000)
+    args = argparser.parse_args()
+    bench_memory(args.triples)
@@ -0,0 +1,42 @@
+import argparse
+import os
+import sys
+import time
+
+parent_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_path)
+
+
+def bench_parse(sizes, tolerance):
+    from ontodl import create_lexer, create_parser
+    from generate_ontology import generate_ontology
+
+    print(f'{"triples":>10} {"seconds":>10} {"us/triple":>10}')
+    costs = []
+    for size in sizes:
+        text = generate_ontology(size)
+        lexer = create_lexer()
+        parser = create_parser('json')
+        start = time.perf_counter()
+        context = parser.parse(text, lexer=lexer)
+        elapsed = time.perf_counter() - start
+        assert len(context.result['triples']) == size
+        cost = elapsed / size * 1e6
+        costs.append(cost)
+        print(f'{size:>10} {elapsed:>10.3f} {cost:>10.2f}')
+
+    # Linear parsing keeps the cost per triple roughly constant
+    growth = costs[-1] / costs[0]
+    print(f'cost per triple grew {growth:.2f}x from {sizes[0]} to {sizes[-1]} triples')
+    return growth <= tolerance
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(
+        description='Check that parse time grows linearly with the number of triples')
+    argparser.add_argument('sizes', type=int, nargs='*',
+                           default=[1_000, 10_000, 100_000, 1_000_000])
+    argparser.add_argument('--tolerance', type=float, default=2.0,
+                           help='Maximum allowed growth of the cost per triple')
+    args = argparser.parse_args()
+    sys.exit(0 if bench_parse(args.sizes, args.tolerance) else 1)
@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+parent_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_path)
+
+ONTODL = os.path.join(parent_path, 'ontodl.py')
+
+
+def percentiles(latencies):
+    from ontodl import percentile
+    return percentile(latencies, 0.50) * 1000, percentile(latencies, 0.99) * 1000
+
+
+def bench_processes(text, format, requests):
+    # One compiler process per request, as the frontend does today
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, ONTODL, '/dev/stdin', '--format', format],
+                       input=text, capture_output=True, text=True, check=True)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_server(text, format, requests, jobs, concurrency):
+    server = subprocess.Popen([sys.executable, ONTODL, '--serve', '--jobs', str(jobs)],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE, text=True)
+    sent = {}
+
+    def send(id):
+        sent[id] = time.perf_counter()
+        server.stdin.write(json.dumps({'id': id, 'source': text, 'format': format}) + '\n')
+        server.stdin.flush()
+
+    # Warm up every worker before measuring
+    for i in range(jobs):
+        send(-1 - i)
+    for _ in range(jobs):
+        server.stdout.readline()
+
+    # Keep the same number of requests in flight, so the latency is not
+    # only the time spent waiting in the queue
+    latencies = []
+    start = time.perf_counter()
+    for id in range(min(concurrency, requests)):
+        send(id)
+    next_id = min(concurrency, requests)
+    for _ in range(requests):
+        response = json.loads(server.stdout.readline())
+        assert 'output' in response, response
+        latencies.append(time.perf_counter() - sent[response['id']])
+        if next_id < requests:
+            send(next_id)
+            next_id += 1
+    elapsed = time.perf_counter() - start
+    server.stdin.close()
+    server.wait()
+    report = server.stderr.read().strip().splitlines()
+    return latencies, elapsed, report[-1] if report else ''
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(
+        description='Compare the latency of the compile server with one process per request')
+    argparser.add_argument('--triples', type=int, default=100)
+    argparser.add_argument('--format', type=str, default='owl')
+    argparser.add_argument('--requests', type=int, default=200)
+    argparser.add_argument('--process-requests', type=int, default=10)
+    argparser.add_argument('--jobs', type=int, default=2)
+    argparser.add_argument('--concurrency', type=int, default=2,
+                           help='Number of requests sent to the server at a time')
+    args = argparser.parse_args()
+
+    from generate_ontology import generate_ontology
+    text = generate_ontology(args.triples)
+
+    latencies = bench_processes(text, args.format, args.process_requests)
+    p50, p99 = percentiles(latencies)
+    print(f'{"processes":>10} p50 {p50:>8.1f} ms  p99 {p99:>8.1f} ms')
+    latencies, elapsed, report = bench_server(text, args.format, args.requests, args.jobs,
+                                             args.concurrency)
+    p50, p99 = percentiles(latencies)
+    print(f'{"server":>10} p50 {p50:>8.1f} ms  p99 {p99:>8.1f} ms  '
+          f'{args.requests / elapsed:.0f} requests/s')
+    print(f'server side: {report}')
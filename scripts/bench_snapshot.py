@@ -0,0 +1,41 @@
+import argparse
+import io
+import os
+import sys
+import time
+
+parent_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_path)
+
+
+def timed(build):
+    start = time.perf_counter()
+    result = build()
+    return result, time.perf_counter() - start
+
+
+def bench_snapshot(triples):
+    from ontodl import dump_snapshot, loads_snapshot, parse_ontology
+    from generate_ontology import generate_ontology
+
+    text = generate_ontology(triples)
+    ontology, parse = timed(lambda: parse_ontology(text))
+    output = io.BytesIO()
+    _, dump = timed(lambda: dump_snapshot(ontology, output))
+    data = output.getvalue()
+    loaded, load = timed(lambda: loads_snapshot(data))
+    assert loaded == ontology
+
+    print(f'{"step":>10} {"seconds":>10} {"bytes":>12}')
+    print(f'{"parse":>10} {parse:>10.3f} {len(text.encode()):>12}')
+    print(f'{"dump":>10} {dump:>10.3f} {len(data):>12}')
+    print(f'{"load":>10} {load:>10.3f} {len(data):>12}')
+    print(f'loading the snapshot is {parse / load:.1f}x faster than parsing')
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(
+        description='Compare loading a snapshot with parsing the source')
+    argparser.add_argument('triples', type=int, nargs='?', default=200_000)
+    args = argparser.parse_args()
+    bench_snapshot(args.triples)
@@ -0,0 +1,125 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+parent_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_path)
+
+BACKENDS = ['dot', 'prolog', 'owl', 'json']
+
+
+def phases(text, engine):
+    import ontodl
+
+    def lex():
+        lexer = ontodl.create_lexer(engine=engine)
+        lexer.input(text)
+        return sum(1 for _ in iter(lexer.token, None))
+
+    # Parsing pulls its tokens from the lexer, so it includes lexing
+    yield 'lex', lex, None
+    yield 'parse', lambda: ontodl.parse_ontology(text, validate=False, engine=engine), None
+    yield 'validate', ontodl.validate_ontology, 'parse'
+    for backend in BACKENDS:
+        yield backend, getattr(ontodl, f'complete_{backend}'), 'parse'
+
+
+def measure(run, repeat, memory):
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    peak = None
+    if memory:
+        # tracemalloc slows the code down, so the peak is taken in its own run
+        gc.collect()
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, best, peak
+
+
+def bench_suite(sizes, seed, engine, repeat, memory, attributes):
+    from generate_ontology import generate_ontology
+
+    results = []
+    print(f'{"triples":>10} {"phase":>10} {"seconds":>10} {"tokens/s":>12} '
+          f'{"triples/s":>12} {"peak MB":>10}')
+    for size in sizes:
+        text = generate_ontology(size, attributes=attributes, seed=seed)
+        outputs = {}
+        tokens = None
+        for name, run, argument in phases(text, engine):
+            if argument:
+                call = run
+                run = lambda: call(outputs[argument])  # noqa: E731
+            result, seconds, peak = measure(run, repeat, memory)
+            outputs[name] = result
+            if name == 'lex':
+                tokens = result
+            row = {
+                'triples': size,
+                'phase': name,
+                'seconds': seconds,
+                'tokens_per_second': tokens / seconds if name in ('lex', 'parse') else None,
+                'triples_per_second': size / seconds,
+                'peak_bytes': peak,
+            }
+            results.append(row)
+            rate = f'{row["tokens_per_second"]:>12.0f}' if row['tokens_per_second'] else f'{"":>12}'
+            megabytes = f'{peak / 2 ** 20:>10.1f}' if peak is not None else f'{"":>10}'
+            print(f'{size:>10} {name:>10} {seconds:>10.3f} {rate} '
+                  f'{row["triples_per_second"]:>12.0f} {megabytes}')
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'engine': engine,
+        'seed': seed,
+        'attributes': attributes,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(report, path):
+    with open(path, encoding='utf-8') as file:
+        previous = {(it['triples'], it['phase']): it for it in json.load(file)['results']}
+    print(f'{"triples":>10} {"phase":>10} {"before":>10} {"after":>10} {"speedup":>10}')
+    for row in report['results']:
+        before = previous.get((row['triples'], row['phase']))
+        if before:
+            print(f'{row["triples"]:>10} {row["phase"]:>10} {before["seconds"]:>10.3f} '
+                  f'{row["seconds"]:>10.3f} {before["seconds"] / row["seconds"]:>9.2f}x')
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(
+        description='Time lexing, parsing, validation and every backend on generated ontologies')
+    argparser.add_argument('sizes', type=int, nargs='*', default=[10_000, 100_000])
+    argparser.add_argument('--seed', type=int, default=0)
+    argparser.add_argument('--attributes', type=int, default=2)
+    argparser.add_argument('--lexer', type=str, choices=['ply', 'fast'], default='ply')
+    argparser.add_argument('--repeat', type=int, default=3,
+                           help='Keep the best time of this many runs')
+    argparser.add_argument('--no-memory', action='store_true',
+                           help='Skip the peak memory runs')
+    argparser.add_argument('--output', type=str,
+                           help='Write the results as JSON to this file')
+    argparser.add_argument('--compare', type=str,
+                           help='Compare with the results of a previous --output')
+    args = argparser.parse_args()
+    report = bench_suite(args.sizes, args.seed, args.lexer, args.repeat,
+                         not args.no_memory, args.attributes)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        compare(report, args.compare)
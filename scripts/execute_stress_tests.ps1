@@ -1,11 +1,9 @@
 Set-PSDebug -Trace 1
+$Samples = Get-ChildItem samples -Filter *.ontodl | ForEach-Object { $_.FullName }
+$OutputDir = Join-Path ([System.IO.Path]::GetTempPath()) "ontodl-stress"
+python .\ontodl.py $Samples -f json -f dot:experimental -f dot -f prolog -f owl -d $OutputDir
 Get-ChildItem samples | ForEach-Object {
   $InputPath = ".\samples\$_"
   python .\ontodl.py $InputPath -f log | Out-Null
-  python .\ontodl.py $InputPath -f json | Out-Null
-  python .\ontodl.py $InputPath -f dot:experimental | Out-Null
-  python .\ontodl.py $InputPath -f dot | Out-Null
-  python .\ontodl.py $InputPath -f prolog | Out-Null
-  python .\ontodl.py $InputPath -f owl | Out-Null
 }
-Set-PSDebug -Trace 0
\ No newline at end of file
+Set-PSDebug -Trace 0
@@ -10,7 +10,8 @@ def extract_spec():
 
     newline_before = ['ontology', 'concepts', 'individuals',
                       'relations', 'triples', 'value']
-    funcs = [getattr(ontodl, k) for k in dir(ontodl) if k.startswith('p_')]
+    funcs = [getattr(ontodl, k) for k in dir(ontodl)
+             if k.startswith('p_') and not k.endswith('_error')]
     funcs.sort(key=lambda f: f.__code__.co_firstlineno)
     funcs_docs = [f.__doc__ for f in funcs if f.__doc__]
 
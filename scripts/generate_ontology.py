@@ -0,0 +1,87 @@
+import argparse
+import random
+import sys
+
+TYPES = ['string', 'boolean', 'date']
+
+
+def generate_ontology(triples, name='Generated', concepts=None, attributes=2,
+                      individuals=None, relations=None, seed=None, isa=0):
+    concepts = concepts or max(1, triples // 100)
+    individuals = individuals or max(1, triples // 10)
+    relations = relations or max(1, min(triples // 1000, 50))
+    # Without a seed the triples follow a fixed pattern, so the sizes used by
+    # the older benchmarks keep producing the same text
+    rng = random.Random(seed) if seed is not None else None
+
+    names = ['name', 'active'][:attributes] + [f'a{k}' for k in range(2, attributes)]
+    schema = ', '.join(f'{it}:{TYPES[k % len(TYPES)]}' for k, it in enumerate(names))
+    schema = f'[{schema}]' if schema else ''
+
+    def properties(individual, active):
+        values = []
+        for k, it in enumerate(names):
+            type = TYPES[k % len(TYPES)]
+            if type == 'string':
+                values.append(f'{it}="I{individual}"')
+            elif type == 'boolean':
+                values.append(f'{it}={active}')
+            else:
+                values.append(f'{it}=2020-01-{individual % 28 + 1:02d}')
+        return f'[{", ".join(values)}]' if values else ''
+
+    lines = [f'Ontology {name}', '', 'concepts {']
+    lines.append(',\n'.join(f'  C{i}{schema}' for i in range(concepts)))
+    lines += ['}', '', 'individuals {']
+    lines.append(',\n'.join(f'  I{i}' for i in range(individuals)))
+    lines += ['}', '', 'relations {']
+    lines.append(',\n'.join(f'  R{i}' for i in range(relations)))
+    lines += ['}', '', 'triples {']
+    # The first concepts get a parent among the concepts before them, a
+    # binary tree without a seed
+    for i in range(1, min(isa + 1, concepts)):
+        parent = rng.randrange(i) if rng else (i - 1) // 2
+        lines.append(f'  C{i} = isa => C{parent};')
+    for i in range(triples):
+        if i < individuals:
+            individual = i
+            if rng:
+                concept = rng.randrange(concepts)
+                active = rng.choice(['true', 'false'])
+            else:
+                concept = individual % concepts
+                active = 'true' if i % 2 else 'false'
+            lines.append(
+                f'  I{individual} = iof => C{concept}{properties(individual, active)};')
+        elif rng:
+            lines.append(
+                f'  I{rng.randrange(individuals)} = R{rng.randrange(relations)} => I{rng.randrange(individuals)};')
+        else:
+            lines.append(
+                f'  I{i % individuals} = R{i % relations} => I{(i * 7) % individuals};')
+    lines += ['}.', '']
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(
+        description='Generate a synthetic ONTODL ontology')
+    argparser.add_argument('triples', type=int)
+    argparser.add_argument('--concepts', type=int,
+                           help='Number of concepts (default: triples / 100)')
+    argparser.add_argument('--attributes', type=int, default=2,
+                           help='Number of attributes of each concept (default: 2)')
+    argparser.add_argument('--individuals', type=int,
+                           help='Number of individuals (default: triples / 10)')
+    argparser.add_argument('--relations', type=int,
+                           help='Number of relations (default: triples / 1000, at most 50)')
+    argparser.add_argument('--isa', type=int, default=0,
+                           help='Number of concepts with an isa parent (default: 0)')
+    argparser.add_argument('--seed', type=int,
+                           help='Pick the triples at random with this seed')
+    args = argparser.parse_args()
+    sys.stdout.write(generate_ontology(args.triples, concepts=args.concepts,
+                                       attributes=args.attributes,
+                                       individuals=args.individuals,
+                                       relations=args.relations, seed=args.seed,
+                                       isa=args.isa))
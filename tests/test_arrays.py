@@ -0,0 +1,68 @@
+import io
+import pytest
+from ontodl import (NAME_KINDS, compile_files, execute, load_arrays, ontology_arrays,
+                    parse_ontology, relation_rows)
+
+numpy = pytest.importorskip('numpy')
+
+SAMPLES = ['samples/basic.ontodl', 'samples/sample1.ontodl', 'samples/sample2.ontodl',
+           'samples/sample3.ontodl', 'samples/sample4.ontodl', 'samples/empty.ontodl']
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return parse_ontology(file.read())
+
+
+@pytest.mark.parametrize("path", SAMPLES)
+def test_arrays_must_hold_every_triple(path):
+    ontology = load(path)
+    arrays = ontology_arrays(ontology)
+    names, relations = list(arrays['names']), list(arrays['relation_names'])
+    edges = list(zip(arrays['relations'], arrays['subjects'], arrays['objects']))
+    assert edges == sorted(edges)
+    assert sorted((names[s], relations[r], names[o]) for r, s, o in edges) == sorted(
+        (it.individual, it.relation, it.concept) for it in ontology.triples)
+    offsets = arrays['relation_offsets']
+    assert len(offsets) == len(relations) + 1 and offsets[-1] == len(edges)
+    for relation in range(len(relations)):
+        assert set(arrays['relations'][offsets[relation]:offsets[relation + 1]]) <= {relation}
+    assert [NAME_KINDS[it] for it in arrays['kinds']] == (
+        ['concept'] * len(ontology.concepts) + ['individual'] * len(ontology.individuals))
+
+
+@pytest.mark.parametrize("path", ['samples/sample4.ontodl', 'samples/empty.ontodl'])
+def test_arrays_must_be_mapped_from_the_archive(tmp_path, path):
+    output = tmp_path / 'out.npz'
+    with open(path, encoding='utf-8') as file, open(output, 'w', encoding='utf-8') as out:
+        execute(file, format='npz', output=out)
+    mapped = load_arrays(str(output))
+    expected = ontology_arrays(load(path))
+    assert sorted(mapped) == sorted(expected)
+    for name, array in expected.items():
+        assert mapped[name].dtype == array.dtype
+        assert numpy.array_equal(mapped[name], array)
+    assert all(isinstance(it, numpy.memmap) for it in mapped.values() if it.size)
+    loaded = load_arrays(str(output), mmap=False)
+    assert all(numpy.array_equal(loaded[name], mapped[name]) for name in mapped)
+
+
+def test_relation_rows_must_list_the_objects_of_every_subject():
+    ontology = load('samples/sample4.ontodl')
+    arrays = ontology_arrays(ontology)
+    names = list(arrays['names'])
+    for relation in ['iof', 'pertence']:
+        indptr, indices = relation_rows(arrays, relation)
+        assert len(indptr) == len(names) + 1
+        for subject, name in enumerate(names):
+            objects = [names[it] for it in indices[indptr[subject]:indptr[subject + 1]]]
+            assert objects == sorted(
+                (it.concept for it in ontology.triples
+                 if it.individual == name and it.relation == relation), key=names.index)
+
+
+def test_batch_must_write_arrays(tmp_path):
+    [(_, [output], error)] = compile_files(['samples/sample3.ontodl'], ['npz'], str(tmp_path))
+    assert error is None and output.endswith('sample3.npz')
+    arrays = load_arrays(output)
+    assert len(arrays['subjects']) == len(load('samples/sample3.ontodl').triples)
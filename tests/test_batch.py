@@ -0,0 +1,56 @@
+import io
+import pytest
+from ontodl import compile_files, execute
+
+SAMPLES = ['samples/basic.ontodl', 'samples/sample1.ontodl',
+           'samples/sample2.ontodl', 'samples/sample3.ontodl']
+FORMATS = {
+    'dot': '.dot',
+    'dot:experimental': '.experimental.dot',
+    'prolog': '.pl',
+    'owl': '.owl',
+    'json': '.json',
+}
+
+
+def test_batch_must_match_single_file_output(tmp_path):
+    results = compile_files(SAMPLES, list(FORMATS), str(tmp_path))
+    assert [error for _, _, error in results] == [None] * len(SAMPLES)
+    for path, outputs, _ in results:
+        assert len(outputs) == len(FORMATS)
+        for format, extension in FORMATS.items():
+            expected = io.StringIO()
+            with open(path, encoding='utf-8') as file:
+                execute(file, format=format, output=expected)
+            stem = path.split('/')[-1].replace('.ontodl', '')
+            with open(tmp_path / (stem + extension), encoding='utf-8') as file:
+                assert file.read() == expected.getvalue()
+
+
+def test_batch_must_report_errors_per_file(tmp_path):
+    broken = tmp_path / 'broken.ontodl'
+    broken.write_text('Ontologia T conceitos {} individuos {} relacoes {} triplos { a = iof => A; }.')
+    results = compile_files([str(broken), SAMPLES[0]], ['dot'], str(tmp_path / 'out'))
+    assert str(results[0][2]) == "Relation 'iof' must have an individual as the 1st argument."
+    assert results[1][2] is None
+
+
+def test_batch_must_reject_duplicate_names(tmp_path):
+    with pytest.raises(Exception):
+        compile_files([SAMPLES[0], SAMPLES[0]], ['dot'], str(tmp_path))
+
+
+def test_parallel_batch_must_match_serial_batch(tmp_path):
+    broken = tmp_path / 'broken.ontodl'
+    broken.write_text('Ontologia T conceitos {} individuos {} relacoes {} triplos { a = = A; }.')
+    paths = SAMPLES + [str(broken)]
+    serial = compile_files(paths, list(FORMATS), str(tmp_path / 'serial'))
+    parallel = compile_files(paths, list(FORMATS), str(tmp_path / 'parallel'),
+                             collect_errors=True, jobs=2)
+    assert [path for path, _, _ in parallel] == paths
+    assert [len(outputs) for _, outputs, _ in parallel] == [5, 5, 5, 5, 0]
+    assert parallel[-1][2].errors[0].line == 1
+    for (_, expected, _), (_, outputs, _) in zip(serial, parallel):
+        for expected_path, output_path in zip(expected, outputs):
+            with open(expected_path, encoding='utf-8') as a, open(output_path, encoding='utf-8') as b:
+                assert a.read() == b.read()
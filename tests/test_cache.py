@@ -0,0 +1,54 @@
+import os
+import pytest
+import ontodl
+from ontodl import create_lexer, create_parser
+
+
+@pytest.fixture
+def cold_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('ONTODL_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(ontodl, '_tables', {})
+    return tmp_path
+
+
+def test_tables_must_be_written_to_versioned_cache(cold_cache):
+    create_lexer()
+    create_parser(out='json')
+    version = ontodl.grammar_version()
+    assert sorted(os.listdir(cold_cache)) == [
+        f'ontodl_lextab_{version}.py',
+        f'ontodl_parsetab_{version}.pickle',
+    ]
+
+
+def test_tables_must_be_loaded_from_cache(cold_cache):
+    create_parser(out='json')
+    ontodl._tables.clear()
+    parser = create_parser(out='json')
+    context = parser.parse('Ontologia T conceitos { a } individuos { b } relacoes {} triplos { b = iof => a; }.',
+                           lexer=create_lexer())
+    assert context.result['triples'] == [
+        {'individual': 'b', 'relation': 'iof', 'concept': 'a', 'properties': {}}]
+
+
+def test_parsers_must_not_share_state(cold_cache):
+    first = create_parser(out='json')
+    second = create_parser(out='dot:experimental')
+    assert first is not second
+    assert first.action is second.action
+    assert first.productions is not second.productions
+    assert [it.callable for it in first.productions if it.func] != [
+        it.callable for it in second.productions if it.func]
+    # The p_ functions only define the grammar, every production is bound
+    grammar = {getattr(ontodl, it.func) for it in first.productions if it.func}
+    assert not grammar & {it.callable for it in first.productions + second.productions}
+    assert not hasattr(first, 'result')
+
+
+def test_lexers_must_not_share_state(cold_cache):
+    first = create_lexer()
+    second = create_lexer()
+    first.input('abc')
+    second.input('123')
+    assert first.token().type == 'ID'
+    assert second.token().type == 'NUMBER'
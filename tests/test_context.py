@@ -0,0 +1,89 @@
+import io
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from ontodl import OntologyErrors, create_lexer, create_parser
+
+FORMATS = ['dot', 'dot:experimental', 'prolog', 'owl', 'json']
+SAMPLES = ['samples/basic.ontodl', 'samples/sample1.ontodl',
+           'samples/sample2.ontodl', 'samples/sample3.ontodl']
+INVALID = 'Ontologia T conceitos { a } individuos { b } relacoes {} triplos { b = iof => c; }.'
+
+
+def read(path):
+    with open(path, encoding='utf-8') as file:
+        return file.read()
+
+
+def compile(format, text, **kwargs):
+    return create_parser(format, **kwargs).parse(text, lexer=create_lexer()).complete()
+
+
+@pytest.mark.parametrize("format", FORMATS)
+def test_parser_must_be_reusable(format):
+    parser = create_parser(format)
+    for path in SAMPLES + SAMPLES:
+        context = parser.parse(read(path), lexer=create_lexer())
+        assert context.complete() == compile(format, read(path))
+    assert not hasattr(parser, 'result')
+
+
+@pytest.mark.parametrize("format", ['dot', 'dot:experimental'])
+def test_errors_must_not_leak_into_the_next_parse(format):
+    parser = create_parser(format, collect_errors=True)
+    with pytest.raises(OntologyErrors):
+        parser.parse(INVALID, lexer=create_lexer()).complete()
+    text = read('samples/sample3.ontodl')
+    assert parser.parse(text, lexer=create_lexer()).complete() == compile(format, text)
+
+
+@pytest.mark.parametrize("format", FORMATS)
+def test_parser_must_be_shared_between_threads(format):
+    parser = create_parser(format, collect_errors=True)
+    texts = [read(path) for path in SAMPLES] * 8
+
+    def run(text):
+        return parser.parse(text, lexer=create_lexer()).complete()
+
+    with ThreadPoolExecutor(8) as executor:
+        outputs = list(executor.map(run, texts))
+    assert outputs == [compile(format, text) for text in texts]
+
+
+def large_text(triples):
+    return ('Ontologia T conceitos { C } individuos { '
+            + ', '.join(f'I{i}' for i in range(triples)) + ' } relacoes { r } triplos {\n'
+            + '\n'.join(f'I{i} = r => I{(i * 7) % triples};' for i in range(triples))
+            + '\n}.')
+
+
+@pytest.mark.parametrize("format", ['json', 'dot'])
+def test_parser_must_be_shared_between_threads_without_a_lexer(format):
+    parser = create_parser(format)
+    texts = [large_text(5000)] * 8
+    with ThreadPoolExecutor(8) as executor:
+        outputs = list(executor.map(lambda text: parser.parse(text).complete(), texts))
+    assert outputs == [compile(format, texts[0])] * 8
+
+
+def test_parser_must_not_need_a_lexer_built_before():
+    import subprocess
+    import sys
+    code = ('import ontodl; '
+            'print(ontodl.create_parser("json").parse(open("samples/basic.ontodl").read()).complete())')
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == compile('json', read('samples/basic.ontodl')) + '\n'
+
+
+@pytest.mark.parametrize("format", FORMATS)
+def test_streaming_parser_must_write_each_parse_to_its_output(format):
+    parser = create_parser(format, output=io.StringIO())
+    for path in SAMPLES:
+        output = io.StringIO()
+        parser.parse(read(path), lexer=create_lexer(), output=output).complete()
+        assert output.getvalue() == compile(format, read(path))
+
+
+def test_parser_without_output_must_not_stream():
+    with pytest.raises(Exception, match='Only a parser created with an output can stream'):
+        create_parser('owl').parse(INVALID, lexer=create_lexer(), output=io.StringIO())
@@ -0,0 +1,42 @@
+import io
+import pytest
+from ontodl import create_lexer, create_parser, execute
+
+SAMPLES = ['samples/basic.ontodl', 'samples/sample1.ontodl',
+           'samples/sample2.ontodl', 'samples/sample3.ontodl']
+
+
+class RecordingOutput(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, chunk):
+        self.writes += 1
+        return super().write(chunk)
+
+
+def make_parser(out):
+    parser = create_parser(out=out)
+    parser.lexer = create_lexer()
+    return parser
+
+
+@pytest.mark.parametrize("path", SAMPLES)
+def test_json_stream_must_match_json_dumps(path):
+    parser = make_parser('json')
+    with open(path, encoding='utf-8') as file:
+        context = parser.parse(file.read())
+    assert ''.join(context.emit()) == context.complete()
+
+
+@pytest.mark.parametrize("format", ['dot', 'dot:experimental', 'prolog', 'owl', 'json'])
+def test_execute_must_stream_output_in_chunks(format):
+    parser = make_parser(format)
+    with open('samples/sample3.ontodl', encoding='utf-8') as file:
+        context = parser.parse(file.read())
+    output = RecordingOutput()
+    with open('samples/sample3.ontodl', encoding='utf-8') as file:
+        execute(file, format=format, output=output)
+    assert output.getvalue() == context.complete()
+    assert output.writes > 1
@@ -0,0 +1,132 @@
+import io
+import pytest
+from ontodl import OntologyErrors, create_lexer, execute, parse_ontology
+
+SAMPLES = ['samples/basic.ontodl', 'samples/sample1.ontodl',
+           'samples/sample2.ontodl', 'samples/sample3.ontodl']
+
+
+def tokens(text, engine):
+    lexer = create_lexer(engine=engine)
+    lexer.input(text)
+    return [str(token) for token in lexer]
+
+
+def read(path):
+    with open(path, encoding='utf-8') as file:
+        return file.read()
+
+
+@pytest.mark.parametrize("path", SAMPLES)
+def test_fast_lexer_must_match_ply_on_samples(path):
+    text = read(path)
+    assert tokens(text, 'fast') == tokens(text, 'ply')
+
+
+@pytest.mark.parametrize("text", [
+    'Ontologias',
+    'stringx date2020-01-01',
+    'trueish false1 _true',
+    'individuals_ relacoesX',
+    'a=>b = c . %comment\nd',
+    '_áé "a b" 12e5 2020-01-01T00:00:00.000+01:00',
+])
+def test_fast_lexer_must_match_ply_on_keyword_prefixes(text):
+    assert tokens(text, 'fast') == tokens(text, 'ply')
+
+
+def test_fast_lexer_must_skip_illegal_characters(capsys):
+    assert tokens('a @ b', 'fast') == tokens('a @ b', 'ply')
+    assert capsys.readouterr().out == "Illegal character '@'\n" * 2
+
+
+@pytest.mark.parametrize("format", ['dot', 'dot:experimental', 'prolog', 'owl', 'json'])
+def test_fast_lexer_must_compile_like_ply(format):
+    outputs = []
+    for engine in ['ply', 'fast']:
+        output = io.StringIO()
+        with open('samples/sample3.ontodl', encoding='utf-8') as file:
+            execute(file, format=format, output=output, engine=engine)
+        outputs.append(output.getvalue())
+    assert outputs[0] == outputs[1]
+
+
+def test_fast_lexer_must_report_error_positions():
+    text = 'Ontologia T conceitos { a } individuos { b } relacoes {} triplos { b = => a; b = iof => c; }.'
+    errors = []
+    for engine in ['ply', 'fast']:
+        with pytest.raises(OntologyErrors) as e:
+            parse_ontology(text, collect_errors=True, engine=engine)
+        errors.append(e.value.format('test'))
+    assert errors[0] == errors[1]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 64, 1 << 20])
+@pytest.mark.parametrize("path", SAMPLES)
+def test_fast_lexer_must_stream_files_in_chunks(path, size):
+    text = read(path)
+    lexer = create_lexer(engine='fast')
+    with open(path, 'rb') as file:
+        lexer.input_file(file, size)
+        assert [str(token) for token in lexer] == tokens(text, 'ply')
+
+
+@pytest.mark.parametrize("size", [1, 2, 5])
+def test_fast_lexer_must_join_tokens_across_chunks(size):
+    # Accented identifiers split inside a character, strings, dates that
+    # would read as numbers and '=>' that would read as '='
+    text = 'ação "a b c" 2020-01-01T00:00:00.000+01:00 => Ontologias'
+    lexer = create_lexer(engine='fast')
+    lexer.input_file(io.BytesIO(text.encode('utf-8')), size)
+    assert [str(token) for token in lexer] == tokens(text, 'ply')
+
+
+def test_fast_lexer_must_report_error_positions_when_streaming():
+    text = 'Ontologia T\nconceitos { a }\nindividuos { b }\nrelacoes {}\ntriplos {\n  b = => a;\n}.'
+    errors = []
+    for engine in ['ply', 'fast']:
+        with pytest.raises(OntologyErrors) as e:
+            execute(io.StringIO(text), engine=engine, collect_errors=True)
+        errors.append(e.value.format('test'))
+    assert errors[0] == errors[1] == "test:6:7: Syntax error at 'LexToken(IMPLIES,'=>',1,73)'"
+
+
+class ChunkedFile(io.StringIO):
+    # A source that fails when it is read whole
+    def read(self, size=-1):
+        assert size is not None and size >= 0, 'The source was read whole'
+        return super().read(size)
+
+
+@pytest.mark.parametrize("options", [
+    {'format': 'snapshot'},
+    {'format': 'json', 'materialized': True},
+    {'format': 'dot', 'queries': ['? = iof => ?']},
+    {'format': 'json', 'cache': True},
+])
+def test_fast_lexer_must_read_files_in_chunks(tmp_path, options):
+    from ontodl import OutputCache
+    if options.pop('cache', False):
+        options['cache'] = OutputCache(str(tmp_path))
+    outputs = []
+    for engine, file in [('ply', io.StringIO(read('samples/sample2.ontodl'))),
+                         ('fast', ChunkedFile(read('samples/sample2.ontodl')))]:
+        output = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+        execute(file, output=output, engine=engine, **options)
+        output.flush()
+        outputs.append(output.buffer.getvalue())
+    assert outputs[0] == outputs[1]
+
+
+def test_fast_lexer_must_read_batch_files_in_chunks(tmp_path, monkeypatch):
+    import ontodl
+    expected = ontodl.compile_files(['samples/sample2.ontodl'], ['dot', 'json'],
+                                    str(tmp_path / 'ply'))
+    monkeypatch.setattr(ontodl, 'open', lambda path, *args, **kwargs: ChunkedFile(read(path))
+                        if path.endswith('.ontodl') else open(path, *args, **kwargs),
+                        raising=False)
+    outputs = ontodl.compile_files(['samples/sample2.ontodl'], ['dot', 'json'],
+                                   str(tmp_path / 'fast'), engine='fast')
+    assert [error for _, _, error in outputs] == [None]
+    for before, after in zip(expected[0][1], outputs[0][1]):
+        assert read(before) == read(after)
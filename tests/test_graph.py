@@ -0,0 +1,82 @@
+import io
+import random
+import pytest
+from ontodl import (GRAPH_ENGINES, Ontology, OntologyGraph, Triple, execute, parse_ontology,
+                    parse_query)
+
+
+def random_ontology(seed, triples):
+    rng = random.Random(seed)
+    concepts = {f'C{i}': None for i in range(10)}
+    individuals = [f'I{i}' for i in range(30)]
+    relations = ['r', 's', 't']
+    names = list(concepts) + individuals
+    return Ontology('Random', concepts, individuals, relations, [
+        Triple(rng.choice(names), rng.choice(relations + ['iof', 'isa']), rng.choice(names))
+        for _ in range(triples)])
+
+
+def patterns(ontology, rng):
+    names = list(ontology.concepts) + ontology.individuals + ['Unknown']
+    relations = ontology.relations + ['iof', 'isa', 'unknown']
+    yield None, None, None
+    for _ in range(300):
+        yield (rng.choice([None, rng.choice(names)]), rng.choice([None, rng.choice(relations)]),
+               rng.choice([None, rng.choice(names)]))
+
+
+@pytest.mark.parametrize("seed, triples", [(0, 0), (1, 1), (2, 200), (3, 2000)])
+@pytest.mark.parametrize("engine", GRAPH_ENGINES)
+def test_graph_must_match_a_scan_of_the_triples(seed, triples, engine):
+    ontology = random_ontology(seed, triples)
+    graph = OntologyGraph.from_ontology(ontology, engine)
+    assert len(graph) == triples
+    edges = [(it.individual, it.relation, it.concept) for it in ontology.triples]
+    for subject, relation, object in patterns(ontology, random.Random(seed)):
+        expected = [edge for edge in edges
+                    if subject in (None, edge[0]) and relation in (None, edge[1])
+                    and object in (None, edge[2])]
+        assert sorted(graph.match(subject, relation, object)) == sorted(expected)
+    if edges:
+        subject, relation, _ = edges[0]
+        assert sorted(graph.objects(subject, relation)) == sorted(
+            edge[2] for edge in edges if edge[:2] == (subject, relation))
+
+
+def test_graph_must_index_undeclared_names():
+    ontology = Ontology('T', {'A': None}, ['a'], [], [
+        Triple('a', 'iof', 'A'), Triple('b', 'knows', 'a')])
+    graph = OntologyGraph.from_ontology(ontology)
+    assert graph.subjects('a', 'knows') == ['b']
+    assert graph.objects('b') == ['a']
+
+
+@pytest.mark.parametrize("text, pattern", [
+    ['? = iof => Pessoa', (None, 'iof', 'Pessoa')],
+    ['a=?=>?;', ('a', None, None)],
+    ['"uma pessoa" = r => ?', ('uma pessoa', 'r', None)],
+])
+def test_query_must_be_parsed(text, pattern):
+    assert parse_query(text) == pattern
+
+
+@pytest.mark.parametrize("text", ['a = r', '? => b', 'a = r => b => c'])
+def test_query_must_reject_other_text(text):
+    with pytest.raises(Exception, match='Invalid query'):
+        parse_query(text)
+
+
+def test_execute_must_answer_queries():
+    with open('samples/sample4.ontodl', encoding='utf-8') as file:
+        text = file.read()
+    output = io.StringIO()
+    execute(io.StringIO(text), output=output,
+            queries=['? = iof => LinguagemNova', 'Go = isa => ?'])
+    assert output.getvalue() == (
+        'Go = iof => LinguagemNova;\nElixir = iof => LinguagemNova;\nRust = iof => LinguagemNova;\n')
+    output = io.StringIO()
+    execute(io.StringIO(text), output=output, materialized=True,
+            queries=['Go = iof => ?'])
+    assert sorted(output.getvalue().splitlines()) == [
+        'Go = iof => LinguagemDeProgramacao;', 'Go = iof => LinguagemNova;']
+    assert len(OntologyGraph.from_ontology(parse_ontology(text))) == 32
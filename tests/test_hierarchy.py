@@ -0,0 +1,128 @@
+import random
+import pytest
+from ontodl import Hierarchy, IncrementalParser, OntologyError, parse_ontology
+
+
+def random_hierarchy(seed, count, extra):
+    rng = random.Random(seed)
+    names = [f'C{i}' for i in range(count)]
+    # Each concept gets a parent among the previous ones, or none, and then
+    # some extra parents for multiple inheritance
+    edges = [(names[i], names[rng.randrange(i)]) for i in range(1, count)
+             if rng.random() < 0.9]
+    for _ in range(extra):
+        child = rng.randrange(1, count)
+        edges.append((names[child], names[rng.randrange(child)]))
+    rng.shuffle(edges)
+    return names, edges
+
+
+def closure(names, edges):
+    parents = {name: set() for name in names}
+    for child, parent in edges:
+        parents[child].add(parent)
+    ancestors = {}
+
+    def visit(name):
+        if name not in ancestors:
+            ancestors[name] = set()
+            for parent in parents[name]:
+                ancestors[name] |= {parent} | visit(parent)
+        return ancestors[name]
+
+    for name in names:
+        visit(name)
+    return ancestors
+
+
+@pytest.mark.parametrize("seed, count, extra", [
+    (0, 1, 0), (1, 30, 0), (2, 200, 0), (3, 200, 40), (4, 300, 600),
+])
+def test_hierarchy_must_match_the_transitive_closure(seed, count, extra):
+    names, edges = random_hierarchy(seed, count, extra)
+    hierarchy = Hierarchy(names, edges)
+    ancestors = closure(names, edges)
+    assert hierarchy.cycle is None
+    position = {hierarchy.names[node]: i for i, node in enumerate(hierarchy.order)}
+    assert sorted(position) == sorted(names)
+    assert all(position[parent] < position[child] for child, parent in edges)
+    for name in names:
+        assert set(hierarchy.ancestors(name)) == ancestors[name]
+        assert set(hierarchy.descendants(name)) == {
+            other for other in names if name in ancestors[other]}
+    rng = random.Random(seed)
+    for _ in range(2000):
+        concept, ancestor = rng.choice(names), rng.choice(names)
+        assert hierarchy.is_a(concept, ancestor) == (
+            concept == ancestor or ancestor in ancestors[concept])
+
+
+@pytest.mark.parametrize("budget", [0, 1, 3])
+@pytest.mark.parametrize("seed, count, extra", [(5, 200, 300), (6, 300, 900)])
+def test_hierarchy_must_search_the_concepts_past_the_interval_budget(
+        monkeypatch, budget, seed, count, extra):
+    monkeypatch.setattr(Hierarchy, 'interval_budget', budget)
+    names, edges = random_hierarchy(seed, count, extra)
+    hierarchy = Hierarchy(names, edges)
+    ancestors = closure(names, edges)
+    hierarchy.label()
+    assert any(not hierarchy.labeled(node) for node in range(count))
+    assert len(hierarchy.starts) <= (budget + 1) * count
+    for name in names:
+        assert set(hierarchy.descendants(name)) == {
+            other for other in names if name in ancestors[other]}
+    rng = random.Random(seed)
+    for _ in range(2000):
+        concept, ancestor = rng.choice(names), rng.choice(names)
+        assert hierarchy.is_a(concept, ancestor) == (
+            concept == ancestor or ancestor in ancestors[concept])
+
+
+@pytest.mark.parametrize("edges, cycle", [
+    ([('a', 'a')], ['a', 'a']),
+    ([('a', 'b'), ('b', 'a')], ['a', 'b', 'a']),
+    ([('d', 'a'), ('a', 'b'), ('b', 'c'), ('c', 'a')], ['a', 'b', 'c', 'a']),
+])
+def test_hierarchy_must_report_a_cycle(edges, cycle):
+    hierarchy = Hierarchy(['a', 'b', 'c', 'd', 'e'], edges + [('e', 'a')])
+    start = cycle.index(hierarchy.cycle[0])
+    assert hierarchy.cycle == cycle[start:-1] + cycle[:start] + [hierarchy.cycle[0]]
+    assert hierarchy.is_a('e', 'a')
+    assert not hierarchy.is_a('a', 'e')
+    assert 'e' in hierarchy.descendants('a')
+
+
+@pytest.mark.parametrize("budget", [0, 32])
+def test_hierarchy_must_search_a_cycle_under_an_acyclic_concept(monkeypatch, budget):
+    monkeypatch.setattr(Hierarchy, 'interval_budget', budget)
+    hierarchy = Hierarchy(['a', 'b', 'c', 'd'], [('b', 'a'), ('c', 'b'), ('b', 'c'), ('d', 'a')])
+    assert hierarchy.cycle is not None
+    assert hierarchy.is_a('d', 'a')
+    assert hierarchy.is_a('c', 'a')
+    assert not hierarchy.is_a('a', 'd')
+    assert hierarchy.descendants('a') == ['b', 'c', 'd']
+    assert hierarchy.ancestors('c') == ['a', 'b']
+
+
+def test_hierarchy_must_index_the_isa_triples():
+    with open('samples/sample2.ontodl', encoding='utf-8') as file:
+        hierarchy = Hierarchy.from_ontology(parse_ontology(file.read()))
+    assert hierarchy.is_a('barco', 'meioTransporte')
+    assert not hierarchy.is_a('barco', 'meioTranspTerra')
+    assert hierarchy.ancestors('barco') == ['meioTransporte', 'meioTranspAqua']
+
+
+CYCLE = '''Ontologia T conceitos { a, b, c } individuos { } relacoes { } triplos {
+  a = isa => b;
+  b = isa => c;
+  c = isa => a;
+}.'''
+
+
+def test_validation_must_report_isa_cycles():
+    with pytest.raises(OntologyError, match=r"forms a cycle: a -> b -> c -> a"):
+        parse_ontology(CYCLE)
+    parser = IncrementalParser()
+    parser.update(CYCLE.replace('c = isa => a', 'c = isa => c'))
+    with pytest.raises(OntologyError, match=r"forms a cycle: c -> c"):
+        parser.check()
@@ -0,0 +1,76 @@
+import io
+import pytest
+from ontodl import IncrementalParser, execute
+
+TEXT = '''Ontologia T
+conceitos { a [f: string], c }
+individuos { b, d }
+relacoes { r }
+triplos {
+  b = iof => a[f="x"];
+  b = r => c;
+  d = r => c; % comment
+  d = iof => c;
+}.'''
+
+
+def full(text):
+    parser = IncrementalParser()
+    parser.update(text)
+    return parser
+
+
+@pytest.mark.parametrize("old,new,declarations,start,removed,added", [
+    ['b = r => c;', 'd = r => b;', False, 1, 1, 1],
+    ['b = r => c;', 'b = r => c; b = r => a;', False, 1, 1, 2],
+    ['  b = r => c;\n', '', False, 1, 3, 2],
+    ['d = r => c; % comment', 'd = r => c; % d = iof => c;', False, 2, 2, 2],
+    ['  d = r => c; % comment', '%  d = r => c; % comment', False, 2, 2, 1],
+    ['d = iof => c;', 'd = iof => a[f="y"];', True, 0, 4, 4],
+    ['individuos { b, d }', 'individuos { b, d, e }', True, 0, 4, 4],
+])
+def test_incremental_must_match_full_parse(old, new, declarations, start, removed, added):
+    parser = full(TEXT)
+    text = TEXT.replace(old, new)
+    change = parser.update(text)
+    assert (change.declarations, change.start, change.removed, len(change.triples)) == \
+        (declarations, start, removed, added)
+    expected = full(text)
+    assert parser.ontology == expected.ontology
+    assert parser.ends == expected.ends
+    assert parser.errors == expected.errors
+
+
+def test_incremental_must_report_triple_errors():
+    parser = full(TEXT)
+    parser.update(TEXT.replace('b = r => c;', 'b = r => z;'))
+    with pytest.raises(Exception) as e:
+        parser.check()
+    assert str(e.value) == "Concept 'z' is not defined"
+    parser.update(TEXT)
+    parser.check()
+
+
+def test_incremental_must_recover_after_syntax_errors():
+    parser = full(TEXT)
+    with pytest.raises(Exception):
+        parser.update(TEXT.replace('b = r => c;', 'b = r => c'))
+    change = parser.update(TEXT.replace('b = r => c;', 'b = r => d;'))
+    assert change.declarations
+    assert parser.update(TEXT).start == 1
+
+
+@pytest.mark.parametrize("format", ['dot', 'prolog', 'owl', 'json'])
+def test_incremental_must_emit_like_execute(format):
+    with open('samples/sample3.ontodl', encoding='utf-8') as file:
+        text = file.read()
+    parser = full(text)
+    edited = text.replace('Evento2 = PertenceA => Portugal;', 'Evento2 = PertenceA => Evento1;')
+    change = parser.update(edited)
+    assert not change.declarations
+    assert change.removed == 1
+    [fragment] = change.fragments(format)
+    output = io.StringIO()
+    execute(io.StringIO(edited), format=format, output=output)
+    assert ''.join(parser.emit(format)) == output.getvalue()
+    assert fragment in output.getvalue()
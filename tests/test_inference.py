@@ -0,0 +1,110 @@
+import io
+import random
+import pytest
+from ontodl import (EMITTERS, INFERENCE_ENGINES, OntologyError, execute, materialize,
+                    parse_ontology)
+
+
+def random_ontology(seed, concepts, individuals, extra):
+    rng = random.Random(seed)
+    lines = ['Ontology Random', 'concepts {',
+             ',\n'.join(f'C{i}' for i in range(concepts)), '}', 'individuals {',
+             ',\n'.join(f'I{i}' for i in range(individuals)), '}', 'relations { knows }',
+             'triples {']
+    for i in range(1, concepts):
+        if rng.random() < 0.9:
+            lines.append(f'C{i} = isa => C{rng.randrange(i)};')
+    for _ in range(extra):
+        child = rng.randrange(1, concepts)
+        lines.append(f'C{child} = isa => C{rng.randrange(child)};')
+    for i in range(individuals):
+        for _ in range(rng.randrange(3)):
+            lines.append(f'I{i} = iof => C{rng.randrange(concepts)};')
+    lines.append(f'I0 = knows => I{individuals - 1};')
+    lines.append('}.')
+    return '\n'.join(lines)
+
+
+def facts(ontology, relation):
+    return {(it.individual, it.concept) for it in ontology.triples if it.relation == relation}
+
+
+def closure(ontology):
+    parents = {}
+    for individual, concept in facts(ontology, 'isa'):
+        parents.setdefault(individual, set()).add(concept)
+    ancestors = {}
+
+    def visit(name):
+        if name not in ancestors:
+            ancestors[name] = set()
+            for parent in parents.get(name, ()):
+                ancestors[name] |= {parent} | visit(parent)
+        return ancestors[name]
+
+    isa = {(concept, ancestor) for concept in ontology.concepts for ancestor in visit(concept)}
+    iof = {(individual, ancestor) for individual, concept in facts(ontology, 'iof')
+           for ancestor in {concept} | visit(concept)}
+    return iof, isa
+
+
+@pytest.mark.parametrize("seed, concepts, individuals, extra", [
+    (0, 1, 1, 0), (1, 20, 50, 0), (2, 100, 300, 30), (3, 60, 1000, 200),
+])
+@pytest.mark.parametrize("engine", INFERENCE_ENGINES)
+def test_materialize_must_add_the_transitive_closure(seed, concepts, individuals, extra, engine):
+    ontology = parse_ontology(random_ontology(seed, concepts, individuals, extra))
+    result = materialize(ontology, engine)
+    assert result.triples[:len(ontology.triples)] == ontology.triples
+    inferred = result.triples[len(ontology.triples):]
+    keys = [(it.individual, it.relation, it.concept) for it in result.triples]
+    assert len(set(keys)) == len(set(keys[:len(ontology.triples)])) + len(inferred)
+    assert all(not it.properties for it in inferred)
+    assert (facts(result, 'iof'), facts(result, 'isa')) == closure(ontology)
+    assert facts(result, 'knows') == facts(ontology, 'knows')
+
+
+def test_engines_must_infer_the_same_triples():
+    ontology = parse_ontology(random_ontology(4, 80, 500, 40))
+    python, numpy = (materialize(ontology, engine) for engine in INFERENCE_ENGINES)
+    assert python.triples == numpy.triples
+
+
+@pytest.mark.parametrize("threshold, engine", [(None, 'python'), (0, 'numpy')])
+def test_default_engine_must_depend_on_the_size(monkeypatch, threshold, engine):
+    import ontodl
+    pytest.importorskip('numpy')
+    if threshold is not None:
+        monkeypatch.setattr(ontodl, 'NUMPY_INFERENCE_FROM', threshold)
+    used = []
+    for name in INFERENCE_ENGINES:
+        members = getattr(ontodl, f'iof_members_{name}')
+        monkeypatch.setattr(ontodl, f'iof_members_{name}',
+                            lambda *args, name=name, members=members: used.append(name)
+                            or members(*args))
+    ontology = parse_ontology(random_ontology(4, 80, 500, 40))
+    assert materialize(ontology).triples == materialize(ontology, engine).triples
+    assert used == [engine, engine]
+
+
+def test_materialize_must_reject_a_cycle():
+    ontology = parse_ontology(random_ontology(5, 5, 5, 0), validate=False)
+    ontology.triples += parse_ontology(
+        'Ontology C concepts { C1, C2 } individuals { } relations { } '
+        'triples { C1 = isa => C2; C2 = isa => C1; }.', validate=False).triples
+    with pytest.raises(OntologyError, match='cycle'):
+        materialize(ontology)
+
+
+@pytest.mark.parametrize("format", ['dot', 'prolog', 'owl', 'json'])
+def test_execute_must_emit_the_materialized_ontology(format):
+    with open('samples/sample4.ontodl', encoding='utf-8') as file:
+        text = file.read()
+    plain, materialized = io.StringIO(), io.StringIO()
+    execute(io.StringIO(text), format=format, output=plain)
+    execute(io.StringIO(text), format=format, output=materialized, materialized=True)
+    ontology = parse_ontology(text)
+    assert plain.getvalue() == ''.join(EMITTERS[format](ontology))
+    inferred = materialize(ontology)
+    assert len(inferred.triples) > len(ontology.triples)
+    assert materialized.getvalue() == ''.join(EMITTERS[format](inferred))
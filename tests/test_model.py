@@ -0,0 +1,60 @@
+import io
+import pytest
+from ontodl import (Concept, Ontology, Triple, Value, complete_dot, complete_json,
+                    complete_owl, complete_prolog, execute, parse_ontology)
+
+SAMPLES = ['samples/basic.ontodl', 'samples/sample1.ontodl',
+           'samples/sample2.ontodl', 'samples/sample3.ontodl']
+
+
+def read(path):
+    with open(path, encoding='utf-8') as file:
+        return file.read()
+
+
+def test_model_must_be_typed():
+    ontology = parse_ontology(
+        '''Ontologia T conceitos { a [f: date], c } individuos { b } relacoes { r } triplos { b = iof => a[f=2020-10-10]; b = r => c; }.''')
+    assert ontology.name == 'T'
+    assert ontology.concepts == {'a': Concept('a', {'f': 'date'}), 'c': Concept('c')}
+    assert ontology.individuals == ['b']
+    assert ontology.relations == ['r']
+    assert ontology.triples == [
+        Triple('b', 'iof', 'a', {'f': Value('2020-10-10', 'date')}),
+        Triple('b', 'r', 'c'),
+    ]
+
+
+@pytest.mark.parametrize("path", SAMPLES)
+def test_model_must_round_trip_through_json(path):
+    ontology = parse_ontology(read(path))
+    assert Ontology.from_json(ontology.to_json()) == ontology
+
+
+@pytest.mark.parametrize("path", SAMPLES)
+@pytest.mark.parametrize("format,complete", [
+    ('dot', complete_dot),
+    ('prolog', complete_prolog),
+    ('owl', complete_owl),
+    ('json', complete_json),
+])
+def test_one_model_must_feed_every_backend(path, format, complete):
+    ontology = parse_ontology(read(path))
+    expected = io.StringIO()
+    with open(path, encoding='utf-8') as file:
+        execute(file, format=format, output=expected)
+    assert complete(ontology) == expected.getvalue()
+
+
+def test_model_must_be_validated():
+    with pytest.raises(Exception) as e:
+        parse_ontology('''Ontologia T conceitos {} individuos { a } relacoes { a } triplos {}.''')
+    assert str(e.value) == 'Individual, relation and concept have overlapping keys'
+
+
+def test_model_must_be_compact():
+    ontology = parse_ontology(read('samples/sample3.ontodl'))
+    first, second = ontology.triples[0], ontology.triples[10]
+    assert not hasattr(first, '__dict__')
+    assert first.individual is second.individual
+    assert ontology.triples[20].properties is ontology.triples[30].properties
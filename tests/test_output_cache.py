@@ -0,0 +1,65 @@
+import io
+import os
+import pytest
+from ontodl import OntologyError, OutputCache, execute
+
+SOURCE = 'samples/sample3.ontodl'
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return OutputCache(str(tmp_path))
+
+
+def compile(path, format, cache=None):
+    output = io.StringIO()
+    with open(path, encoding='utf-8') as file:
+        execute(file, format=format, output=output, cache=cache)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("format", ['dot', 'dot:experimental', 'prolog', 'owl', 'json'])
+def test_cached_output_must_match_compiled_output(cache, format):
+    expected = compile(SOURCE, format)
+    assert compile(SOURCE, format, cache) == expected
+    assert compile(SOURCE, format, cache) == expected
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+
+def test_format_and_source_must_be_part_of_the_key(cache, tmp_path):
+    compile(SOURCE, 'dot', cache)
+    compile(SOURCE, 'owl', cache)
+    changed = tmp_path / 'changed.ontodl'
+    with open(SOURCE, encoding='utf-8') as file:
+        changed.write_text(file.read() + '\n', encoding='utf-8')
+    compile(str(changed), 'dot', cache)
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (0, 3, 3)
+
+
+def test_errors_must_not_be_cached(cache, tmp_path):
+    source = tmp_path / 'error.ontodl'
+    source.write_text('Ontology X concepts { a } individuals { b } relations {} '
+                      'triples { b = iof => c; }.', encoding='utf-8')
+    for _ in range(2):
+        with pytest.raises(OntologyError):
+            compile(str(source), 'dot', cache)
+    stats = cache.stats()
+    assert (stats['misses'], stats['entries']) == (2, 0)
+    assert not [it for it in os.listdir(cache.directory) if it.endswith('.tmp')]
+
+
+def test_least_recently_used_outputs_must_be_evicted(cache):
+    with open(SOURCE, 'rb') as file:
+        source = file.read()
+    sizes = [len(compile(SOURCE, it).encode('utf-8')) for it in ['owl', 'json']]
+    cache.max_size = max(sizes)
+    compile(SOURCE, 'owl', cache)
+    os.utime(cache.path(cache.key(source, 'owl')), (0, 0))
+    compile(SOURCE, 'json', cache)
+    compile(SOURCE, 'json', cache)
+    compile(SOURCE, 'owl', cache)
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 3, 1)
+    assert stats['size'] <= cache.max_size
@@ -48,5 +48,4 @@ def make_parser():
 ])
 def test_parser_must_handle_ontology(text, result):
     parser = make_parser()
-    parser.parse(text)
-    assert parser.result == result
+    assert parser.parse(text).result == result
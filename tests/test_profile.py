@@ -0,0 +1,58 @@
+import io
+import pytest
+from ontodl import Profiler, create_lexer, create_parser, execute
+
+FORMATS = ['dot', 'dot:experimental', 'prolog', 'owl', 'json']
+
+
+def compile(format, **kwargs):
+    output = io.StringIO()
+    with open('samples/sample3.ontodl', encoding='utf-8') as file:
+        execute(file, format=format, output=output, **kwargs)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("format", FORMATS)
+@pytest.mark.parametrize("engine", ['ply', 'fast'])
+def test_profiled_output_must_match_output(format, engine):
+    profiler = Profiler()
+    assert compile(format, engine=engine, profiler=profiler) == compile(format, engine=engine)
+    names = [it['name'] for it in profiler.report()['entries']]
+    assert names[:3] == ['load', 'tables', 'parse']
+    assert {'lex', 'emit', 'rule triple', 'rule id'} <= set(names)
+
+
+def test_profile_must_count_tokens_and_reductions():
+    profiler = Profiler()
+    compile('owl', profiler=profiler)
+    entries = {it['name']: it for it in profiler.report()['entries']}
+    # One call per token plus the final call that returns None
+    assert entries['lex']['calls'] == 406
+    assert entries['rule triple']['calls'] == 40
+    assert entries['validate']['calls'] == 1
+    # One call per chunk plus the final call, with emit() itself in the first
+    with open('samples/sample3.ontodl', encoding='utf-8') as file:
+        context = create_parser('owl').parse(file.read(), lexer=create_lexer())
+    assert entries['emit']['calls'] == len(list(context.emit())) + 1
+    assert entries['parse']['total_seconds'] >= entries['parse']['seconds']
+
+
+def test_profile_must_not_time_nested_entries_twice():
+    profiler = Profiler()
+    compile('dot', profiler=profiler)
+    report = profiler.report()
+    total = sum(it['total_seconds'] for it in report['entries']
+                if it['name'] in ('load', 'tables', 'parse', 'emit'))
+    assert report['seconds'] == pytest.approx(total)
+
+
+def test_profile_must_trace_memory_on_request():
+    profiler = Profiler(memory=True)
+    profiler.start()
+    try:
+        compile('json', profiler=profiler)
+    finally:
+        profiler.stop()
+    entries = profiler.report()['entries']
+    assert all(it['net_allocated'] is not None for it in entries)
+    assert 'net KB' in profiler.format()
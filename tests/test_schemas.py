@@ -0,0 +1,120 @@
+import io
+import random
+import pytest
+from ontodl import IncrementalParser, Schemas, create_parser, execute
+
+
+def random_schemas(seed, count, extra):
+    rng = random.Random(seed)
+    names = [f'C{i}' for i in range(count)]
+    attributes = {name: {f'a{rng.randrange(20)}': rng.choice(['string', 'number'])
+                         for _ in range(rng.randrange(3))} for name in names}
+    edges = [(names[i], names[rng.randrange(i)]) for i in range(1, count)
+             if rng.random() < 0.9]
+    for _ in range(extra):
+        child = rng.randrange(1, count)
+        edges.append((names[child], names[rng.randrange(child)]))
+    rng.shuffle(edges)
+    return attributes, edges
+
+
+def expected_schema(attributes, edges, name):
+    schema = dict(attributes[name])
+    for child, parent in edges:
+        if child == name:
+            for key, type in expected_schema(attributes, edges, parent).items():
+                schema.setdefault(key, type)
+    return schema
+
+
+@pytest.mark.parametrize("seed, count, extra", [
+    (0, 1, 0), (1, 30, 0), (2, 100, 20), (3, 60, 120),
+])
+def test_schemas_must_inherit_through_isa(seed, count, extra):
+    attributes, edges = random_schemas(seed, count, extra)
+    schemas = Schemas(attributes, edges)
+    for name in attributes:
+        assert schemas.get(name) == expected_schema(attributes, edges, name)
+
+
+@pytest.mark.parametrize("seed", [4, 5])
+def test_schemas_must_be_rebuilt_after_new_edges(seed):
+    attributes, edges = random_schemas(seed, 80, 40)
+    rng = random.Random(seed)
+    schemas = Schemas(attributes)
+    for k, (child, parent) in enumerate(edges):
+        schemas.add(child, parent)
+        for name in rng.sample(sorted(attributes), 10):
+            assert schemas.get(name) == expected_schema(attributes, edges[:k + 1], name)
+
+
+def test_schemas_must_handle_deep_chains_and_cycles():
+    names = [f'C{i}' for i in range(20000)]
+    attributes = {name: {} for name in names}
+    attributes['C0'] = {'root': 'string'}
+    schemas = Schemas(attributes, zip(names[1:], names))
+    assert schemas.get(names[-1]) == {'root': 'string'}
+    # The cycle is reported apart, the schemas only have to stay finite
+    schemas.add('C0', names[-1])
+    assert schemas.get('C0') == {'root': 'string'}
+    assert schemas.get(names[-1]) in ({}, {'root': 'string'})
+
+
+DECLARATIONS = '''Ontologia T
+conceitos { Pessoa[nome:string], Aluno[numero:boolean], Bolseiro[nome:boolean] }
+individuos { a }
+relacoes { }
+triplos {
+'''
+
+
+@pytest.mark.parametrize("triples,error", [
+    ['Aluno = isa => Pessoa; a = iof => Aluno[numero=true, nome="A"];', None],
+    ['Aluno = isa => Pessoa; a = iof => Aluno[nome="A", numero=true];', None],
+    ['Aluno = isa => Pessoa; a = iof => Aluno[numero=true];',
+        ("Property 'Aluno.nome' is not defined in triple",
+         'Attribute "nome" of concept "Aluno" is not set.')],
+    ['Aluno = isa => Pessoa; a = iof => Aluno[numero=true, nome=2];',
+        ("Property 'Aluno.nome' is of type 'string', but got type 'number' in triple",
+         'Attribute "nome" of concept "Aluno" is of type "string", not "number".')],
+    ['Bolseiro = isa => Aluno; Aluno = isa => Pessoa; a = iof => Bolseiro[nome=true, numero=false];',
+        None],
+    ['Bolseiro = isa => Aluno; Aluno = isa => Pessoa; a = iof => Bolseiro[nome=true];',
+        ("Property 'Bolseiro.numero' is not defined in triple",
+         'Attribute "numero" of concept "Bolseiro" is not set.')],
+])
+@pytest.mark.parametrize("format, stream", [
+    ('dot', False), ('dot', True), ('dot:experimental', False), ('owl', False), ('owl', True),
+])
+def test_properties_must_be_validated_with_inherited_attributes(triples, error, format, stream):
+    text = DECLARATIONS + triples + '\n}.'
+    output = io.StringIO()
+    if error is None:
+        execute(io.StringIO(text), format=format, output=output, stream=stream)
+        return
+    with pytest.raises(Exception) as e:
+        execute(io.StringIO(text), format=format, output=output, stream=stream)
+    assert str(e.value) == error[format == 'dot:experimental']
+
+
+def test_single_pass_must_inherit_only_from_the_isa_triples_before():
+    triples = 'a = iof => Aluno[numero=true, nome="A"]; Aluno = isa => Pessoa;'
+    parser = create_parser('dot')
+    parser.parse(DECLARATIONS + triples + '\n}.').complete()
+    with pytest.raises(Exception) as e:
+        create_parser('dot:experimental').parse(DECLARATIONS + triples + '\n}.').complete()
+    assert str(e.value) == 'Concept "Aluno" does not have attribute "nome".'
+
+
+def test_incremental_must_check_again_after_an_isa_edit():
+    text = DECLARATIONS + 'Aluno = isa => Pessoa;\na = iof => Aluno[numero=true, nome="A"];\n}.'
+    parser = IncrementalParser()
+    parser.update(text)
+    parser.check()
+    change = parser.update(text.replace('Aluno = isa => Pessoa;', 'Bolseiro = isa => Pessoa;'))
+    assert not change.declarations
+    with pytest.raises(Exception) as e:
+        parser.check()
+    assert str(e.value) == "Property 'Aluno.nome' is not defined in concept"
+    parser.update(text)
+    parser.check()
@@ -1,5 +1,5 @@
 import pytest
-from ontodl import create_lexer, create_parser
+from ontodl import OntologyErrors, create_lexer, create_parser
 
 
 def make_parser(out):
@@ -30,12 +30,17 @@ def make_parser(out):
         "Relation 'isa' of must have only concepts."],
     ['''Ontologia T conceitos { a[f:string], b } individuos { } relacoes { } triplos { b = isa => a[name="X"]; }.''',
         "Only relation 'iof' must have properties."],
+    ['''Ontologia T conceitos { a } individuos { } relacoes { r } triplos { b = r => a; }.''',
+        "Individual 'b' is not defined"],
+    ['''Ontologia T conceitos { a } individuos { b } relacoes { } triplos { b = r => a; }.''',
+        "Relation 'r' is not defined"],
+    ['''Ontologia T conceitos { } individuos { b } relacoes { r } triplos { b = r => a; }.''',
+        "Concept 'a' is not defined"],
 ])
 def test_ontology_must_be_validated_for_dot_legacy(text, error):
     parser = make_parser('dot')
     try:
-        parser.parse(text)
-        parser.complete()
+        parser.parse(text).complete()
         assert False
     except Exception as e:
         assert str(e) == error
@@ -62,8 +67,65 @@ def test_ontology_must_be_validated_for_dot_legacy(text, error):
 def test_ontology_must_be_validated_for_dot(text, error):
     parser = make_parser('dot:experimental')
     try:
-        parser.parse(text)
-        parser.complete()
+        parser.parse(text).complete()
         assert False
     except Exception as e:
         assert str(e) == error
+
+
+COLLECT_TEXT = '''Ontologia T
+conceitos { A[name:string] }
+individuos { a, b }
+relacoes { r }
+triplos {
+  a = iof => A;
+  a = = b;
+  b = r => c;
+}.'''
+
+
+@pytest.mark.parametrize("out,errors", [
+    ['dot', [
+        (6, 3, "Property 'A.name' is not defined in triple"),
+        (7, 7, "Syntax error at 'LexToken(=,'=',1,108)'"),
+        (8, 3, "Concept 'c' is not defined"),
+    ]],
+    ['dot:experimental', [
+        (6, 3, 'Attribute "name" of concept "A" is not set.'),
+        (7, 7, "Syntax error at 'LexToken(=,'=',1,108)'"),
+        (8, 3, 'Concept "c" does not exist.'),
+    ]],
+])
+def test_ontology_must_collect_all_errors(out, errors):
+    parser = create_parser(out=out, collect_errors=True)
+    context = parser.parse(COLLECT_TEXT, lexer=create_lexer())
+    with pytest.raises(OntologyErrors) as e:
+        context.complete()
+    assert [(it.line, it.column, it.message) for it in e.value.errors] == errors
+
+
+def test_ontology_must_stop_collecting_at_max_errors():
+    parser = create_parser(out='dot:experimental',
+                           collect_errors=True, max_errors=1)
+    with pytest.raises(OntologyErrors) as e:
+        parser.parse(COLLECT_TEXT, lexer=create_lexer())
+    assert len(e.value.errors) == 1
+    assert e.value.truncated
+
+
+@pytest.mark.parametrize("out", ['dot', 'dot:experimental'])
+def test_ontology_must_not_be_truncated_at_exactly_max_errors(out):
+    parser = create_parser(out=out, collect_errors=True, max_errors=3)
+    with pytest.raises(OntologyErrors) as e:
+        parser.parse(COLLECT_TEXT, lexer=create_lexer()).complete()
+    assert len(e.value.errors) == 3
+    assert not e.value.truncated
+
+
+def test_ontology_must_sort_the_errors_kept_at_max_errors():
+    # The syntax error on line 7 is reported before the property error on line 6
+    parser = create_parser(out='dot', collect_errors=True, max_errors=2)
+    with pytest.raises(OntologyErrors) as e:
+        parser.parse(COLLECT_TEXT, lexer=create_lexer()).complete()
+    assert [(it.line, it.column) for it in e.value.errors] == [(6, 3), (7, 7)]
+    assert e.value.truncated
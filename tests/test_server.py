@@ -0,0 +1,77 @@
+import asyncio
+import io
+import json
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from ontodl import Server, compile_request, execute, percentile
+
+with open('samples/sample3.ontodl', encoding='utf-8') as file:
+    SOURCE = file.read()
+INVALID = 'Ontology X concepts { a } individuals { b } relations {} triples { b = iof => c; }.'
+
+
+def compile(format):
+    output = io.StringIO()
+    execute(io.StringIO(SOURCE), format=format, output=output)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("format", ['dot', 'dot:experimental', 'prolog', 'owl', 'json'])
+def test_request_must_return_the_output(format):
+    response = compile_request({'id': 7, 'source': SOURCE, 'format': format})
+    assert response == {'id': 7, 'output': compile(format)}
+
+
+@pytest.mark.parametrize("request_, error", [
+    ({'source': SOURCE, 'format': 'log'}, 'Unknown output type: log'),
+    ({'source': SOURCE, 'format': 'snapshot'}, 'Unknown output type: snapshot'),
+    ({'format': 'dot'}, "Missing field 'source'"),
+    ({'source': 1}, '"source" must be a string'),
+])
+def test_invalid_request_must_return_an_error(request_, error):
+    assert compile_request(request_)['error'].startswith(error)
+
+
+def test_request_must_return_every_error():
+    response = compile_request({'source': INVALID + INVALID, 'all_errors': True})
+    assert response['truncated'] is False
+    assert response['errors'][0] == {
+        'message': "Relation 'iof' must have a concepts as the 2nd argument.",
+        'line': 1, 'column': 68}
+    assert len(response['errors']) > 1
+
+
+@pytest.mark.parametrize("values, fraction, expected", [
+    ([], 0.5, None),
+    ([3], 0.99, 3),
+    ([4, 1, 3, 2], 0.5, 2),
+    (list(range(1, 101)), 0.99, 99),
+])
+def test_percentile_must_use_the_nearest_rank(values, fraction, expected):
+    assert percentile(values, fraction) == expected
+
+
+def serve(lines):
+    server = Server()
+    server.executor = ThreadPoolExecutor(2)
+    responses = []
+    pending = iter(line.encode('utf-8') for line in lines)
+
+    async def readline():
+        return next(pending, b'')
+
+    asyncio.run(server.serve_lines(readline, responses.append))
+    server.executor.shutdown()
+    return server, responses
+
+
+def test_server_must_answer_every_request():
+    requests = [{'id': i, 'source': SOURCE, 'format': 'owl'} for i in range(10)]
+    server, responses = serve([json.dumps(it) + '\n' for it in requests] + ['\n', 'null\n'])
+    assert sorted(it['id'] for it in responses if 'output' in it) == list(range(10))
+    assert all(it['output'] == compile('owl') for it in responses if 'output' in it)
+    assert [it['error'] for it in responses if 'error' in it] == [
+        'Invalid request: a request must be an object']
+    stats = server.stats()
+    assert stats['requests'] == 10
+    assert 0 < stats['p50_ms'] <= stats['p99_ms']
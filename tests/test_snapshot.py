@@ -0,0 +1,63 @@
+import io
+import pytest
+from ontodl import (compile_files, dump_snapshot, execute, load_snapshot,
+                    loads_snapshot, parse_ontology)
+
+SAMPLES = ['samples/basic.ontodl', 'samples/sample1.ontodl',
+           'samples/sample2.ontodl', 'samples/sample3.ontodl', 'samples/empty.ontodl']
+
+
+def read(path):
+    with open(path, encoding='utf-8') as file:
+        return file.read()
+
+
+@pytest.mark.parametrize("path", SAMPLES)
+def test_snapshot_must_round_trip(path):
+    ontology = parse_ontology(read(path))
+    output = io.BytesIO()
+    dump_snapshot(ontology, output)
+    output.seek(0)
+    loaded = load_snapshot(output)
+    assert loaded == ontology
+
+
+def test_snapshot_must_keep_unicode_and_properties():
+    ontology = parse_ontology(
+        '''Ontologia Ção conceitos { á [nome: string] } individuos { é } relacoes {} triplos { é = iof => á[nome="ñ ü"]; }.''')
+    output = io.BytesIO()
+    dump_snapshot(ontology, output)
+    assert loads_snapshot(output.getvalue()) == ontology
+
+
+def test_snapshot_must_reject_other_files():
+    with pytest.raises(Exception) as e:
+        loads_snapshot(b'Ontologia T')
+    assert str(e.value) == 'Not an ONTODL snapshot'
+
+
+@pytest.mark.parametrize("format", ['dot', 'prolog', 'owl', 'json'])
+def test_snapshot_must_compile_like_the_source(tmp_path, format):
+    [(_, [snapshot], error)] = compile_files(
+        ['samples/sample3.ontodl'], ['snapshot'], str(tmp_path))
+    assert error is None
+    expected = io.StringIO()
+    with open('samples/sample3.ontodl', encoding='utf-8') as file:
+        execute(file, format=format, output=expected)
+    output = io.StringIO()
+    with open(snapshot, encoding='utf-8') as file:
+        execute(file, format=format, output=output)
+    assert output.getvalue() == expected.getvalue()
+
+
+@pytest.mark.parametrize("options, message", [
+    ({'tokenize': True}, 'Tokenizing requires an ONTODL source'),
+    ({'format': 'dot:experimental'}, 'Format "dot:experimental" requires an ONTODL source'),
+])
+def test_snapshot_must_reject_source_only_options(tmp_path, options, message):
+    [(_, [snapshot], error)] = compile_files(
+        ['samples/sample3.ontodl'], ['snapshot'], str(tmp_path))
+    assert error is None
+    with open(snapshot, encoding='utf-8') as file, pytest.raises(Exception) as e:
+        execute(file, output=io.StringIO(), **options)
+    assert str(e.value) == message
@@ -0,0 +1,59 @@
+import io
+import pytest
+from ontodl import OntologyErrors, Spool, create_lexer, create_parser, execute
+
+SAMPLES = ['samples/basic.ontodl', 'samples/sample1.ontodl',
+           'samples/sample2.ontodl', 'samples/sample3.ontodl', 'samples/empty.ontodl']
+
+
+def run(path, stream, **kwargs):
+    output = io.StringIO()
+    with open(path, encoding='utf-8') as file:
+        execute(file, output=output, stream=stream, **kwargs)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("path", SAMPLES)
+@pytest.mark.parametrize("format", ['dot', 'dot:experimental', 'prolog', 'owl', 'json'])
+def test_stream_must_match_complete_output(path, format):
+    assert run(path, True, format=format) == run(path, False, format=format)
+
+
+@pytest.mark.parametrize("format", ['dot', 'prolog'])
+def test_stream_must_spool_large_sections(monkeypatch, format):
+    monkeypatch.setattr(Spool, 'block_size', 16)
+    path = 'samples/sample3.ontodl'
+    assert run(path, True, format=format) == run(path, False, format=format)
+
+
+def test_stream_must_drop_triples():
+    parser = create_parser('owl', output=io.StringIO())
+    with open('samples/sample3.ontodl', encoding='utf-8') as file:
+        context = parser.parse(file.read(), lexer=create_lexer())
+    assert context.result.triples == []
+    assert context.result.concepts
+
+
+@pytest.mark.parametrize("text,error", [
+    ['''Ontologia T conceitos {} individuos {} relacoes { isa } triplos {}.''',
+        "Relation 'isa' is a builtin relation"],
+    ['''Ontologia T conceitos { A[name:string] } individuos { a } relacoes {} triplos { a = iof => A; }.''',
+        "Property 'A.name' is not defined in triple"],
+    ['''Ontologia T conceitos { a } individuos { b } relacoes { } triplos { b = r => a; }.''',
+        "Relation 'r' is not defined"],
+])
+def test_stream_must_validate_triples(text, error):
+    with pytest.raises(Exception) as e:
+        execute(io.StringIO(text), format='prolog', output=io.StringIO(), stream=True)
+    assert str(e.value) == error
+
+
+def test_stream_must_collect_errors_with_positions():
+    text = 'Ontologia T conceitos { a } individuos { b } relacoes {}\ntriplos {\n b = r => a;\n b = iof => c;\n}.'
+    errors = []
+    for stream in [False, True]:
+        with pytest.raises(OntologyErrors) as e:
+            execute(io.StringIO(text), format='dot', output=io.StringIO(),
+                    collect_errors=True, stream=stream)
+        errors.append(e.value.format())
+    assert errors[0] == errors[1]